@@ -0,0 +1,209 @@
+"""
+Maison Élite · Synthetic ontology generator
+
+Writes a schema-conformant Maison Élite ontology of any size for benchmarking.
+The schema (classes and properties) is copied from maison_elite.owl; the
+individuals are generated in restaurant-sized blocks and streamed straight to
+disk, so even 10M individuals need little memory. Output is deterministic for
+a given seed.
+
+Run : python bench/generate.py 100000 -o /tmp/me_100k.owl
+      python bench/generate.py 1000000 --dishes-per-menu 20 --reservations-per-customer 4
+
+Each block holds one restaurant with its chefs, awards, menus, dishes,
+ingredients, customers and their reservations. Menus include dishes of their
+own restaurant; dishes use ingredients from anywhere in the file.
+"""
+import argparse
+import os
+import random
+import sys
+from xml.sax.saxutils import escape
+
+HERE   = os.path.dirname(os.path.abspath(__file__))
+SCHEMA = os.path.join(os.path.dirname(HERE), "maison_elite.owl")
+
+ME  = "http://maison-elite.org/ontology#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+# Individuals per block that do not depend on the fan-out options.
+CHEFS        = (("HeadChef", 1), ("SousChef", 4), ("PastryChef", 2))
+MENUS        = ("DegustationMenu", "ALaCarteMenu", "SeasonalMenu", "ALaCarteMenu")
+DISHES       = 40
+INGREDIENTS  = 20
+AWARDS       = 3
+CUSTOMERS    = 30
+VIP_SHARE    = 0.2
+
+FIRST   = ["Layla", "James", "Amira", "Yuki", "Karim", "Sofia", "Omar", "Elena",
+           "Hassan", "Chloe", "Mateo", "Nour", "Priya", "Lucas", "Ines", "Tarek"]
+LAST    = ["Hassan", "Carter", "Mansour", "Tanaka", "Esposito", "Dubois", "Silva",
+           "Rossi", "Nakamura", "Farouk", "Laurent", "Haddad", "Moreau", "Okafor"]
+NATIONS = ["Italian", "Egyptian", "Japanese", "French", "Lebanese", "Spanish",
+           "Moroccan", "Peruvian"]
+CUISINE = ["French-Egyptian Fusion", "Middle Eastern Fusion", "Japanese-French",
+           "Modern Mediterranean", "Nordic", "Levantine", "Basque"]
+FOODS   = ["Truffle", "Saffron", "Lobster", "Wagyu", "Burrata", "Foie Gras",
+           "Sea Bass", "Lamb", "Mango", "Chocolate", "Pistachio", "Fig",
+           "Duck", "Scallop", "Caviar", "Vanilla", "Hibiscus", "Date", "Citrus",
+           "Mushroom", "Tahini", "Halloumi", "Quail", "Octopus"]
+STYLES  = {"Starter": ["Carpaccio", "Tartare", "Bisque", "Velouté", "Salad"],
+           "MainCourse": ["Risotto", "Tenderloin", "Papillote", "Confit", "Roast"],
+           "Dessert": ["Soufflé", "Panna Cotta", "Tart", "Sorbet", "Mille-Feuille"]}
+ORIGINS = ["Périgord, France", "Fayoum, Egypt", "Kobe, Japan", "Puglia, Italy",
+           "Brittany, France", "Atlas, Morocco", "Nile Delta, Egypt"]
+ISSUERS = ["Guide Michelin", "World's 50 Best", "James Beard Foundation",
+           "Middle East & Africa Hospitality Awards"]
+ALLERGENS = ["None", "Dairy", "Gluten", "Eggs", "Tree Nuts", "Shellfish",
+             "Dairy, Eggs", "Gluten, Dairy"]
+
+
+def schema_head(path=SCHEMA):
+    # Everything before the individuals: XML header, classes and properties.
+    with open(path, encoding="utf-8") as fh:
+        text = fh.read()
+    cut = text.rfind("<!--", 0, text.index("INDIVIDUALS"))
+    return text[:cut]
+
+
+def block_size(opts):
+    chefs = sum(n for _, n in CHEFS)
+    return (1 + chefs + AWARDS + len(MENUS) + DISHES + INGREDIENTS
+            + CUSTOMERS * (1 + opts.reservations_per_customer))
+
+
+class _Writer:
+    def __init__(self, fh):
+        self.fh = fh
+        self.count = 0
+
+    def individual(self, name, cls, lits, refs=()):
+        out = [f'    <owl:NamedIndividual rdf:about="{ME}{name}">\n'
+               f'        <rdf:type rdf:resource="{ME}{cls}"/>\n']
+        for prop, val, xsd in lits:
+            dt = f' rdf:datatype="{XSD}{xsd}"' if xsd else ""
+            out.append(f"        <me:{prop}{dt}>{escape(str(val))}</me:{prop}>\n")
+        for prop, target in refs:
+            out.append(f'        <me:{prop} rdf:resource="{ME}{target}"/>\n')
+        out.append("    </owl:NamedIndividual>\n\n")
+        self.fh.write("".join(out))
+        self.count += 1
+
+
+def write_block(w, rng, b, blocks, opts):
+    person = lambda: f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+    chefs, dishes = [], []
+
+    for cls, n in CHEFS:
+        for k in range(n):
+            name = f"{cls}{b}_{k}"
+            chefs.append(name)
+            w.individual(name, cls, [
+                ("name", person(), None),
+                ("nationality", rng.choice(NATIONS), None),
+                ("cuisine", rng.choice(CUISINE), None),
+                ("specialty", f"{rng.choice(FOODS)} & {rng.choice(FOODS)}", None),
+                ("yearsExperience", rng.randint(2, 30), "integer"),
+            ], [("earnedAward", f"Award{b}_{rng.randrange(AWARDS)}")])
+
+    for k in range(DISHES):
+        cls  = ("Starter", "MainCourse", "Dessert")[k % 3]
+        name = f"Dish{b}_{k}"
+        dishes.append(name)
+        refs = [("preparedBy", rng.choice(chefs))]
+        refs += [("containsIngredient", f"Ingredient{rng.randrange(blocks)}_{rng.randrange(INGREDIENTS)}")
+                 for _ in range(opts.ingredients_per_dish)]
+        w.individual(name, cls, [
+            ("name", f"{rng.choice(FOODS)} {rng.choice(STYLES[cls])}", None),
+            ("price", f"{rng.uniform(9, 120):.2f}", "decimal"),
+            ("rating", f"{rng.uniform(3.5, 5.0):.1f}", "float"),
+            ("calories", rng.randint(120, 950), "integer"),
+            ("isVegan", "true" if rng.random() < 0.25 else "false", "boolean"),
+            ("allergens", rng.choice(ALLERGENS), None),
+        ], refs)
+
+    for k in range(INGREDIENTS):
+        w.individual(f"Ingredient{b}_{k}", "Ingredient", [
+            ("name", f"{rng.choice(FOODS)} {k}", None),
+            ("origin", rng.choice(ORIGINS), None),
+            ("seasonal", "true" if rng.random() < 0.3 else "false", "boolean"),
+        ])
+
+    for k, cls in enumerate(MENUS):
+        picks = rng.sample(dishes, min(opts.dishes_per_menu, len(dishes)))
+        w.individual(f"Menu{b}_{k}", cls, [("name", f"{cls[:-4]} Menu {b}.{k}", None)],
+                     [("includes", d) for d in picks])
+
+    for k in range(AWARDS):
+        w.individual(f"Award{b}_{k}", "Award", [
+            ("name", rng.choice(["Michelin Star", "Best Chef", "Rising Star",
+                                 "Top 50 Restaurant"]), None),
+            ("issuedBy", rng.choice(ISSUERS), None),
+            ("year", rng.randint(2015, 2025), "integer"),
+        ])
+
+    restaurant = f"Restaurant{b}"
+    w.individual(restaurant, "Restaurant", [
+        ("name", f"Maison Élite {b}", None),
+        ("location", rng.choice(ORIGINS), None),
+        ("cuisine", rng.choice(CUISINE), None),
+        ("rating", f"{rng.uniform(4.0, 5.0):.1f}", "float"),
+        ("capacity", rng.randint(30, 200), "integer"),
+    ], [("employs", c) for c in chefs]
+       + [("hasMenu", f"Menu{b}_{k}") for k in range(len(MENUS))]
+       + [("receivedAward", f"Award{b}_{k}") for k in range(AWARDS)])
+
+    for k in range(CUSTOMERS):
+        cname = f"Customer{b}_{k}"
+        who   = person()
+        res   = [f"Res{b}_{k}_{r}" for r in range(opts.reservations_per_customer)]
+        w.individual(cname, "VIPCustomer" if rng.random() < VIP_SHARE else "RegularCustomer", [
+            ("name", who, None),
+            ("memberSince", str(rng.randint(2010, 2025)), None),
+            ("totalVisits", rng.randint(1, 60), "integer"),
+        ], [("hasReservation", r) for r in res])
+        for r in res:
+            w.individual(r, "Reservation", [
+                ("name", f"{who} — table booking", None),
+                ("reservationDate", f"{rng.randint(2024, 2025)}-{rng.randint(1, 12):02d}-"
+                                    f"{rng.randint(1, 28):02d}T{rng.randint(12, 22)}:"
+                                    f"{rng.choice(('00', '30'))}:00", "dateTime"),
+                ("partySize", rng.randint(1, 10), "integer"),
+                ("tableNumber", rng.randint(1, 40), "integer"),
+                ("confirmed", "true" if rng.random() < 0.7 else "false", "boolean"),
+            ], [("atRestaurant", restaurant)])
+
+
+def generate(out, individuals, opts):
+    # -> number of individuals written (a whole number of blocks, >= 1).
+    blocks = max(1, round(individuals / block_size(opts)))
+    rng = random.Random(opts.seed)
+    with open(out, "w", encoding="utf-8", buffering=1 << 20) as fh:
+        fh.write(schema_head())
+        w = _Writer(fh)
+        for b in range(blocks):
+            write_block(w, rng, b, blocks, opts)
+        fh.write("</rdf:RDF>\n")
+    return w.count
+
+
+def add_options(ap):
+    ap.add_argument("--dishes-per-menu", type=int, default=12)
+    ap.add_argument("--ingredients-per-dish", type=int, default=4)
+    ap.add_argument("--reservations-per-customer", type=int, default=2)
+    ap.add_argument("--seed", type=int, default=1)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate a synthetic Maison Élite ontology.")
+    ap.add_argument("individuals", type=int, help="approximate number of individuals")
+    ap.add_argument("-o", "--out", help="output file (default me_<n>.owl)")
+    add_options(ap)
+    args = ap.parse_args(argv)
+    out = args.out or f"me_{args.individuals}.owl"
+    n = generate(out, args.individuals, args)
+    print(f"{out}: {n:,} individuals, {os.path.getsize(out) / 1e6:.1f} MB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Maison Élite · Scaling benchmark
+
+Times the engine on generated ontologies of increasing size: parsing, class
+grouping, each index build, every Smart Query prefix and the headless part of
+rendering an entity tab (the row and detail models the explorer draws from).
+Each size runs in a fresh process so its peak memory is its own. Results are
+compared with a stored baseline; a phase that is slower than the baseline by
+more than the tolerance is reported as a regression and the exit status is 1.
+
+Run : python bench/run.py                          # 1k, 10k, 100k vs bench/baseline.json
+      python bench/run.py --sizes 1000000 10000000 # bigger runs (needs disk and patience)
+      python bench/run.py --save-baseline          # record this machine's numbers
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:             # Windows: peak memory is reported as unknown
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import ontology_engine as oe
+from generate import add_options, generate
+
+BASELINE  = os.path.join(HERE, "baseline.json")
+SIZES     = [1000, 10000, 100000]
+MIN_DELTA = 0.005               # seconds; smaller differences are noise
+QUICK     = 1.0                 # phases faster than this are repeated
+PAGE      = 40                  # rows described per tab, as in the explorer
+
+# One query per Smart Query prefix / form, named for the report.
+QUERIES = [
+    ("text",        "truffle"),
+    ("phrase",      '"sea bass"'),
+    ("dish",        "dish:truffle"),
+    ("chef",        "chef:sofia"),
+    ("ingredient",  "ingredient:saffron"),
+    ("award",       "award:michelin"),
+    ("type",        "type:chef"),
+    ("price",       "price:<30"),
+    ("rating",      "rating:>4.5"),
+    ("party",       "party:>=4"),
+    ("visits",      "visits:>20"),
+    ("vegan",       "vegan"),
+    ("vip",         "vip"),
+    ("confirmed",   "confirmed"),
+    ("seasonal",    "seasonal"),
+    ("and_not",     "dish: AND price:<40 AND NOT vegan"),
+    ("or",          "vip OR visits:>50"),
+    ("join",        "ingredient:saffron -> dishes -> menus"),
+    ("date",        "date:2025-03-01..2025-03-07"),
+]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ONE SIZE (child process)
+# ─────────────────────────────────────────────────────────────────────────────
+def _peak_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def _timed(phases, name, repeat, fn, *args):
+    # Best of `repeat` runs, but a phase slower than QUICK runs once: its
+    # timing is stable enough and repeating it would dominate the benchmark.
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn(*args)
+        dt = time.perf_counter() - t
+        best = dt if best is None else min(best, dt)
+        if dt > QUICK:
+            break
+    phases[name] = best
+    return out
+
+
+def _view_model(m):
+    # What _view_entity / _render_detail compute before any widget exists:
+    # a page of (name, subtitle) rows per tab plus the first item's detail.
+    store, adj = m["individuals"], m["adjacency"]
+    for tab, names in m["groups"].items():
+        rows = []
+        for name in names[:PAGE]:
+            iid   = store.id_of(name)
+            types = store.types(iid)
+            rows.append((store.value(iid, "name", name)[:37], types[0] if types else ""))
+        if names:
+            iid = store.id_of(names[0])
+            oe.record(store, iid)
+            adj.outgoing(iid)
+            adj.incoming(iid)
+
+
+def run_one(path, repeat):
+    phases = {}
+    classes, sub_classes, obj_props, data_props, store = _timed(
+        phases, "parse", 1, oe.parse_owl, path)
+    hierarchy = _timed(phases, "hierarchy", repeat, oe.ClassHierarchy, classes)
+    groups    = _timed(phases, "group", repeat, oe.group_individuals, store, hierarchy)
+    model = {
+        "classes": classes, "sub_classes": sub_classes, "obj_props": obj_props,
+        "data_props": data_props, "individuals": store, "hierarchy": hierarchy,
+        "groups": groups,
+        "text_index": _timed(phases, "index.text", repeat, oe.TextIndex, store),
+        "num_index":  _timed(phases, "index.numeric", repeat, oe.NumericIndex, store, data_props),
+        "type_index": _timed(phases, "index.type", repeat, oe.TypeIndex, store, hierarchy),
+        "adjacency":  _timed(phases, "index.adjacency", repeat, oe.Adjacency, store),
+        "time_index": _timed(phases, "index.time", repeat, oe.TimeIndex, store),
+    }
+    engine = oe.QueryEngine.from_model(model)
+    hits = {}
+    for name, text in QUERIES:
+        best = None
+        for _ in range(repeat):
+            model["text_index"]._init_caches()      # time cold lookups
+            t = time.perf_counter()
+            hits[name] = len(engine.run(text))
+            dt = time.perf_counter() - t
+            best = dt if best is None else min(best, dt)
+        phases[f"query.{name}"] = best
+    _timed(phases, "view", repeat, _view_model, model)
+    return {"individuals": len(store), "bytes": os.path.getsize(path),
+            "peak_rss_mb": _peak_mb(), "phases": phases, "hits": hits}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# DRIVER
+# ─────────────────────────────────────────────────────────────────────────────
+def _options(args):
+    return {"dishes_per_menu": args.dishes_per_menu,
+            "ingredients_per_dish": args.ingredients_per_dish,
+            "reservations_per_customer": args.reservations_per_customer,
+            "seed": args.seed}
+
+
+def dataset(args, size):
+    # Generated once per size and option set, then reused between runs.
+    os.makedirs(args.data, exist_ok=True)
+    o = _options(args)
+    path = os.path.join(args.data, "me_{}_{dishes_per_menu}_{ingredients_per_dish}_"
+                                   "{reservations_per_customer}_{seed}.owl".format(size, **o))
+    if not os.path.exists(path):
+        print(f"generating {size:,} individuals …", file=sys.stderr)
+        generate(path + ".tmp", size, args)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def _throughput(phase, res, seconds):
+    if seconds <= 0:
+        return ""
+    if phase == "parse":
+        return f"{res['individuals'] / seconds:>10,.0f}/s {res['bytes'] / seconds / 1e6:6.1f} MB/s"
+    if phase == "group" or phase.startswith("index."):
+        return f"{res['individuals'] / seconds:>10,.0f}/s"
+    return ""
+
+
+def report(size, res, base, tolerance, out):
+    # Prints one size's table; returns the list of regressions.
+    regressions = []
+    out.write(f"\n{size:,} requested · {res['individuals']:,} individuals · "
+              f"{res['bytes'] / 1e6:.1f} MB · peak RSS {res['peak_rss_mb']} MB\n")
+    out.write(f"  {'phase':<20}{'seconds':>10}  {'throughput':<28}{'baseline':>10}{'change':>9}\n")
+    for phase, t in res["phases"].items():
+        line = f"  {phase:<20}{t:>10.4f}  {_throughput(phase, res, t):<28}"
+        b = base["phases"].get(phase) if base else None
+        if b is not None:
+            change = (t - b) / b * 100 if b else 0.0
+            flag = ""
+            if t > b * (1 + tolerance) and t - b > MIN_DELTA:
+                regressions.append(f"{size}: {phase} {b:.4f}s -> {t:.4f}s")
+                flag = "  REGRESSION"
+            line += f"{b:>10.4f}{change:>+8.0f}%{flag}"
+        out.write(line + "\n")
+    if base and base.get("peak_rss_mb") and res["peak_rss_mb"]:
+        if res["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{size}: peak RSS {base['peak_rss_mb']} MB -> "
+                               f"{res['peak_rss_mb']} MB")
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Maison Élite scaling benchmark.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    ap.add_argument("--repeat", type=int, default=5, help="runs per query (best is kept)")
+    ap.add_argument("--data", default=os.path.join(tempfile.gettempdir(), "maison-bench"),
+                    help="where generated ontologies are kept")
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true",
+                    help="write these results as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.5,
+                    help="allowed slowdown before a phase counts as a regression")
+    ap.add_argument("--json", help="also write the results to this file")
+    ap.add_argument("--one", help=argparse.SUPPRESS)
+    add_options(ap)
+    args = ap.parse_args(argv)
+
+    if args.one:
+        json.dump(run_one(args.one, args.repeat), sys.stdout)
+        return 0
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline.get("options") != _options(args):
+            print("baseline was recorded with other generator options; not comparing",
+                  file=sys.stderr)
+            baseline = None
+
+    results, regressions = {}, []
+    for size in args.sizes:
+        path = dataset(args, size)
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--one", path,
+                               "--repeat", str(args.repeat)],
+                              stdout=subprocess.PIPE, check=True)
+        res = results[str(size)] = json.loads(proc.stdout)
+        base = baseline["results"].get(str(size)) if baseline else None
+        regressions += report(size, res, base, args.tolerance, sys.stdout)
+
+    doc = {"machine": {"python": platform.python_version(), "platform": platform.platform(),
+                       "processor": platform.processor() or platform.machine()},
+           "options": _options(args), "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(doc, fh, indent=1)
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            # Keep sizes recorded earlier that this run did not cover.
+            with open(args.baseline, encoding="utf-8") as fh:
+                old = json.load(fh)
+            if old.get("options") == doc["options"]:
+                doc["results"] = dict(old["results"], **results)
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump(doc, fh, indent=1)
+        print(f"\nbaseline written to {args.baseline}")
+    if regressions:
+        print("\nregressions:\n  " + "\n  ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
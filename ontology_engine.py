@@ -0,0 +1,4099 @@
+"""
+Maison Élite · Ontology engine
+
+Everything the explorer does that does not need a window: OWL parsing, the
+triple store and its indexes, the Smart Query language and the snapshot
+cache. Nothing here imports tkinter, so it runs on servers and in batch jobs.
+
+Run : python ontology_explorer.py query "rating:>4.7" --format jsonl
+"""
+import xml.etree.ElementTree as ET
+import argparse
+import atexit
+import os
+import sys
+import time
+import copy
+import cProfile
+import hashlib
+import heapq
+import io
+import json
+import mmap
+import pickle
+import queue
+import re
+import threading
+import struct
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urljoin, urlsplit
+from urllib.request import url2pathname
+
+# NumPy is optional and slow to import, so it is looked up on first use, by
+# aggregate queries; without it they run over plain arrays.
+np = None
+_numpy_checked = False
+
+
+def _numpy():
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy_checked = True
+    return np
+
+NS     = "http://maison-elite.org/ontology#"
+OWL_NS = "http://www.w3.org/2002/07/owl#"
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDS_NS = "http://www.w3.org/2000/01/rdf-schema#"
+
+# ─────────────────────────────────────────────────────────────────────────────
+# INSTRUMENTATION
+# ─────────────────────────────────────────────────────────────────────────────
+# Named phases (parse, group, index.*, query, view.* …) are wrapped in
+#   with TIMER.phase("query") as ph: …; ph.items = len(ids)
+# While the timer is disabled phase() hands out one shared no-op context, so
+# instrumented code costs a method call. Enabled, it keeps per-phase counts,
+# total / max seconds and items processed, can append each finished phase to
+# a JSON-lines trace and can run cProfile around the next run of one phase.
+class _NullPhase:
+    items = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ("timer", "name", "items", "t0", "prof")
+
+    def __init__(self, timer, name, items):
+        self.timer, self.name, self.items = timer, name, items
+
+    def __enter__(self):
+        self.prof = self.timer._arm(self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        if self.prof is not None:
+            self.prof.disable()
+        self.timer._record(self, dt)
+        return False
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.enabled  = False
+        self.stats    = {}          # phase -> [count, total s, max s, items]
+        self.last     = None        # (phase, seconds, items) most recently finished
+        self.profiled = None        # path of the last cProfile dump
+        self._lock    = threading.Lock()
+        self._trace   = None
+        self.armed    = None        # (phase, path) to profile on its next run
+        self._origin  = time.perf_counter()
+
+    def configure(self, enabled=True, trace=None, cprofile=None):
+        # `trace`: JSON-lines file to append to; `cprofile`: (phase, path).
+        self.enabled = enabled or bool(trace or cprofile)
+        if trace:
+            self._trace = open(trace, "a", encoding="utf-8", buffering=1)
+        if cprofile:
+            self.profile_next(*cprofile)
+
+    def profile_next(self, phase, path):
+        self.armed = (phase, path)
+
+    def phase(self, name, items=0):
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name, items)
+
+    def _arm(self, name):
+        with self._lock:
+            if self.armed is None or self.armed[0] != name:
+                return None
+            prof = cProfile.Profile()
+            prof.path, self.armed = self.armed[1], None
+        prof.enable()
+        return prof
+
+    def _record(self, ph, dt):
+        with self._lock:
+            st = self.stats.get(ph.name)
+            if st is None:
+                st = self.stats[ph.name] = [0, 0.0, 0.0, 0]
+            st[0] += 1
+            st[1] += dt
+            st[2] = max(st[2], dt)
+            st[3] += ph.items or 0
+            self.last = (ph.name, dt, ph.items)
+            if self._trace is not None:
+                self._trace.write(json.dumps({
+                    "phase": ph.name, "start_ms": round((ph.t0 - self._origin) * 1000, 3),
+                    "ms": round(dt * 1000, 3), "items": ph.items,
+                    "thread": threading.current_thread().name}) + "\n")
+        if ph.prof is not None:
+            ph.prof.dump_stats(ph.prof.path)
+            self.profiled = ph.prof.path
+
+    def report(self):
+        # -> [(phase, count, total s, mean s, max s, items)], slowest total first.
+        with self._lock:
+            rows = [(n, c, t, t / c, m, i) for n, (c, t, m, i) in self.stats.items()]
+        return sorted(rows, key=lambda r: -r[2])
+
+    def write_report(self, stream):
+        stream.write(f"{'phase':<18}{'count':>7}{'total ms':>11}{'mean ms':>10}"
+                     f"{'max ms':>10}{'items':>11}\n")
+        for n, c, t, mean, m, i in self.report():
+            stream.write(f"{n:<18}{c:>7}{t * 1000:>11.1f}{mean * 1000:>10.2f}"
+                         f"{m * 1000:>10.2f}{i:>11,}\n")
+
+
+TIMER = PhaseTimer()
+
+# ─────────────────────────────────────────────────────────────────────────────
+# TRIPLE STORE
+# ─────────────────────────────────────────────────────────────────────────────
+# Individuals are held column-wise. Every string (names, URI prefixes, type and
+# property names, literal values) is interned once into `_terms`, and each
+# assertion is one row of the parallel subject / predicate / object / kind
+# arrays. Rows of one subject are contiguous, so `_asr_off[i]:_asr_off[i+1]`
+# is the slice for individual i (and likewise `_type_off` into `_type_col`).
+# Rows are never rewritten: a live reload tombstones an individual's old id in
+# `removed` and appends the new version under a fresh id.
+#
+# A row's kind says what its object is: LIT (plain text), REF (an individual's
+# name) or a typed literal, 2 + the position of its xsd datatype in DATATYPES.
+# Typed literals are decoded once, when the file is loaded, into one float per
+# term in `_num`: numbers as themselves, booleans as 0 / 1, dates and dateTimes
+# as seconds since 1970 UTC (a value without a zone is read as UTC). A text
+# that is valid under two datatypes means the same number under both, so one
+# slot per term serves every row using it; `_num_kind` remembers which kind
+# decoded it. A literal that does not parse stays text (kind LIT) and is
+# listed in the store's `diagnostics`.
+LIT, REF = 0, 1
+
+XSD_INTEGER = (
+    "integer", "int", "long", "short", "byte",
+    "nonNegativeInteger", "positiveInteger", "negativeInteger",
+    "nonPositiveInteger", "unsignedInt", "unsignedLong", "unsignedShort",
+    "unsignedByte",
+)
+XSD_NUMERIC = {*XSD_INTEGER, "decimal", "float", "double"}
+XSD_FLOAT   = {"decimal", "float", "double"}
+XSD_TIME    = {"dateTime", "date"}
+DATATYPES   = (*XSD_INTEGER, "decimal", "float", "double", "boolean", "dateTime", "date")
+_KIND       = {dt: k for k, dt in enumerate(DATATYPES, 2)}
+NUMBER_KINDS = frozenset(k for dt, k in _KIND.items() if dt not in XSD_TIME)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_BOOL  = {"true": 1.0, "1": 1.0, "false": 0.0, "0": 0.0}
+_INT_BOUNDS = {
+    "byte": (-1 << 7, (1 << 7) - 1), "short": (-1 << 15, (1 << 15) - 1),
+    "int": (-1 << 31, (1 << 31) - 1), "long": (-1 << 63, (1 << 63) - 1),
+    "unsignedByte": (0, 255), "unsignedShort": (0, 65535),
+    "unsignedInt": (0, (1 << 32) - 1), "unsignedLong": (0, (1 << 64) - 1),
+    "nonNegativeInteger": (0, None), "positiveInteger": (1, None),
+    "negativeInteger": (None, -1), "nonPositiveInteger": (None, 0),
+}
+_XSD_INT      = re.compile(r"[+-]?\d+")
+_XSD_DECIMAL  = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)")
+_XSD_DOUBLE   = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?|[+-]?INF|NaN")
+_XSD_DATE     = re.compile(r"(\d{4}-\d\d-\d\d)(Z|[+-]\d\d:\d\d)?")
+_XSD_DATETIME = re.compile(r"(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d{1,6})?)(Z|[+-]\d\d:\d\d)?")
+
+
+def literal_kind(datatype):
+    # Datatype IRI or xsd local name -> row kind; LIT for anything not decoded.
+    if not datatype or datatype is True:
+        return LIT
+    return _KIND.get(datatype.rsplit("#", 1)[-1], LIT)
+
+
+def datatype_of(kind):
+    return DATATYPES[kind - 2] if kind > REF else None
+
+
+def decode_literal(text, xsd):
+    # -> the stored float for `text` as an xsd `xsd` literal; ValueError
+    # (with a short reason) when it is not one.
+    text = text.strip()
+    if xsd == "boolean":
+        x = _BOOL.get(text.lower())
+        if x is None:
+            raise ValueError("not true, false, 1 or 0")
+        return x
+    if xsd in XSD_TIME:
+        m = (_XSD_DATE if xsd == "date" else _XSD_DATETIME).fullmatch(text)
+        try:
+            if m is None:
+                raise ValueError
+            dt = datetime.fromisoformat(m.group(1))
+        except ValueError:
+            raise ValueError("not a date" if xsd == "date" else "not a date and time") from None
+        zone = m.group(2)
+        if zone and xsd == "dateTime":
+            dt = dt.replace(tzinfo=timezone.utc if zone == "Z" else
+                            datetime.strptime(zone, "%z").tzinfo)
+        else:
+            # A date is its day in UTC, whatever zone it names.
+            dt = dt.replace(tzinfo=timezone.utc)
+        return (dt - _EPOCH).total_seconds()
+    if xsd in XSD_FLOAT:
+        if not (_XSD_DOUBLE if xsd != "decimal" else _XSD_DECIMAL).fullmatch(text):
+            raise ValueError("not a number")
+        return float(text.replace("INF", "inf"))
+    if not _XSD_INT.fullmatch(text):
+        raise ValueError("not an integer")
+    n = int(text)
+    lo, hi = _INT_BOUNDS.get(xsd, (None, None))
+    if (lo is not None and n < lo) or (hi is not None and n > hi) or abs(n) > 1 << 53:
+        raise ValueError("out of range")
+    return float(n)
+
+
+def typed_value(x, kind):
+    # Stored float -> int / float / bool / datetime (UTC) / date.
+    xsd = DATATYPES[kind - 2]
+    if xsd in XSD_FLOAT:
+        return x
+    if xsd == "boolean":
+        return x != 0
+    if xsd in XSD_TIME:
+        dt = _EPOCH + timedelta(seconds=x)
+        return dt if xsd == "dateTime" else dt.date()
+    return int(x)
+
+
+class IndividualView:
+    __slots__ = ("_store", "id")
+
+    def __init__(self, store, iid):
+        self._store = store
+        self.id     = iid
+
+    def __getitem__(self, key):
+        if key == "assertions":
+            return self._store.assertions(self.id)
+        if key == "types":
+            return self._store.types(self.id)
+        if key == "uri":
+            return self._store.uri(self.id)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in ("uri", "types", "assertions")
+
+    @property
+    def name(self):
+        return self._store.name(self.id)
+
+    def value(self, prop, default=None):
+        return self._store.value(self.id, prop, default)
+
+    def __repr__(self):
+        return f"<IndividualView {self.name}>"
+
+
+class IndividualStore(Mapping):
+    def __init__(self):
+        self._terms    = []
+        self._term_ids = {}
+        self._names    = array("I")
+        self._uri_pfx  = array("I")
+        self._type_off = array("I", [0])
+        self._type_col = array("I")
+        self._asr_off  = array("I", [0])
+        self._subj     = array("I")
+        self._pred     = array("I")
+        self._obj      = array("I")
+        self._kind     = array("B")
+        self._num      = array("d")
+        self._num_kind = array("B")
+        self._index    = {}
+        self.removed   = set()
+        self.diagnostics = []     # (id, prop, text, datatype, reason)
+
+    # ── interning ────────────────────────────────────────────────────────
+    def intern(self, text):
+        tid = self._term_ids.get(text)
+        if tid is None:
+            tid = len(self._terms)
+            self._terms.append(text)
+            self._term_ids[text] = tid
+        return tid
+
+    def term(self, tid):
+        return self._terms[tid]
+
+    def term_id(self, text):
+        return self._term_ids.get(text)
+
+    # ── building ─────────────────────────────────────────────────────────
+    def add(self, name, uri, types, assertions):
+        # assertions: iterable of (prop, value, kind) with kind LIT or REF
+        iid = len(self._names)
+        nid = self.intern(name)
+        self._names.append(nid)
+        self._uri_pfx.append(self.intern(uri[:len(uri) - len(name)]))
+        for t in types:
+            self._type_col.append(self.intern(t))
+        self._type_off.append(len(self._type_col))
+        for prop, val, kind in assertions:
+            self._subj.append(iid)
+            self._pred.append(self.intern(prop))
+            self._obj.append(self.intern(val))
+            self._kind.append(kind)
+        self._asr_off.append(len(self._pred))
+        self._index[self._terms[nid]] = iid
+        return iid
+
+    def remove(self, name):
+        iid = self._index.pop(name)
+        self.removed.add(iid)
+        return iid
+
+    def extend(self, other):
+        # Appends every individual of `other` (whose names must be new here),
+        # remapping its term ids column by column instead of row by row.
+        tr = list(map(self.intern, other._terms)).__getitem__
+        n0, t0, a0 = len(self._names), len(self._type_col), len(self._pred)
+        self._names.extend(map(tr, other._names))
+        self._uri_pfx.extend(map(tr, other._uri_pfx))
+        self._type_col.extend(map(tr, other._type_col))
+        self._type_off.extend(o + t0 for o in other._type_off[1:])
+        self._subj.extend(s + n0 for s in other._subj)
+        self._pred.extend(map(tr, other._pred))
+        self._obj.extend(map(tr, other._obj))
+        self._kind.extend(other._kind)
+        self._asr_off.extend(o + a0 for o in other._asr_off[1:])
+        self._index.update((name, iid + n0) for name, iid in other._index.items())
+        self._grow_num()
+        num, nkind = self._num, self._num_kind
+        for t, (x, k) in enumerate(zip(other._num, other._num_kind)):
+            if k:
+                num[tr(t)], nkind[tr(t)] = x, k
+        self.diagnostics += [(iid + n0, *rest) for iid, *rest in other.diagnostics]
+
+    # ── typed literals ───────────────────────────────────────────────────
+    def _grow_num(self):
+        short = len(self._terms) - len(self._num)
+        if short > 0:
+            self._num.frombytes(bytes(8 * short))
+            self._num_kind.frombytes(bytes(short))
+
+    def decode(self, data_props, ids=None):
+        # Decodes the typed literals of `ids` (default: every row) not decoded
+        # yet. Plain literals of a property whose range is a decoded datatype
+        # take that datatype; a literal that does not parse becomes plain text
+        # and a diagnostics entry. -> the number of new diagnostics.
+        self._grow_num()
+        tid    = self._term_ids.get
+        ranges = {tid(p): _KIND[info["range"]] for p, info in data_props.items()
+                  if info.get("range") in _KIND and tid(p) is not None}
+        terms, pred, obj, kind = self._terms, self._pred, self._obj, self._kind
+        num, nkind = self._num, self._num_kind
+        off, subj  = self._asr_off, self._subj
+        flagged = {d[:3] for d in self.diagnostics}
+        before  = len(self.diagnostics)
+        rows = (range(len(pred)) if ids is None else
+                (r for i in ids for r in range(off[i], off[i + 1])))
+        for r in rows:
+            k = kind[r]
+            if k == REF or (k == LIT and pred[r] not in ranges):
+                continue
+            if k == LIT:
+                k = ranges[pred[r]]
+            o = obj[r]
+            if nkind[o] != k:
+                try:
+                    num[o] = decode_literal(terms[o], DATATYPES[k - 2])
+                except ValueError as exc:
+                    kind[r] = LIT
+                    key = (subj[r], terms[pred[r]], terms[o])
+                    if key not in flagged:
+                        flagged.add(key)
+                        self.diagnostics.append((*key, DATATYPES[k - 2], str(exc)))
+                    continue
+                nkind[o] = k
+            kind[r] = k
+        return len(self.diagnostics) - before
+
+    def typed(self, iid):
+        # assertions() with every typed literal decoded to int / float /
+        # bool / datetime / date; plain literals and references stay text.
+        t, num, a, b = self._terms, self._num, self._asr_off[iid], self._asr_off[iid + 1]
+        return [(t[p], typed_value(num[o], k) if k > REF else t[o]) for p, o, k in
+                zip(self._pred[a:b], self._obj[a:b], self._kind[a:b])]
+
+    def numbers(self, iid):
+        # The stored float of each entries() row; None for text and references.
+        num, a, b = self._num, self._asr_off[iid], self._asr_off[iid + 1]
+        return [num[o] if k > REF else None
+                for o, k in zip(self._obj[a:b], self._kind[a:b])]
+
+    def literal(self, iid, prop, default=None):
+        # value() decoded: the first value of `prop` as typed() gives it.
+        pid = self._term_ids.get(prop)
+        if pid is not None:
+            pred = self._pred
+            for row in range(self._asr_off[iid], self._asr_off[iid + 1]):
+                if pred[row] == pid:
+                    o, k = self._obj[row], self._kind[row]
+                    return typed_value(self._num[o], k) if k > REF else self._terms[o]
+        return default
+
+    def typed_rows(self, plain=False):
+        # (subject, predicate term id, stored float, kind) of every typed
+        # row; with `plain`, LIT rows too, with None for the float.
+        num = self._num
+        if plain:
+            return ((s, p, num[o] if k > REF else None, k) for s, p, o, k in
+                    zip(self._subj, self._pred, self._obj, self._kind) if k != REF)
+        return ((s, p, num[o], k) for s, p, o, k in
+                zip(self._subj, self._pred, self._obj, self._kind) if k > REF)
+
+    # ── per-individual access ────────────────────────────────────────────
+    def id_of(self, name):
+        return self._index.get(name)
+
+    def name(self, iid):
+        return self._terms[self._names[iid]]
+
+    def uri(self, iid):
+        return self._terms[self._uri_pfx[iid]] + self._terms[self._names[iid]]
+
+    def types(self, iid):
+        t = self._terms
+        return [t[x] for x in self._type_col[self._type_off[iid]:self._type_off[iid + 1]]]
+
+    def assertions(self, iid):
+        t, a, b = self._terms, self._asr_off[iid], self._asr_off[iid + 1]
+        return [(t[p], t[o]) for p, o in zip(self._pred[a:b], self._obj[a:b])]
+
+    def entries(self, iid):
+        # (prop, value, kind) rows in the shape add() takes them
+        t, a, b = self._terms, self._asr_off[iid], self._asr_off[iid + 1]
+        return [(t[p], t[o], k) for p, o, k in
+                zip(self._pred[a:b], self._obj[a:b], self._kind[a:b])]
+
+    def value(self, iid, prop, default=None):
+        pid = self._term_ids.get(prop)
+        if pid is not None:
+            pred = self._pred
+            for row in range(self._asr_off[iid], self._asr_off[iid + 1]):
+                if pred[row] == pid:
+                    return self._terms[self._obj[row]]
+        return default
+
+    def object_ids(self, iid):
+        return self._obj[self._asr_off[iid]:self._asr_off[iid + 1]]
+
+    def ids(self):
+        return iter(self._index.values())
+
+    def rows(self):
+        return zip(self._subj, self._pred, self._obj)
+
+    def ref_rows(self):
+        return ((s, p, o) for s, p, o, k in
+                zip(self._subj, self._pred, self._obj, self._kind) if k == REF)
+
+    def id_count(self):
+        return len(self._names)
+
+    def view(self, iid):
+        return IndividualView(self, iid)
+
+    # ── Mapping protocol: name -> view ───────────────────────────────────
+    def __getitem__(self, name):
+        return IndividualView(self, self._index[name])
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    # The lookup dicts are derived data; rebuild them instead of pickling.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_term_ids"], state["_index"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        terms = self._terms
+        self._term_ids = dict(zip(terms, range(len(terms))))
+        self._index    = dict(zip(map(terms.__getitem__, self._names),
+                                  range(len(self._names))))
+        for iid in self.removed:
+            name = terms[self._names[iid]]
+            if self._index.get(name) == iid:
+                del self._index[name]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# PARSER
+# ─────────────────────────────────────────────────────────────────────────────
+def local(uri):
+    if not uri:
+        return ""
+    return uri.split("#")[-1] if "#" in uri else uri.split("/")[-1]
+
+T_CLASS    = f"{{{OWL_NS}}}Class"
+T_OBJPROP  = f"{{{OWL_NS}}}ObjectProperty"
+T_DATAPROP = f"{{{OWL_NS}}}DatatypeProperty"
+T_INDIV    = f"{{{OWL_NS}}}NamedIndividual"
+T_ONTOLOGY = f"{{{OWL_NS}}}Ontology"
+T_IMPORTS  = f"{{{OWL_NS}}}imports"
+A_ABOUT    = f"{{{RDF_NS}}}about"
+A_RES      = f"{{{RDF_NS}}}resource"
+A_DTYPE    = f"{{{RDF_NS}}}datatype"
+
+
+# File wrapper that reports (bytes_read, total_bytes) as iterparse pulls data,
+# hashing the bytes on the way through for the snapshot cache.
+class _ProgressReader:
+    def __init__(self, fh, total, progress):
+        self._fh, self._total, self._progress = fh, total, progress
+        self.pos  = 0
+        self.hash = hashlib.blake2b(digest_size=16)
+
+    def read(self, n=-1):
+        data = self._fh.read(n)
+        self.pos += len(data)
+        self.hash.update(data)
+        if self._progress:
+            self._progress(self.pos, self._total)
+        return data
+
+
+def parse_owl(path, progress=None):
+    return parse_file(path, progress)[0]
+
+
+def parse_file(path, progress=None):
+    # -> ((classes, sub_classes, obj_props, data_props, individuals),
+    #     owl:imports IRIs, (size, mtime_ns, digest) of the file as read)
+    with open(path, "rb") as fh:
+        st  = os.fstat(fh.fileno())
+        src = _ProgressReader(fh, st.st_size, progress)
+        parts, imports = _READERS.get(os.path.splitext(path)[1].lower(), parse_stream)(src)
+    return parts, imports, (st.st_size, st.st_mtime_ns, src.hash.hexdigest())
+
+
+def parse_stream(src):
+    # `src` is any binary file-like object holding an RDF/XML document.
+    classes     = {}
+    sub_classes = defaultdict(list)
+    obj_props   = {}
+    data_props  = {}
+    individuals = IndividualStore()
+    imports     = []
+    ns_prefix   = f"{{{NS}}}"
+
+    # Single streaming pass: only top-level blocks of rdf:RDF are consumed, and
+    # each one is cleared from the root as soon as it has been read, so peak
+    # memory is bounded by the largest block instead of the whole document.
+    root  = None
+    depth = 0
+    for event, el in ET.iterparse(src, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = el
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+        tag = el.tag
+        uri = el.get(A_ABOUT)
+
+        if tag == T_CLASS and uri:
+            n = local(uri)
+            classes[n] = {"uri": uri, "subClassOf": []}
+            for s in el.findall(f"{{{RDS_NS}}}subClassOf"):
+                p = s.get(A_RES)
+                if p:
+                    classes[n]["subClassOf"].append(local(p))
+                    sub_classes[local(p)].append(n)
+
+        elif tag == T_OBJPROP and uri:
+            d = el.find(f"{{{RDS_NS}}}domain")
+            r = el.find(f"{{{RDS_NS}}}range")
+            obj_props[local(uri)] = {
+                "domain": local(d.get(A_RES)) if d is not None else "—",
+                "range":  local(r.get(A_RES)) if r is not None else "—",
+            }
+
+        elif tag == T_DATAPROP and uri:
+            doms = [local(d.get(A_RES))
+                    for d in el.findall(f"{{{RDS_NS}}}domain")
+                    if d.get(A_RES)]
+            rng = el.find(f"{{{RDS_NS}}}range")
+            data_props[local(uri)] = {
+                "domains": doms,
+                "range": local(rng.get(A_RES)) if rng is not None else "—",
+            }
+
+        elif tag == T_INDIV and uri:
+            types      = []
+            assertions = []
+            for child in el:
+                ctag = child.tag
+                if ctag == f"{{{RDF_NS}}}type":
+                    r = child.get(A_RES)
+                    if r and OWL_NS not in r:
+                        types.append(local(r))
+                elif ctag.startswith(ns_prefix):
+                    prop = ctag[len(ns_prefix):]
+                    ref  = child.get(A_RES)
+                    val  = local(ref) if ref else (child.text or "").strip()
+                    if val:
+                        assertions.append((prop, val, REF if ref else
+                                           literal_kind(child.get(A_DTYPE))))
+            individuals.add(local(uri), uri, types, assertions)
+
+        elif tag == T_ONTOLOGY:
+            imports.extend(i.get(A_RES) for i in el.iter(T_IMPORTS) if i.get(A_RES))
+
+        root.clear()
+
+    individuals.decode(data_props)
+    return (classes, sub_classes, obj_props, data_props, individuals), imports
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# N-TRIPLES · TURTLE
+# ─────────────────────────────────────────────────────────────────────────────
+# Line-based RDF is turned into the same parts as parse_stream(): the readers
+# only tokenise, and _TripleSink applies the RDF/XML parser's rules to the
+# triples (owl:NamedIndividual subjects become individuals, only properties in
+# the ontology namespace are kept, blank nodes are ignored).
+XSD_NS = "http://www.w3.org/2001/XMLSchema#"
+
+RDF_TYPE       = f"{RDF_NS}type"
+RDFS_SUBCLASS  = f"{RDS_NS}subClassOf"
+RDFS_DOMAIN    = f"{RDS_NS}domain"
+RDFS_RANGE     = f"{RDS_NS}range"
+OWL_CLASS      = f"{OWL_NS}Class"
+OWL_OBJPROP    = f"{OWL_NS}ObjectProperty"
+OWL_DATAPROP   = f"{OWL_NS}DatatypeProperty"
+OWL_INDIVIDUAL = f"{OWL_NS}NamedIndividual"
+OWL_ONTOLOGY   = f"{OWL_NS}Ontology"
+OWL_IMPORTS    = f"{OWL_NS}imports"
+
+
+class RDFSyntaxError(ValueError):
+    pass
+
+
+def _individual_of(run):
+    # -> (types, rows) of an individual from its (predicate, object, literal)
+    # triples, with the same rules as the RDF/XML parser. `literal` is False
+    # for IRIs, True for plain literals or the datatype IRI of typed ones.
+    types, rows = [], []
+    for p, o, lit in run:
+        if p == RDF_TYPE:
+            if not lit and OWL_NS not in o and not o.startswith("_:"):
+                types.append(local(o))
+        elif p.startswith(NS) and (lit or not o.startswith("_:")):
+            val = o.strip() if lit else local(o)
+            if val:
+                rows.append((p[len(NS):], val, literal_kind(lit) if lit else REF))
+    return types, rows
+
+
+class _TripleSink:
+    # Collects (subject, predicate, object, literal) triples. The triples
+    # of one subject normally arrive together (N-Triples dumps are grouped by
+    # subject, Turtle by statement), so each run is settled when the subject
+    # changes: a newly declared individual goes straight into the store and
+    # everything else (schema, runs revisiting a subject, runs whose type
+    # comes later) waits in `later` for finish().
+    def __init__(self):
+        self.individuals = IndividualStore()
+        self.later = {}
+        self._subj = None
+        self._run  = []
+
+    def add(self, s, p, o, lit):
+        if s != self._subj:
+            self.flush()
+            self._subj = s
+        self._run.append((p, o, lit))
+
+    def flush(self):
+        s, run = self._subj, self._run
+        self._run = []
+        if not run or s.startswith("_:"):
+            return
+        if ((RDF_TYPE, OWL_INDIVIDUAL, False) in run and s not in self.later
+                and local(s) not in self.individuals):
+            self._individual(s, run)
+        else:
+            self.later.setdefault(s, []).extend(run)
+
+    def _individual(self, s, run):
+        self.individuals.add(local(s), s, *_individual_of(run))
+
+    def finish(self):
+        # -> ((classes, sub_classes, obj_props, data_props, individuals), imports)
+        self.flush()
+        classes, sub_classes, obj_props, data_props = {}, defaultdict(list), {}, {}
+        imports, extra = [], {}
+        store = self.individuals
+        for s, run in self.later.items():
+            kinds = {o for p, o, lit in run if p == RDF_TYPE and not lit}
+            objs  = lambda pred: [local(o) for p, o, lit in run
+                                  if p == pred and not lit and not o.startswith("_:")]
+            iid = store.id_of(local(s))
+            if iid is not None and store.uri(iid) == s:
+                extra[local(s)] = run
+            elif OWL_INDIVIDUAL in kinds:
+                self._individual(s, run)
+            if OWL_CLASS in kinds:
+                n = local(s)
+                classes[n] = {"uri": s, "subClassOf": objs(RDFS_SUBCLASS)}
+                for p in classes[n]["subClassOf"]:
+                    sub_classes[p].append(n)
+            if OWL_OBJPROP in kinds:
+                d, r = objs(RDFS_DOMAIN), objs(RDFS_RANGE)
+                obj_props[local(s)] = {"domain": d[0] if d else "—",
+                                       "range":  r[0] if r else "—"}
+            if OWL_DATAPROP in kinds:
+                r = objs(RDFS_RANGE)
+                data_props[local(s)] = {"domains": objs(RDFS_DOMAIN),
+                                        "range": r[0] if r else "—"}
+            if OWL_ONTOLOGY in kinds:
+                imports += [o for p, o, lit in run if p == OWL_IMPORTS and not lit]
+        if extra:
+            store = self._merge(store, extra)
+        store.decode(data_props)
+        return (classes, sub_classes, obj_props, data_props, store), imports
+
+    def _merge(self, store, extra):
+        # Folds runs that revisit an individual into its entry, keeping order.
+        out = IndividualStore()
+        for name in store:
+            iid = store.id_of(name)
+            types, rows = store.types(iid), store.entries(iid)
+            if name in extra:
+                more_types, more_rows = _individual_of(extra[name])
+                types += [t for t in more_types if t not in types]
+                rows  += [r for r in more_rows if r not in rows]
+            out.add(name, store.uri(iid), types, rows)
+        return out
+
+
+# ── N-Triples ────────────────────────────────────────────────────────────────
+_NT_ESC  = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))")
+_NT_CHAR = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f"}
+_NT_LINE = re.compile(r"""\s*(<[^>]*>|_:\S+)\s*(<[^>]*>)\s*
+                          (<[^>]*>|_:\S+|"(?:[^"\\]|\\.)*"(?:\^\^<[^>]*>|@[\w-]+)?)
+                          \s*\.\s*(?:\#.*)?$""", re.X)
+
+
+def _unescape(text):
+    if "\\" not in text:
+        return text
+    return _NT_ESC.sub(lambda m: chr(int(m.group(1) or m.group(2), 16)) if m.group(3) is None
+                       else _NT_CHAR.get(m.group(3), m.group(3)), text)
+
+
+def _nt_object(term):
+    # -> (value, literal); IRIs lose their <>, literals their quotes and
+    # language tag. `literal` is the datatype IRI of a typed literal.
+    if term[0] == "<":
+        return _unescape(term[1:-1]), False
+    if term[0] == '"':
+        end = term.rindex('"')
+        dt  = term[end + 1:]
+        return _unescape(term[1:end]), (_unescape(dt[3:-1]) if dt.startswith("^^<") else True)
+    return term, False
+
+
+def _nt_line(text, lineno):
+    # General form of one line (any spacing, blank subjects, comments).
+    # -> (s, p, o, literal), or None for blank and comment lines.
+    text = text.strip()
+    if not text or text[0] == "#":
+        return None
+    m = _NT_LINE.match(text)
+    if m is None:
+        raise RDFSyntaxError(f"line {lineno}: not an N-Triples statement: {text[:80]!r}")
+    s = m.group(1)
+    o, lit = _nt_object(m.group(3))
+    return (_unescape(s[1:-1]) if s[0] == "<" else s), _unescape(m.group(2)[1:-1]), o, lit
+
+
+# The canonical "<s> <p> <o> ." / "<s> <p> "lit"^^<dt> ." layout every dump
+# tool writes; a block of these is matched in one scan, the rest line by line.
+_NT_FAST = re.compile(r'<([^>\n]*)> <([^>\n]*)> (?:<([^>\n]*)>|"([^"\\\n]*(?:\\.[^"\\\n]*)*)"'
+                      r'(?:\^\^<([^>\n]*)>|@[A-Za-z]+(?:-[A-Za-z0-9]+)*)?) \.[ \t]*\r?\n')
+
+
+def _read_ntriples(src, sink, block=1 << 20):
+    add, tail, lineno = sink.add, b"", 1
+    while True:
+        data = src.read(block)
+        data = tail + data if data else tail + b"\n" if tail else b""
+        if not data:
+            return sink
+        cut  = data.rfind(b"\n") + 1
+        tail = data[cut:]
+        if not cut:
+            continue
+        text, pos = data[:cut].decode("utf-8"), 0
+        for m in _NT_FAST.finditer(text):
+            if m.start() != pos:
+                for n, line in enumerate(text[pos:m.start()].split("\n")[:-1]):
+                    t = _nt_line(line, lineno + text.count("\n", 0, pos) + n)
+                    if t is not None:
+                        add(*t)
+            pos = m.end()
+            subj, pred, iri, lit, dt = m.groups()
+            if iri is None:
+                add(_unescape(subj), _unescape(pred), _unescape(lit), dt or True)
+            else:
+                add(_unescape(subj), _unescape(pred), _unescape(iri), False)
+        for n, line in enumerate(text[pos:].split("\n")[:-1]):
+            t = _nt_line(line, lineno + text.count("\n", 0, pos) + n)
+            if t is not None:
+                add(*t)
+        lineno += text.count("\n")
+
+
+def parse_ntriples(src):
+    # `src` is any binary file-like object holding N-Triples.
+    return _read_ntriples(src, _TripleSink()).finish()
+
+
+def _ntriples_range(path, start, end):
+    # Worker: the individuals and pending runs of one byte range of a file.
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        sink = _read_ntriples(io.BytesIO(fh.read(end - start)), _TripleSink())
+    sink.flush()
+    return sink.individuals, sink.later
+
+
+def _subject_of(line):
+    return line.split(None, 1)[0] if line.strip() else b""
+
+
+def split_ntriples(path, pieces):
+    # -> byte offsets cutting the file into about `pieces` ranges, each cut
+    # placed where the subject changes so no run of triples is split.
+    size = os.path.getsize(path)
+    cuts = [0]
+    with open(path, "rb") as fh:
+        for k in range(1, pieces):
+            pos = max(cuts[-1], size * k // pieces)
+            fh.seek(pos)
+            if pos:
+                pos += len(fh.readline())
+            line = fh.readline()
+            subj = _subject_of(line)
+            while line:
+                nxt = fh.readline()
+                pos += len(line)
+                if not nxt or _subject_of(nxt) != subj:
+                    break
+                line = nxt
+            if pos < size and pos > cuts[-1]:
+                cuts.append(pos)
+    return cuts + [size]
+
+
+NT_SPLIT_BYTES = 32 << 20       # files this large are parsed by several processes
+
+
+def parse_ntriples_parallel(path, workers=None):
+    # -> (parts, imports), the same as parse_ntriples() on the whole file.
+    cuts = split_ntriples(path, workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = list(pool.map(_ntriples_range, [path] * (len(cuts) - 1),
+                               cuts[:-1], cuts[1:]))
+    sink = _TripleSink()
+    sink.individuals = merge_parts([({}, None, {}, {}, st) for st, _ in chunks])[4]
+    for _, later in chunks:
+        for s, run in later.items():
+            sink.later.setdefault(s, []).extend(run)
+    return sink.finish()
+
+
+# ── Turtle ───────────────────────────────────────────────────────────────────
+_TTL_TOKEN = re.compile(r'''
+    (?P<ws>(?:\s+|\#[^\n]*)+)
+  | (?P<iri><[^>\s]*>)
+  | (?P<long>"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!\'\'))*\'\'\')
+  | (?P<str>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<at>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+  | (?P<dt>\^\^)
+  | (?P<num>[+-]?(?:\d*\.\d+(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+|\d+))
+  | (?P<bnode>_:[\w-]+(?:\.[\w-]+)*)
+  | (?P<pname>(?:[A-Za-z][\w-]*(?:\.[\w-]+)*)?:(?:[\w:%-]+(?:\.[\w:%-]+)*)?)
+  | (?P<word>[A-Za-z]+)
+  | (?P<punct>[;,.\[\]()])
+''', re.X)
+
+
+class _TurtleParser:
+    # Recursive descent over the whole document's tokens, emitting triples to
+    # a _TripleSink one statement at a time (nested blank-node triples after
+    # the statement's own, so a subject's triples stay together).
+    def __init__(self, text, sink):
+        self.sink, self.prefixes, self.base = sink, {}, ""
+        self.toks, pos = [], 0
+        for m in _TTL_TOKEN.finditer(text):
+            if m.start() != pos:
+                break
+            pos = m.end()
+            if m.lastgroup != "ws":
+                self.toks.append((m.lastgroup, m.group(), m.start()))
+        if pos != len(text):
+            raise RDFSyntaxError(f"line {text.count(chr(10), 0, pos) + 1}: "
+                                 f"unexpected {text[pos:pos + 20]!r}")
+        self.text, self.i, self._blank = text, 0, 0
+
+    def error(self, what):
+        pos = self.toks[self.i][2] if self.i < len(self.toks) else len(self.text)
+        raise RDFSyntaxError(f"line {self.text.count(chr(10), 0, pos) + 1}: {what}")
+
+    def peek(self):
+        return self.toks[self.i][:2] if self.i < len(self.toks) else (None, None)
+
+    def take(self, value=None):
+        kind, tok = self.peek()
+        if kind is None or (value is not None and tok != value):
+            self.error(f"expected {value or 'a term'}, found {tok or 'end of file'!r}")
+        self.i += 1
+        return kind, tok
+
+    def parse(self):
+        while self.i < len(self.toks):
+            kind, tok = self.peek()
+            if tok in ("@prefix", "@base") or (kind == "word" and tok.upper() in ("PREFIX", "BASE")):
+                self.directive()
+                continue
+            self.out = []
+            self.triples()
+            self.take(".")
+            for t in sorted(self.out, key=lambda t: t[0].startswith("_:")):
+                self.sink.add(*t)
+        return self.sink
+
+    def directive(self):
+        _, tok = self.take()
+        if tok.lstrip("@").upper() == "PREFIX":
+            kind, name = self.take()
+            if kind != "pname" or not name.endswith(":"):
+                self.error(f"bad prefix name {name!r}")
+            self.prefixes[name[:-1]] = self.iri_ref(self.take()[1])
+        else:
+            self.base = self.iri_ref(self.take()[1])
+        if tok.startswith("@"):
+            self.take(".")
+
+    def iri_ref(self, tok):
+        if not tok.startswith("<"):
+            self.error(f"expected an IRI, found {tok!r}")
+        iri = _unescape(tok[1:-1])
+        return urljoin(self.base, iri) if self.base and ":" not in iri.split("/", 1)[0] else iri
+
+    def new_blank(self):
+        self._blank += 1
+        return f"_:b{self._blank}"
+
+    def triples(self):
+        kind, tok = self.peek()
+        if tok == "[":
+            subj = self.blank_list()
+            if self.peek()[1] != ".":
+                self.predicate_objects(subj)
+        else:
+            subj = self.term(subject=True)[0]
+            self.predicate_objects(subj)
+
+    def predicate_objects(self, subj):
+        while True:
+            kind, tok = self.take()
+            pred = RDF_TYPE if kind == "word" and tok == "a" else self.resolve(kind, tok)
+            while True:
+                obj, lit = self.term()
+                self.out.append((subj, pred, obj, lit))
+                if self.peek()[1] != ",":
+                    break
+                self.take(",")
+            if self.peek()[1] != ";":
+                return
+            while self.peek()[1] == ";":
+                self.take(";")
+            if self.peek()[1] in (".", "]", None):
+                return
+
+    def blank_list(self):
+        self.take("[")
+        node = self.new_blank()
+        if self.peek()[1] != "]":
+            self.predicate_objects(node)
+        self.take("]")
+        return node
+
+    def collection(self):
+        self.take("(")
+        head = prev = None
+        while self.peek()[1] != ")":
+            node = self.new_blank()
+            obj, lit = self.term()
+            self.out.append((node, f"{RDF_NS}first", obj, lit))
+            if prev is None:
+                head = node
+            else:
+                self.out.append((prev, f"{RDF_NS}rest", node, False))
+            prev = node
+        self.take(")")
+        if prev is not None:
+            self.out.append((prev, f"{RDF_NS}rest", f"{RDF_NS}nil", False))
+        return head or f"{RDF_NS}nil"
+
+    def resolve(self, kind, tok):
+        if kind == "iri":
+            return self.iri_ref(tok)
+        if kind == "pname":
+            pfx, _, name = tok.partition(":")
+            if pfx not in self.prefixes:
+                self.error(f"undefined prefix {pfx + ':'!r}")
+            return self.prefixes[pfx] + name
+        if kind == "bnode":
+            return tok
+        self.error(f"expected an IRI, found {tok!r}")
+
+    def term(self, subject=False):
+        # -> (value, literal) as _nt_object() gives them
+        kind, tok = self.peek()
+        if tok == "[" and not subject:
+            return self.blank_list(), False
+        if tok == "(":
+            return self.collection(), False
+        if kind in ("str", "long") and not subject:
+            self.take()
+            q = 3 if kind == "long" else 1
+            value = _unescape(tok[q:-q])
+            if self.peek()[1] == "^^":
+                self.take("^^")
+                return value, self.resolve(*self.take())
+            if self.peek()[0] == "at":
+                self.take()
+            return value, True
+        if kind == "num" and not subject:
+            self.take()
+            xsd = ("double" if "e" in tok.lower() else "decimal" if "." in tok else "integer")
+            return tok, XSD_NS + xsd
+        if kind == "word" and tok in ("true", "false") and not subject:
+            self.take()
+            return tok, XSD_NS + "boolean"
+        self.take()
+        return self.resolve(kind, tok), False
+
+
+def parse_turtle(src):
+    # `src` is any binary file-like object holding a Turtle document.
+    text = src.read().decode("utf-8")
+    return _TurtleParser(text, _TripleSink()).parse().finish()
+
+
+# File suffix -> reader; anything else is read as RDF/XML.
+_READERS = {".nt": parse_ntriples, ".ttl": parse_turtle}
+
+
+# ── Export ───────────────────────────────────────────────────────────────────
+def _nt_literal(text):
+    return ('"' + text.replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n").replace("\r", "\\r") + '"')
+
+
+def write_ntriples(out, classes, obj_props, data_props, individuals):
+    # Streams a model (or parse parts) to the text stream `out` as N-Triples,
+    # schema first, then one run of lines per individual, in the layout
+    # parse_ntriples() reads back into the same model. -> lines written
+    cls  = lambda c: f"<{classes[c]['uri'] if c in classes else NS + c}>"
+    xsd  = lambda r: f"<{XSD_NS}{r}>"
+    a    = f"<{RDF_TYPE}>"
+    lines = 0
+
+    for c, info in classes.items():
+        out.write(f"{cls(c)} {a} <{OWL_CLASS}> .\n")
+        for p in info["subClassOf"]:
+            out.write(f"{cls(c)} <{RDFS_SUBCLASS}> {cls(p)} .\n")
+        lines += 1 + len(info["subClassOf"])
+    for p, info in obj_props.items():
+        out.write(f"<{NS}{p}> {a} <{OWL_OBJPROP}> .\n")
+        for key, pred in (("domain", RDFS_DOMAIN), ("range", RDFS_RANGE)):
+            if info[key] != "—":
+                out.write(f"<{NS}{p}> <{pred}> {cls(info[key])} .\n")
+                lines += 1
+        lines += 1
+    for p, info in data_props.items():
+        out.write(f"<{NS}{p}> {a} <{OWL_DATAPROP}> .\n")
+        for d in info["domains"]:
+            out.write(f"<{NS}{p}> <{RDFS_DOMAIN}> {cls(d)} .\n")
+        if info["range"] != "—":
+            out.write(f"<{NS}{p}> <{RDFS_RANGE}> {xsd(info['range'])} .\n")
+            lines += 1
+        lines += 1 + len(info["domains"])
+
+    typed = {p: f"^^{xsd(info['range'])}" for p, info in data_props.items()
+             if info["range"] not in ("—", "string", "Literal")}
+    for name in individuals:
+        iid  = individuals.id_of(name)
+        subj = f"<{individuals.uri(iid)}>"
+        rows = [f"{subj} {a} <{OWL_INDIVIDUAL}> .\n"]
+        rows += [f"{subj} {a} {cls(t)} .\n" for t in individuals.types(iid)]
+        for p, v, kind in individuals.entries(iid):
+            if kind == REF:
+                oid = individuals.id_of(v)
+                obj = f"<{individuals.uri(oid) if oid is not None else NS + v}>"
+            elif kind != LIT:
+                obj = f"{_nt_literal(v)}^^{xsd(datatype_of(kind))}"
+            else:
+                obj = _nt_literal(v) + typed.get(p, "")
+            rows.append(f"{subj} <{NS}{p}> {obj} .\n")
+        out.write("".join(rows))
+        lines += len(rows)
+    return lines
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CLASS HIERARCHY
+# ─────────────────────────────────────────────────────────────────────────────
+# Grouping follows the schema: every root class (no rdfs:subClassOf) is a tab
+# named after its plural, and an individual lands in the tab of its most
+# specific asserted type.
+TAB_LABELS = {"Restaurant": "Restaurant"}       # where the plural reads wrong
+
+
+def plural(word):
+    if word.endswith(("s", "x", "z", "ch", "sh")):
+        return word + "es"
+    if word.endswith("y") and word[-2:-1] not in "aeiou":
+        return word[:-1] + "ies"
+    return word + "s"
+
+
+class ClassHierarchy:
+    # Transitive rdfs:subClassOf closure, computed once per schema.
+    #   ancestors[c]    c and every superclass, nearest first
+    #   descendants[c]  c and every subclass
+    #   priority        classes most specific first, then in declaration order
+    # Each class also owns a bit, so an inferred type set is a single int.
+    def __init__(self, classes):
+        parents = {c: list(info["subClassOf"]) for c, info in classes.items()}
+        for ps in list(parents.values()):
+            for p in ps:
+                parents.setdefault(p, [])
+        self.ancestors = {}
+        for c in parents:
+            seen, todo = [c], list(parents[c])
+            while todo:
+                p = todo.pop(0)
+                if p not in seen:
+                    seen.append(p)
+                    todo.extend(parents[p])
+            self.ancestors[c] = tuple(seen)
+        desc = defaultdict(list)
+        for c, anc in self.ancestors.items():
+            for a in anc:
+                desc[a].append(c)
+        self.descendants = {c: tuple(d) for c, d in desc.items()}
+        order = {c: i for i, c in enumerate(parents)}
+        self.priority = sorted(parents, key=lambda c: (-len(self.ancestors[c]), order[c]))
+        self.roots = [c for c in parents if not parents[c]]
+        self.tab   = {}
+        for c, anc in self.ancestors.items():
+            root = next((a for a in anc if not parents[a]), None)
+            if root is not None:
+                self.tab[c] = TAB_LABELS.get(root, plural(root))
+        self.tabs  = list(dict.fromkeys(self.tab[r] for r in self.roots))
+        self.bit   = {c: i for i, c in enumerate(parents)}
+        self._inferred = {}
+
+    def tab_of(self, cls):
+        return self.tab.get(cls, "Other")
+
+    def subclasses(self, cls):
+        return self.descendants.get(cls, (cls,))
+
+    def inferred(self, types):
+        # Asserted types -> (every class they imply, bitmask of those classes).
+        # Undeclared types get a bit of their own the first time they are seen.
+        key = tuple(types)
+        hit = self._inferred.get(key)
+        if hit is None:
+            out = []
+            for t in key:
+                for a in self.ancestors.get(t, (t,)):
+                    if a not in out:
+                        out.append(a)
+            mask = 0
+            for a in out:
+                b = self.bit.get(a)
+                if b is None:
+                    b = self.bit[a] = len(self.bit)
+                mask |= 1 << b
+            hit = self._inferred[key] = (tuple(out), mask)
+        return hit
+
+    def mask(self, classes):
+        out = 0
+        for c in classes:
+            b = self.bit.get(c)
+            if b is not None:
+                out |= 1 << b
+        return out
+
+
+def dominant_type(info, priority):
+    types = info["types"]
+    for p in priority:
+        if p in types:
+            return p
+    return types[0] if types else "Other"
+
+
+def group_of(info, hierarchy):
+    return hierarchy.tab_of(dominant_type(info, hierarchy.priority))
+
+
+def _group_key(individuals, name):
+    # The individual's own name breaks ties, so the order does not depend
+    # on where in the file (or in which reload) it was defined.
+    info  = individuals[name]
+    types = info["types"]
+    return (types[0] if types else "", info.value("name", name), name)
+
+
+def group_individuals(individuals, hierarchy):
+    groups = defaultdict(list)
+    keys   = {}
+    for name, info in individuals.items():
+        groups[group_of(info, hierarchy)].append(name)
+        keys[name] = _group_key(individuals, name)
+    for k in groups:
+        groups[k].sort(key=keys.__getitem__)
+    return groups
+
+
+def regroup(groups, individuals, name, hierarchy, old_group=None):
+    # Moves one renamed / retyped / new / deleted individual within `groups`,
+    # keeping each list in group_individuals() order.
+    if old_group is not None:
+        groups[old_group].remove(name)
+    if name not in individuals:
+        return
+    items = groups[group_of(individuals[name], hierarchy)]
+    key   = _group_key(individuals, name)
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _group_key(individuals, items[mid]) <= key:
+            lo = mid + 1
+        else:
+            hi = mid
+    items.insert(lo, name)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MULTI-FILE LOADING
+# ─────────────────────────────────────────────────────────────────────────────
+OWL_SUFFIXES = (".owl", ".rdf", ".nt", ".ttl")
+
+
+def owl_sources(paths):
+    # Files and directories (their OWL_SUFFIXES files) -> sorted absolute
+    # paths. The sort fixes the merge order, so results are reproducible.
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    out = set()
+    for p in paths:
+        if os.path.isdir(p):
+            out.update(os.path.join(p, f) for f in os.listdir(p)
+                       if f.lower().endswith(OWL_SUFFIXES))
+        else:
+            out.add(p)
+    return sorted(map(os.path.abspath, out))
+
+
+def resolve_import(iri, base):
+    # Only local files are followed: file: URLs, relative references, and
+    # IRIs whose last segment names a file next to the importing one.
+    here = os.path.dirname(base)
+    if iri.startswith("file:"):
+        cands = [url2pathname(urlsplit(iri).path)]
+    elif "://" not in iri:
+        cands = [os.path.join(here, iri)]
+    else:
+        name  = urlsplit(iri).path.rstrip("/").rsplit("/", 1)[-1]
+        cands = [os.path.join(here, name + ext) for ext in ("",) + OWL_SUFFIXES] if name else []
+    for c in cands:
+        if os.path.isfile(c):
+            return os.path.abspath(c)
+    return None
+
+
+def merge_parts(parts):
+    # Merges per-file parse results, given in load order. Schema entries keep
+    # their first definition, with subclass and domain lists unioned. An
+    # individual defined in several files gets the union of its types and
+    # relations; a literal property set by an earlier file is not overridden.
+    if len(parts) == 1:
+        return parts[0]
+    classes, obj_props, data_props = {}, {}, {}
+    owners = {}
+    for cl, _, op, dp, store in parts:
+        for n, info in cl.items():
+            cur = classes.setdefault(n, {"uri": info["uri"], "subClassOf": []})
+            cur["subClassOf"] += [c for c in info["subClassOf"] if c not in cur["subClassOf"]]
+        for n, info in op.items():
+            obj_props.setdefault(n, info)
+        for n, info in dp.items():
+            cur = data_props.setdefault(n, {"domains": [], "range": info["range"]})
+            cur["domains"] += [d for d in info["domains"] if d not in cur["domains"]]
+        for name in store:
+            owners.setdefault(name, []).append(store)
+    sub_classes = defaultdict(list)
+    for n, info in classes.items():
+        for c in info["subClassOf"]:
+            sub_classes[c].append(n)
+
+    merged = IndividualStore()
+    if len(owners) == sum(len(p[4]) for p in parts):
+        # No individual is split across files: concatenate the stores.
+        for p in parts:
+            merged.extend(p[4])
+    else:
+        for name, stores in owners.items():
+            first = stores[0]
+            iid   = first.id_of(name)
+            types, rows = first.types(iid), first.entries(iid)
+            for other in stores[1:]:
+                oid  = other.id_of(name)
+                lits = {p for p, _, k in rows if k != REF}
+                seen = set(rows)
+                types += [t for t in other.types(oid) if t not in types]
+                rows  += [r for r in other.entries(oid)
+                          if r not in seen and not (r[2] != REF and r[0] in lits)]
+            merged.add(name, first.uri(iid), types, rows)
+        for p in parts:
+            merged.diagnostics += [(merged.id_of(p[4].name(iid)), *rest)
+                                   for iid, *rest in p[4].diagnostics]
+    # Ranges declared in one file apply to literals of the others.
+    merged.decode(data_props)
+    return classes, sub_classes, obj_props, data_props, merged
+
+
+def parse_sources(paths, progress=None, workers=None):
+    # Parses the given files/directories plus every local owl:imports they
+    # reach. Files are parsed concurrently in a process pool (one file needs
+    # none) and merged in path order.
+    # -> (merged parts, {path: (size, mtime_ns, digest)}, unresolved IRIs)
+    todo = owl_sources(paths)
+    if not todo:
+        raise FileNotFoundError(f"no OWL/RDF files in {paths!r}")
+    seen, done, unresolved = set(todo), {}, []
+
+    def follow(path):
+        new = []
+        for iri in done[path][1]:
+            f = resolve_import(iri, path)
+            if f is None:
+                if iri not in unresolved:
+                    unresolved.append(iri)
+            elif f not in seen:
+                seen.add(f)
+                new.append(f)
+        return new
+
+    if len(todo) == 1:
+        path = todo.pop()
+        size = os.path.getsize(path)
+        if (path.lower().endswith(".nt") and size >= NT_SPLIT_BYTES
+                and (workers or os.cpu_count() or 1) > 1):
+            # One big N-Triples file is split between processes instead.
+            st = os.stat(path)
+            done[path] = (*parse_ntriples_parallel(path, workers),
+                          (st.st_size, st.st_mtime_ns, file_digest(path)))
+            if progress:
+                progress(size, size)
+        else:
+            done[path] = parse_file(path, progress)
+        todo = follow(path)
+    if todo:
+        total = sum(map(os.path.getsize, todo))
+        read  = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = {pool.submit(parse_file, p): p for p in todo}
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    path = running.pop(fut)
+                    done[path] = fut.result()
+                    read += done[path][2][0]
+                    for f in follow(path):
+                        total += os.path.getsize(f)
+                        running[pool.submit(parse_file, f)] = f
+                if progress:
+                    progress(read, total)
+
+    order = sorted(done)
+    return (merge_parts([done[p][0] for p in order]),
+            {p: done[p][2] for p in order}, unresolved)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# INDEXES
+# ─────────────────────────────────────────────────────────────────────────────
+_WORD = re.compile(r"\w+")
+
+# Smart Query prefixes that are shorthands for a numeric data property.
+NUMERIC_ALIASES = {"price": "price", "rating": "rating",
+                   "party": "partySize", "visits": "totalVisits"}
+
+_NAN   = float("nan")
+_NUM   = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_CMP   = re.compile(rf"^(<=|>=|<|>|=)?\s*({_NUM})$")
+_SPAN  = re.compile(rf"^({_NUM})\s*\.\.\s*({_NUM})$")
+
+
+def parse_range(expr):
+    # "<30", ">=4.5", "=4" (or "4"), "10..20"  ->  (lo, hi, lo_incl, hi_incl)
+    expr = expr.strip()
+    m = _SPAN.match(expr)
+    if m:
+        return float(m.group(1)), float(m.group(2)), True, True
+    m = _CMP.match(expr)
+    if not m:
+        return None
+    op, v = m.group(1) or "=", float(m.group(2))
+    return {"<":  (None, v, True, False), "<=": (None, v, True, True),
+            ">":  (v, None, False, True), ">=": (v, None, True, True),
+            "=":  (v, v, True, True)}[op]
+
+
+def doc_text(store, iid):
+    # The text a free-text term is matched against, lower-cased.
+    name = store.name(iid)
+    vals = [v.lower() for _, v in store.assertions(iid)]
+    return " ".join([name.lower(), store.value(iid, "name", name).lower()] + vals)
+
+
+class TextIndex:
+    # Inverted index over the lower-cased words of each individual's name and
+    # assertion values (the text Smart Query used to rebuild on every run).
+    # Postings are partitioned by asserted rdf:type, so a typed search such
+    # as dish:truffle only reads the Starter / MainCourse / Dessert postings.
+    _TERM_CACHE = 64
+
+    def __init__(self, store):
+        self._store = store
+        self._parts = {}
+        tok_cache = {}
+        for iid in store.ids():
+            self._add(iid, tok_cache)
+        self._init_caches()
+
+    def _add(self, iid, tok_cache):
+        store = self._store
+        terms = set(_WORD.findall(store.name(iid).lower()))
+        for tid in store.object_ids(iid):
+            toks = tok_cache.get(tid)
+            if toks is None:
+                toks = tok_cache[tid] = tuple(set(_WORD.findall(store.term(tid).lower())))
+            terms.update(toks)
+        for t in set(store.types(iid)) or ("",):
+            part = self._parts.setdefault(t, {})
+            for term in terms:
+                post = part.get(term)
+                if post is None:
+                    post = part[term] = array("I")
+                post.append(iid)
+
+    def add(self, ids):
+        # New ids are larger than any indexed one, so postings stay sorted.
+        # Tombstoned ids stay in their postings and are dropped from results.
+        tok_cache = {}
+        for iid in ids:
+            self._add(iid, tok_cache)
+        self._init_caches()
+
+    def _init_caches(self):
+        self._vocab = {}
+        self._hits  = {}
+        self._lock  = threading.Lock()     # searches run on several threads
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_vocab"], state["_hits"], state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_caches()
+
+    def doc_text(self, iid):
+        return doc_text(self._store, iid)
+
+    def members(self, types):
+        out = set()
+        for t in types:
+            for post in self._parts.get(t, {}).values():
+                out.update(post)
+        return out - self._store.removed
+
+    def _terms_containing(self, part_key, word):
+        # Substring match against the partition's vocabulary, one str.find
+        # sweep over a newline-joined copy instead of a Python loop per term.
+        vocab = self._vocab.get(part_key)
+        if vocab is None:
+            vocab = self._vocab[part_key] = "\n" + "\n".join(self._parts[part_key]) + "\n"
+        out, pos = [], vocab.find(word)
+        while pos != -1:
+            start = vocab.rfind("\n", 0, pos) + 1
+            end   = vocab.find("\n", pos)
+            out.append(vocab[start:end])
+            pos = vocab.find(word, end)
+        return out
+
+    def _containing(self, word, parts):
+        key  = (word, parts)
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = set()
+            for pk in parts:
+                part = self._parts[pk]
+                for term in self._terms_containing(pk, word):
+                    hits.update(part[term])
+            with self._lock:
+                if len(self._hits) >= self._TERM_CACHE:
+                    self._hits.pop(next(iter(self._hits)), None)
+                self._hits[key] = hits
+        return hits
+
+    def _parts_for(self, types):
+        return tuple(t for t in (types if types is not None else self._parts)
+                     if t in self._parts)
+
+    def estimate(self, kw, types=None):
+        # Upper bound on the hit count from posting lengths alone.
+        parts = self._parts_for(types)
+        words = _WORD.findall(kw)
+        if not words:
+            return sum(len(p) for pk in parts for p in self._parts[pk].values())
+        w = max(words, key=len)
+        return sum(len(self._parts[pk][t])
+                   for pk in parts for t in self._terms_containing(pk, w))
+
+    def search(self, kw, types=None, check=None):
+        # Same semantics as `kw in doc_text(iid)`; returns sorted ids.
+        # `check` is called between steps and may raise to abandon the search.
+        parts = self._parts_for(types)
+        words = _WORD.findall(kw)
+        if not words:
+            cands = set()
+            for pk in parts:
+                for post in self._parts[pk].values():
+                    cands.update(post)
+            cands -= self._store.removed
+            if kw:
+                cands = self._verify(kw, cands, check)
+            return sorted(cands)
+        cands = None
+        for w in sorted(set(words), key=len, reverse=True):
+            if check:
+                check()
+            hits  = self._containing(w, parts)
+            cands = hits - self._store.removed if cands is None else cands & hits
+            if not cands:
+                return []
+        if len(words) > 1 or words[0] != kw:
+            cands = self._verify(kw, cands, check)
+        return sorted(cands)
+
+    def _verify(self, kw, cands, check):
+        out = set()
+        for n, i in enumerate(cands):
+            if check and not n & 0xFFF:
+                check()
+            if kw in self.doc_text(i):
+                out.add(i)
+        return out
+
+
+_BYTE_BITS = tuple(tuple(i for i in range(8) if b >> i & 1) for b in range(256))
+
+
+def bitmap_ids(bits):
+    # Int bitmap -> ascending list of the positions of its set bits.
+    out = []
+    for k, b in enumerate(bits.to_bytes((bits.bit_length() + 7) >> 3, "little")):
+        if b:
+            base = k << 3
+            out.extend(base + i for i in _BYTE_BITS[b])
+    return out
+
+
+class TypeIndex:
+    # Class -> membership bitmap over individual ids (bit i set: individual i
+    # is an instance), filled through the subclass closure so a HeadChef is
+    # also a Chef. "All Chefs or Menus" is one OR of two ints.
+    def __init__(self, store, hierarchy):
+        self._store    = store
+        self.hierarchy = hierarchy
+        self.members   = {}
+        self.add(store.ids())
+
+    def add(self, ids):
+        # Bits go into one bytearray per class first, then in as one int.
+        store, size = self._store, (self._store.id_count() + 7) >> 3
+        inferred = self.hierarchy.inferred
+        buf = {}
+        for iid in ids:
+            for c in inferred(store.types(iid))[0]:
+                ba = buf.get(c)
+                if ba is None:
+                    ba = buf[c] = bytearray(size)
+                ba[iid >> 3] |= 1 << (iid & 7)
+        for c, ba in buf.items():
+            self.members[c] = self.members.get(c, 0) | int.from_bytes(ba, "little")
+
+    def remove(self, ids):
+        gone = 0
+        for iid in ids:
+            gone |= 1 << iid
+        for c, bits in self.members.items():
+            self.members[c] = bits & ~gone
+
+    def bits(self, types):
+        out = 0
+        for t in types:
+            out |= self.members.get(t, 0)
+        return out
+
+    def count(self, types):
+        return bin(self.bits(types)).count("1")
+
+    def ids(self, types):
+        return set(bitmap_ids(self.bits(types)))
+
+    def has(self, iid, types):
+        # Per-id test against the individual's inferred type set.
+        inferred = self.hierarchy.inferred(self._store.types(iid))[1]
+        return bool(inferred & self.hierarchy.mask(types))
+
+
+class NumericIndex:
+    # One sorted (value, id) column per numeric or boolean data property, so a
+    # range predicate is two binary searches plus a slice of the id column.
+    # Booleans are stored as 0.0 / 1.0. Values come decoded from the store.
+    # A property the ontology does not declare (a keyword's isVegan on some
+    # other ontology) reads as an empty column, as it does in SQL.
+    _NO_COLUMN = (array("d"), array("I"))
+
+    def __init__(self, store, data_props):
+        self._store = store
+        props = {store.term_id(p): (p, info["range"]) for p, info in data_props.items()
+                 if (info.get("range") in XSD_NUMERIC or info.get("range") == "boolean")
+                 and store.term_id(p) is not None}
+        pairs = {p: [] for p, _ in props.values()}
+        self.kinds = dict(props.values())
+        for subj, pred, x, k in store.typed_rows():
+            pk = props.get(pred)
+            if pk is not None and k in NUMBER_KINDS:
+                pairs[pk[0]].append((x, subj))
+        self.columns = {}
+        for p, col in pairs.items():
+            col.sort()
+            self.columns[p] = (array("d", (v for v, _ in col)),
+                               array("I", (i for _, i in col)))
+        self._lower = {p.lower(): p for p in self.columns}
+        self._file  = None
+        self._dense = {}
+
+    # A snapshot keeps the columns in its column file, not in the pickle;
+    # load_snapshot() attaches them again.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["columns"], state["_file"], state["_dense"] = {}, None, {}
+        return state
+
+    def attach(self, cols):
+        # Serve the columns straight from a mapped ColumnFile.
+        self._file   = cols
+        self.columns = {p: cols.sorted(p) for p in self._lower.values()}
+        self._dense  = {}
+
+    def add(self, ids):
+        # Sorted inserts; fine for the handful of individuals a reload touches.
+        self._dense = {}
+        for iid in ids:
+            for p, v in self._store.typed(iid):
+                col = self.columns.get(p)
+                if col is None or not isinstance(v, (int, float)):
+                    continue
+                x = float(v)
+                if isinstance(col[0], memoryview):
+                    # First change to a mapped column: take a private copy.
+                    col = self.columns[p] = (array("d", col[0]), array("I", col[1]))
+                k = bisect_right(col[0], x)
+                col[0].insert(k, x)
+                col[1].insert(k, iid)
+
+    def resolve(self, field):
+        # Query field (lower-cased) -> property name, or None.
+        prop = NUMERIC_ALIASES.get(field, field)
+        return self._lower.get(prop.lower())
+
+    def _bounds(self, prop, lo, hi, lo_incl, hi_incl):
+        values, _ = self.columns.get(prop, self._NO_COLUMN)
+        a = 0 if lo is None else (bisect_left(values, lo) if lo_incl
+                                  else bisect_right(values, lo))
+        b = len(values) if hi is None else (bisect_right(values, hi) if hi_incl
+                                            else bisect_left(values, hi))
+        return a, max(a, b)
+
+    def count(self, prop, lo=None, hi=None, lo_incl=True, hi_incl=True):
+        a, b = self._bounds(prop, lo, hi, lo_incl, hi_incl)
+        return b - a
+
+    def range(self, prop, lo=None, hi=None, lo_incl=True, hi_incl=True):
+        a, b = self._bounds(prop, lo, hi, lo_incl, hi_incl)
+        ids  = self.columns.get(prop, self._NO_COLUMN)[1][a:b]
+        dead = self._store.removed
+        return [i for i in ids if i not in dead] if dead else ids
+
+    def values(self, prop, ids):
+        # -> one float per id of `ids`, NaN where it has no value (the largest
+        # where it has several). The sorted column is scattered once into a
+        # dense per-id column, kept until the index changes.
+        dense = self._dense.get(prop)
+        if dense is None:
+            vals, sids = self.columns.get(prop, self._NO_COLUMN)
+            n = self._store.id_count()
+            if _numpy() is not None:
+                dense = np.full(n, np.nan)
+                if len(sids):
+                    order = np.argsort(np.asarray(sids), kind="stable")
+                    sids  = np.asarray(sids, dtype=np.intp)[order]
+                    last  = np.append(sids[1:] != sids[:-1], True)
+                    dense[sids[last]] = np.asarray(vals)[order][last]
+            else:
+                dense = array("d", [_NAN]) * n
+                for v, i in zip(vals, sids):
+                    dense[i] = v
+            self._dense[prop] = dense
+        if _numpy() is not None:
+            return dense[np.asarray(ids, dtype=np.intp)]
+        return array("d", map(dense.__getitem__, ids))
+
+
+def _csr(n, key, preds, ends):
+    # Counting sort of the edge columns by `key` -> (offsets, preds, ends).
+    off = array("I", bytes(4 * (n + 1)))
+    for k in key:
+        off[k + 1] += 1
+    for i in range(n):
+        off[i + 1] += off[i]
+    cur   = array("I", off[:n])
+    p_out = array("I", bytes(4 * len(key)))
+    e_out = array("I", bytes(4 * len(key)))
+    for row, k in enumerate(key):
+        pos = cur[k]
+        cur[k] = pos + 1
+        p_out[pos] = preds[row]
+        e_out[pos] = ends[row]
+    return off, p_out, e_out
+
+
+class Adjacency:
+    # Object-property edges between individuals in CSR form, both ways:
+    # forward (subject -> [(prop, object)]) and reverse (object -> [(prop,
+    # subject)]). Built together from the store's reference rows, so the two
+    # directions always describe the same edge set. Edges added by a live
+    # reload go to small per-id overflow lists; edges touching a tombstoned
+    # id are skipped when read. References to names that are not (or no
+    # longer) individuals wait in `_dangling` until one appears.
+    def __init__(self, store):
+        self._store = store
+        src, pred, dst = array("I"), array("I"), array("I")
+        target = {}
+        self._dangling = defaultdict(list)
+        for s_, p_, o_ in store.ref_rows():
+            d = target.get(o_)
+            if d is None:
+                d = target[o_] = store.id_of(store.term(o_))
+                if d is None:
+                    d = target[o_] = -1
+            if d >= 0:
+                src.append(s_)
+                pred.append(p_)
+                dst.append(d)
+            else:
+                self._dangling[o_].append((s_, p_))
+        n = store.id_count()
+        self._fwd = _csr(n, src, pred, dst)
+        self._rev = _csr(n, dst, pred, src)
+        self._fwd_x = defaultdict(list)
+        self._rev_x = defaultdict(list)
+
+    def _link(self, s_, p_, d):
+        self._fwd_x[s_].append((p_, d))
+        self._rev_x[d].append((p_, s_))
+
+    def remove(self, iid):
+        # Call after the store has tombstoned `iid`: live references to its
+        # name go back to waiting for an individual of that name.
+        name = self._store.term_id(self._store.name(iid))
+        for p, s_ in self._edges(self._rev, self._rev_x, iid):
+            self._dangling[name].append((s_, self._store.term_id(p)))
+
+    def add(self, iid):
+        st = self._store
+        for p, o, k in st.entries(iid):
+            if k != REF:
+                continue
+            p_, d = st.term_id(p), st.id_of(o)
+            if d is None:
+                self._dangling[st.term_id(o)].append((iid, p_))
+            else:
+                self._link(iid, p_, d)
+        for s_, p_ in self._dangling.pop(st.term_id(st.name(iid)), ()):
+            if s_ not in st.removed:
+                self._link(s_, p_, iid)
+
+    @staticmethod
+    def _slice(csr, iid):
+        off, preds, ends = csr
+        if iid + 1 >= len(off):
+            return (), ()
+        a, b = off[iid], off[iid + 1]
+        return preds[a:b], ends[a:b]
+
+    def _edges(self, csr, extra, iid):
+        term, dead = self._store.term, self._store.removed
+        out = [(term(p), e) for p, e in zip(*self._slice(csr, iid)) if e not in dead]
+        if iid in extra:
+            out += [(term(p), e) for p, e in extra[iid] if e not in dead]
+        return out
+
+    def outgoing(self, iid):
+        return self._edges(self._fwd, self._fwd_x, iid)
+
+    def incoming(self, iid):
+        return self._edges(self._rev, self._rev_x, iid)
+
+    def step(self, ids, prop=None, forward=True, backward=True):
+        # Individuals one edge away from `ids` (optionally via one property).
+        pid = self._store.term_id(prop) if prop else None
+        if prop and pid is None:
+            return set()
+        out = set()
+        for csr, extra, on in ((self._fwd, self._fwd_x, forward),
+                               (self._rev, self._rev_x, backward)):
+            if not on:
+                continue
+            for iid in ids:
+                preds, ends = self._slice(csr, iid)
+                if pid is None:
+                    out.update(ends)
+                else:
+                    out.update(e for p, e in zip(preds, ends) if p == pid)
+                if extra and iid in extra:
+                    out.update(e for p, e in extra[iid] if pid is None or p == pid)
+        return out - self._store.removed
+
+    def related(self, ids, prop):
+        # (id, other) for every `prop` edge between one of `ids` and another
+        # individual, in either direction.
+        pid, dead, out = self._store.term_id(prop), self._store.removed, []
+        if pid is None:
+            return out
+        for csr, extra in ((self._fwd, self._fwd_x), (self._rev, self._rev_x)):
+            for iid in ids:
+                out += [(iid, e) for p, e in zip(*self._slice(csr, iid))
+                        if p == pid and e not in dead]
+                if iid in extra:
+                    out += [(iid, e) for p, e in extra[iid] if p == pid and e not in dead]
+        return out
+
+    def linked(self, iid):
+        # Ids one edge away from `iid`, either direction, repeats possible.
+        dead = self._store.removed
+        out  = []
+        for csr, extra in ((self._fwd, self._fwd_x), (self._rev, self._rev_x)):
+            out.extend(self._slice(csr, iid)[1])
+            if iid in extra:
+                out.extend(e for _, e in extra[iid])
+        return [e for e in out if e not in dead] if dead else out
+
+
+# Bookings: individuals with a reservationDate, which they occupy with
+# partySize covers, confirmed or pending (anything not confirmed).
+BOOKING_TIME, BOOKING_COVERS, BOOKING_CONFIRMED = "reservationDate", "partySize", "confirmed"
+SLOT_SECONDS = {"hour": 3600, "day": 86400}
+_TIME_KINDS  = frozenset(_KIND[dt] for dt in XSD_TIME)
+_INF         = float("inf")
+_WHEN        = re.compile(r"(\d{4})(?:-(\d\d)(?:-(\d\d)(?:[tT ](\d\d):(\d\d))?)?)?")
+
+
+def _period(text):
+    # "2025", "2025-03", "2025-03-01" or "2025-03-01T19:30" -> (start, end)
+    # in seconds since 1970 UTC of the year, month, day or minute it names
+    m = _WHEN.fullmatch(text.strip())
+    if m is None:
+        raise ValueError(f"not a year, month, day or time: {text.strip()!r}")
+    y, mo, d, h, mi = (None if g is None else int(g) for g in m.groups())
+    try:
+        if mo is None:
+            start = datetime(y, 1, 1, tzinfo=timezone.utc)
+            end   = datetime(y + 1, 1, 1, tzinfo=timezone.utc)
+        elif d is None:
+            start = datetime(y, mo, 1, tzinfo=timezone.utc)
+            end   = datetime(y + mo // 12, mo % 12 + 1, 1, tzinfo=timezone.utc)
+        else:
+            start = datetime(y, mo, d, h or 0, mi or 0, tzinfo=timezone.utc)
+            end   = start + (timedelta(days=1) if h is None else timedelta(minutes=1))
+    except ValueError:
+        raise ValueError(f"no such date: {text.strip()!r}") from None
+    return (start - _EPOCH).total_seconds(), (end - _EPOCH).total_seconds()
+
+
+def parse_window(text):
+    # "2025-03-01..2025-03-07" (both ends included; either may be left out)
+    # or a single year, month, day or time -> (lo, hi) seconds, half-open, None
+    # for an open end. ValueError when it is none of these.
+    a, dots, b = text.partition("..")
+    if not dots:
+        return _period(text)
+    return (_period(a)[0] if a.strip() else None,
+            _period(b)[1] if b.strip() else None)
+
+
+def booking_entries(store, ids):
+    # -> (time, id, covers, confirmed 0/1) of each booking among `ids`, from
+    # the first decoded value of each property (tombstoned ids included).
+    out = []
+    for iid in ids:
+        t = covers = conf = None
+        for (p, _, k), x in zip(store.entries(iid), store.numbers(iid)):
+            if x is None:
+                continue
+            if p == BOOKING_TIME and t is None and k in _TIME_KINDS:
+                t = x
+            elif p == BOOKING_COVERS and covers is None and k in NUMBER_KINDS:
+                covers = x
+            elif p == BOOKING_CONFIRMED and conf is None and k == _KIND["boolean"]:
+                conf = x
+        if t is not None:
+            out.append((t, iid, covers or 0.0, 1 if conf else 0))
+    return out
+
+
+def _whole(x):
+    return int(x) if x.is_integer() else x
+
+
+class TimeIndex:
+    # Bookings sorted by time, with running totals along that order of
+    # confirmed bookings, covers and confirmed covers. The bookings and
+    # covers of any window are then two binary searches and a subtraction,
+    # however many bookings it holds, and a date: query is one slice. A live
+    # reload adds to two small sorted lists, bookings added since the build
+    # and built ones since removed, that every answer corrects for; they are
+    # folded back in by a rebuild once they grow past COMPACT.
+    COMPACT = 256
+
+    def __init__(self, store):
+        self._store = store
+        self._fill(self._scan())
+
+    def _scan(self):
+        tid = self._store.term_id
+        pt, pc, pf = tid(BOOKING_TIME), tid(BOOKING_COVERS), tid(BOOKING_CONFIRMED)
+        when, covers, conf = {}, {}, {}
+        if pt is not None:
+            for s, p, x, k in self._store.typed_rows():
+                if p == pt and k in _TIME_KINDS:
+                    when.setdefault(s, x)
+                elif p == pc and k in NUMBER_KINDS:
+                    covers.setdefault(s, x)
+                elif p == pf and k == _KIND["boolean"]:
+                    conf.setdefault(s, x)
+        dead = self._store.removed
+        return sorted((t, s, covers.get(s, 0.0), 1 if conf.get(s) else 0)
+                      for s, t in when.items() if s not in dead)
+
+    def _fill(self, entries):
+        self.times = array("d", (e[0] for e in entries))
+        self.ids   = array("I", (e[1] for e in entries))
+        self._conf, self._covers, self._conf_covers = (array("d", [0.0]) for _ in range(3))
+        n = c = cc = 0.0
+        for _, _, covers, f in entries:
+            n, c, cc = n + f, c + covers, cc + covers * f
+            self._conf.append(n)
+            self._covers.append(c)
+            self._conf_covers.append(cc)
+        self._extra, self._dead = [], []
+
+    def add(self, ids):
+        for e in booking_entries(self._store, ids):
+            insort(self._extra, e)
+        self._compact()
+
+    def remove(self, ids):
+        # Call with ids the store has just tombstoned.
+        for e in booking_entries(self._store, ids):
+            k = bisect_left(self._extra, e)
+            if k < len(self._extra) and self._extra[k] == e:
+                del self._extra[k]
+            else:
+                insort(self._dead, e)
+        self._compact()
+
+    def _compact(self):
+        if len(self._extra) + len(self._dead) > self.COMPACT:
+            self._fill(self._scan())
+
+    def _prefix(self, t):
+        # -> [bookings, confirmed, covers, confirmed covers] before time t
+        p   = bisect_left(self.times, t)
+        out = [p, self._conf[p], self._covers[p], self._conf_covers[p]]
+        for sign, entries in ((1, self._extra), (-1, self._dead)):
+            for _, _, covers, f in entries[:bisect_left(entries, (t,))]:
+                out[0] += sign
+                out[1] += sign * f
+                out[2] += sign * covers
+                out[3] += sign * covers * f
+        return out
+
+    def __len__(self):
+        return len(self.times) + len(self._extra) - len(self._dead)
+
+    def bounds(self):
+        # -> (first, last) booking time, or None without bookings
+        ids, dead = self.ids, self._store.removed
+        live = range(len(ids))
+        ends = [self.times[k] for k in (next((k for k in live if ids[k] not in dead), None),
+                                        next((k for k in reversed(live) if ids[k] not in dead), None))
+                if k is not None]
+        ends += [e[0] for e in self._extra[:1] + self._extra[-1:]]
+        return (min(ends), max(ends)) if ends else None
+
+    def count(self, lo=None, hi=None):
+        return int(self._prefix(_INF if hi is None else hi)[0]
+                   - self._prefix(-_INF if lo is None else lo)[0])
+
+    def occupancy(self, lo=None, hi=None):
+        # -> (confirmed, pending, confirmed covers, pending covers) in [lo, hi)
+        a = self._prefix(-_INF if lo is None else lo)
+        b = self._prefix(_INF if hi is None else hi)
+        n, f, c, cf = (y - x for x, y in zip(a, b))
+        return int(f), int(n - f), _whole(cf), _whole(c - cf)
+
+    def slots(self, start, step, n):
+        # -> [(slot start, occupancy)] for n consecutive slots of `step` seconds
+        edges = [self._prefix(start + k * step) for k in range(n + 1)]
+        out = []
+        for k in range(n):
+            b, f, c, cf = (y - x for x, y in zip(edges[k], edges[k + 1]))
+            out.append((start + k * step, (int(f), int(b - f), _whole(cf), _whole(c - cf))))
+        return out
+
+    def range(self, lo=None, hi=None):
+        # -> ids of the bookings in [lo, hi), in time order
+        lo, hi = -_INF if lo is None else lo, _INF if hi is None else hi
+        times, ids, dead = self.times, self.ids, self._store.removed
+        a, b  = bisect_left(times, lo), bisect_left(times, hi)
+        extra = self._extra[bisect_left(self._extra, (lo,)):bisect_left(self._extra, (hi,))]
+        if extra:
+            base = ((t, i) for t, i in zip(times[a:b], ids[a:b]) if i not in dead)
+            return [i for _, i in heapq.merge(base, ((e[0], e[1]) for e in extra))]
+        return [i for i in ids[a:b] if i not in dead] if dead else list(ids[a:b])
+
+    def time_of(self, iid):
+        entry = booking_entries(self._store, (iid,))
+        return entry[0][0] if entry else None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# GRAPH TRAVERSAL
+# ─────────────────────────────────────────────────────────────────────────────
+# Breadth-first walks over the object-property graph, following edges in both
+# directions. Visited sets are bitmaps with one bit per individual id, so a
+# walk costs n/8 bytes per side however much of the graph it reaches; parents
+# are kept only for the ids actually visited. Any adjacency with linked(),
+# outgoing() and incoming() works (in-memory CSR or the SQLite store).
+def _visit(bits, iid):
+    # Sets iid's bit; true when it was not set before.
+    byte, bit = iid >> 3, 1 << (iid & 7)
+    if bits[byte] & bit:
+        return False
+    bits[byte] |= bit
+    return True
+
+
+def neighbourhood(adjacency, store, iid, hops=2, check=None, limit=None):
+    # -> [[ids 1 edge away], [ids 2 edges away], …] up to `hops` levels,
+    # each id listed once at its shortest distance; `iid` itself excluded.
+    # With `limit`, the walk stops once more than `limit` ids are reached:
+    # the last level is then partial and the levels hold limit + 1 ids.
+    seen = bytearray((store.id_count() >> 3) + 1)
+    _visit(seen, iid)
+    levels, frontier, reached = [], [iid], 0
+    for _ in range(hops):
+        nxt = []
+        for u in frontier:
+            nxt.extend(v for v in adjacency.linked(u) if _visit(seen, v))
+            if limit is not None and reached + len(nxt) > limit:
+                del nxt[limit + 1 - reached:]
+                levels.append(nxt)
+                return levels
+        if not nxt:
+            break
+        reached += len(nxt)
+        if check is not None:
+            check()
+        levels.append(nxt)
+        frontier = nxt
+    return levels
+
+
+def shortest_path(adjacency, store, a, b, max_hops=None, check=None):
+    # -> ids on a shortest relation path a … b (both included), or None.
+    # Bidirectional: each round grows whichever side has the smaller
+    # frontier by one full level. A meeting found while growing a level is
+    # always at the current depth of both sides, so the first one is optimal.
+    if a == b:
+        return [a]
+    size = (store.id_count() >> 3) + 1
+    seen = (bytearray(size), bytearray(size))
+    parent = ({a: None}, {b: None})
+    frontier = ([a], [b])
+    _visit(seen[0], a)
+    _visit(seen[1], b)
+    hops = 0
+    while frontier[0] and frontier[1]:
+        if max_hops is not None and hops >= max_hops:
+            return None
+        side  = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+        mine, other, up = seen[side], seen[1 - side], parent[side]
+        nxt = []
+        for u in frontier[side]:
+            for v in adjacency.linked(u):
+                if not _visit(mine, v):
+                    continue
+                up[v] = u
+                if other[v >> 3] & (1 << (v & 7)):
+                    return _join_path(parent, v)
+                nxt.append(v)
+        if check is not None:
+            check()
+        frontier = (nxt, frontier[1]) if side == 0 else (frontier[0], nxt)
+        hops += 1
+    return None
+
+
+def _join_path(parent, meet):
+    head, v = [], meet
+    while v is not None:
+        head.append(v)
+        v = parent[0][v]
+    head.reverse()
+    v = parent[1][meet]
+    while v is not None:
+        head.append(v)
+        v = parent[1][v]
+    return head
+
+
+def path_steps(adjacency, path):
+    # -> [(from, prop, to, forward)] naming one edge per hop of `path`;
+    # forward is false when the edge points from `to` back to `from`.
+    steps = []
+    for u, v in zip(path, path[1:]):
+        prop = next((p for p, o in adjacency.outgoing(u) if o == v), None)
+        if prop is not None:
+            steps.append((u, prop, v, True))
+        else:
+            steps.append((u, next(p for p, s in adjacency.incoming(u) if s == v), v, False))
+    return steps
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# QUERY LANGUAGE
+# ─────────────────────────────────────────────────────────────────────────────
+#   query := or ("->" target)* ;  or := and ("OR" and)* ;
+#   and := not (["AND"] not)* ;  not := "NOT" not | "(" query ")" | term
+# A term is a prefixed filter (dish:, chef:, price:<30 …), a keyword (vegan,
+# vip, …), a "quoted phrase" or bare words (free text). Bare words that follow
+# a term are folded into it, so `dish:black truffle` keeps its old meaning.
+# Operators are upper-case so that lower-case "and"/"or" stay searchable text.
+# `-> target` hops to related individuals of a tab, class or object property:
+#   ingredient:truffle -> dishes -> menus
+# `path:a->b` lists a shortest chain of relations between two individuals
+# and `near:a` (or `near:a:3`) everything within two (three) edges of one:
+#   path:LaylaHassan->MichelinStar2024      near:ChefSofia:1
+# `date:` keeps the bookings of a day, month or year, or of a window between
+# two of them, in time order:  date:2025-03   date:2025-03-01..2025-03-07
+# `query | aggregates` summarises the matches instead (see AGGREGATES).
+class QuerySyntaxError(ValueError):
+    pass
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+# Filtering a candidate set per id beats materialising an index lookup when
+# the lookup is expected to be this many times larger than the candidates.
+FILTER_RATIO = 4
+
+# Typed text prefixes -> the class whose instances (subclasses included) they
+# search.
+TEXT_PREFIXES = {"dish": "Dish", "award": "Award", "ingredient": "Ingredient"}
+
+
+class _Node:
+    _est = None
+
+    def estimate(self, eng):
+        if self._est is None:
+            self._est = self._estimate(eng)
+        return self._est
+
+    def within(self, eng, cands):
+        if self.estimate(eng) > FILTER_RATIO * len(cands):
+            return eng.filter(cands, self.test)
+        return cands & self.evaluate(eng)
+
+    def arrange(self, ids):
+        # Result order for a whole query; by id unless the node has its own.
+        return sorted(ids)
+
+
+class Text(_Node):
+    def __init__(self, kw, types=None):
+        self.kw, self.types = kw, types
+
+    def _estimate(self, eng):
+        return eng.text_index.estimate(self.kw, self.types)
+
+    def evaluate(self, eng):
+        return set(eng.text_index.search(self.kw, self.types, eng.check))
+
+    def test(self, eng, iid):
+        if self.types is not None and not set(self.types) & set(eng.store.types(iid)):
+            return False
+        return self.kw in eng.text_index.doc_text(iid)
+
+    def __repr__(self):
+        return f"Text({self.kw!r}, {self.types})" if self.types else f"Text({self.kw!r})"
+
+
+class Range(_Node):
+    def __init__(self, prop, lo, hi, lo_incl=True, hi_incl=True):
+        self.prop, self.bounds = prop, (lo, hi, lo_incl, hi_incl)
+
+    def _estimate(self, eng):
+        return eng.num_index.count(self.prop, *self.bounds)
+
+    def evaluate(self, eng):
+        return set(eng.num_index.range(self.prop, *self.bounds))
+
+    def test(self, eng, iid):
+        lo, hi, lo_incl, hi_incl = self.bounds
+        for p, x in eng.store.typed(iid):
+            if p != self.prop or not isinstance(x, (int, float)):
+                continue
+            if ((lo is None or x > lo or (lo_incl and x == lo)) and
+                    (hi is None or x < hi or (hi_incl and x == hi))):
+                return True
+        return False
+
+    def __repr__(self):
+        return f"Range({self.prop}, {self.bounds})"
+
+
+class TypeIs(_Node):
+    def __init__(self, types):
+        self.types = tuple(types)
+
+    def _estimate(self, eng):
+        return eng.type_index.count(self.types)
+
+    def evaluate(self, eng):
+        return eng.type_index.ids(self.types)
+
+    def test(self, eng, iid):
+        return eng.type_index.has(iid, self.types)
+
+    def __repr__(self):
+        return f"TypeIs{self.types}"
+
+
+class ChefOf(_Node):
+    # Dishes whose preparedBy chef's name contains kw: matching chefs come
+    # from the text index, their dishes from the reverse preparedBy edges.
+    _ids = None
+
+    def __init__(self, kw):
+        self.kw = kw
+
+    def _estimate(self, eng):
+        return len(self.evaluate(eng))
+
+    def evaluate(self, eng):
+        if self._ids is None:
+            st    = eng.store
+            chefs = [c for c in eng.text_index.search(self.kw, check=eng.check)
+                     if self.kw in st.value(c, "name", "").lower()]
+            dishes = eng.type_index.ids(("Dish",))
+            self._ids = eng.adjacency.step(chefs, "preparedBy", forward=False) & dishes
+        return set(self._ids)
+
+    def test(self, eng, iid):
+        return iid in self.evaluate(eng)
+
+    def __repr__(self):
+        return f"ChefOf({self.kw!r})"
+
+
+class Join(_Node):
+    # `source -> target`: individuals of the target tab / type that are one
+    # object-property edge (either direction) away from the source set.
+    # A target that names an object property follows only that property.
+    _ids = None
+
+    def __init__(self, source, target):
+        self.source, self.target = source, target
+
+    def _estimate(self, eng):
+        return len(self.evaluate(eng))
+
+    def evaluate(self, eng):
+        if self._ids is None:
+            src  = self.source.evaluate(eng)
+            eng.check()
+            prop = eng.resolve_prop(self.target)
+            if prop:
+                self._ids = eng.adjacency.step(src, prop)
+            else:
+                self._ids = (eng.adjacency.step(src) &
+                             eng.type_index.ids(eng.types_for(self.target)))
+        return set(self._ids)
+
+    def test(self, eng, iid):
+        return iid in self.evaluate(eng)
+
+    def __repr__(self):
+        return f"Join({self.source!r} -> {self.target})"
+
+
+class Path(_Node):
+    # `path:a->b`: the individuals on a shortest relation path from a to b,
+    # listed in path order rather than by id.
+    _path = None
+
+    def __init__(self, src, dst):
+        self.src, self.dst = src, dst
+
+    def _estimate(self, eng):
+        return len(self.evaluate(eng))
+
+    def evaluate(self, eng):
+        if self._path is None:
+            self._path = shortest_path(eng.adjacency, eng.store, self.src, self.dst,
+                                       check=eng.check) or []
+        return set(self._path)
+
+    def arrange(self, ids):
+        return [i for i in self._path if i in ids]
+
+    def test(self, eng, iid):
+        return iid in self.evaluate(eng)
+
+    def __repr__(self):
+        return f"Path({self.src} -> {self.dst})"
+
+
+class Near(_Node):
+    # `near:a` / `near:a:3`: individuals within k edges of a (default 2),
+    # nearest first.
+    _rank = None
+
+    def __init__(self, iid, hops):
+        self.iid, self.hops = iid, hops
+
+    def _estimate(self, eng):
+        return len(self.evaluate(eng))
+
+    def evaluate(self, eng):
+        if self._rank is None:
+            levels = neighbourhood(eng.adjacency, eng.store, self.iid, self.hops, eng.check)
+            self._rank = {i: d for d, ids in enumerate(levels) for i in ids}
+        return set(self._rank)
+
+    def arrange(self, ids):
+        return sorted(ids, key=lambda i: (self._rank[i], i))
+
+    def test(self, eng, iid):
+        return iid in self.evaluate(eng)
+
+    def __repr__(self):
+        return f"Near({self.iid}, {self.hops})"
+
+
+class During(_Node):
+    # `date:2025-03-01..2025-03-07`: bookings in a window, in time order.
+    _seq = None
+
+    def __init__(self, lo, hi):
+        self.lo, self.hi = lo, hi
+
+    def _estimate(self, eng):
+        return eng.time_index.count(self.lo, self.hi)
+
+    def evaluate(self, eng):
+        if self._seq is None:
+            self._seq = eng.time_index.range(self.lo, self.hi)
+        return set(self._seq)
+
+    def arrange(self, ids):
+        return [i for i in self._seq if i in ids]
+
+    def test(self, eng, iid):
+        t = eng.time_index.time_of(iid)
+        return (t is not None and (self.lo is None or t >= self.lo)
+                and (self.hi is None or t < self.hi))
+
+    def __repr__(self):
+        return f"During({self.lo}, {self.hi})"
+
+
+class And(_Node):
+    def __init__(self, kids):
+        self.kids = kids
+
+    def _estimate(self, eng):
+        pos = [k.estimate(eng) for k in self.kids if not isinstance(k, Not)]
+        return min(pos) if pos else eng.size()
+
+    def evaluate(self, eng):
+        # Most selective positive term first; every other term only narrows
+        # the running candidate set (by index intersection or per-id test).
+        kids  = sorted(self.kids, key=lambda k: k.estimate(eng))
+        pos   = [k for k in kids if not isinstance(k, Not)]
+        neg   = [k.kid for k in kids if isinstance(k, Not)]
+        cands = pos[0].evaluate(eng) if pos else eng.universe()
+        for k in pos[1:]:
+            if not cands:
+                break
+            eng.check()
+            cands = k.within(eng, cands)
+        for k in neg:
+            if not cands:
+                break
+            eng.check()
+            cands = cands - k.within(eng, cands)
+        return cands
+
+    def within(self, eng, cands):
+        for k in sorted(self.kids, key=lambda k: k.estimate(eng)):
+            cands = k.within(eng, cands)
+        return cands
+
+    def test(self, eng, iid):
+        return all(k.test(eng, iid) for k in self.kids)
+
+    def __repr__(self):
+        return f"And({', '.join(map(repr, self.kids))})"
+
+
+class Or(_Node):
+    def __init__(self, kids):
+        self.kids = kids
+
+    def _estimate(self, eng):
+        return min(eng.size(), sum(k.estimate(eng) for k in self.kids))
+
+    def evaluate(self, eng):
+        out = set()
+        for k in self.kids:
+            eng.check()
+            out |= k.evaluate(eng)
+        return out
+
+    def within(self, eng, cands):
+        out = set()
+        for k in self.kids:
+            out |= k.within(eng, cands - out)
+        return out
+
+    def test(self, eng, iid):
+        return any(k.test(eng, iid) for k in self.kids)
+
+    def __repr__(self):
+        return f"Or({', '.join(map(repr, self.kids))})"
+
+
+class Not(_Node):
+    def __init__(self, kid):
+        self.kid = kid
+
+    def _estimate(self, eng):
+        return max(0, eng.size() - self.kid.estimate(eng))
+
+    def evaluate(self, eng):
+        return eng.universe() - self.kid.evaluate(eng)
+
+    def within(self, eng, cands):
+        return cands - self.kid.within(eng, cands)
+
+    def test(self, eng, iid):
+        return not self.kid.test(eng, iid)
+
+    def __repr__(self):
+        return f"Not({self.kid!r})"
+
+
+KEYWORDS = {
+    "vegan":     lambda: Range("isVegan", 1.0, 1.0),
+    "vip":       lambda: TypeIs(("VIPCustomer",)),
+    "seasonal":  lambda: And([TypeIs(("Ingredient",)), Range("seasonal", 1.0, 1.0)]),
+    "confirmed": lambda: And([TypeIs(("Reservation",)), Range("confirmed", 1.0, 1.0)]),
+    "pending":   lambda: And([TypeIs(("Reservation",)), Range("confirmed", 0.0, 0.0)]),
+}
+
+_QTOKEN = re.compile(r'\s*(\(|\)|->|"[^"]*"?|(?:(?!->)[^\s()"])+)')
+_OPS    = ("AND", "OR", "NOT", "->")
+
+
+class _Parser:
+    def __init__(self, eng, text):
+        self.eng  = eng
+        self.toks = _QTOKEN.findall(text)
+        self.pos  = 0
+
+    def peek(self):
+        return self.toks[self.pos] if self.pos < len(self.toks) else None
+
+    def take(self):
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        node = self.parse_query()
+        if self.peek() is not None:
+            raise QuerySyntaxError(f"unexpected {self.peek()!r}")
+        return node
+
+    def parse_query(self):
+        # Left to right: `A -> dishes AND price:<30` filters the hop result.
+        node = self.parse_or()
+        while self.peek() not in (None, ")"):
+            tok = self.take()
+            if tok == "->":
+                target = self.take()
+                if target is None or not (self.eng.resolve_prop(target)
+                                          or self.eng.types_for(target)):
+                    raise QuerySyntaxError(f"-> expects a tab, class or object property, "
+                                           f"not {target or 'end of query'!r}")
+                node = Join(node, target)
+            elif tok == "OR":
+                node = Or([node, self.parse_and()])
+            else:
+                if tok != "AND":
+                    self.pos -= 1
+                node = And([node, self.parse_and()])
+        return node
+
+    def parse_or(self):
+        kids = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            kids.append(self.parse_and())
+        return kids[0] if len(kids) == 1 else Or(kids)
+
+    def parse_and(self):
+        kids = [self.parse_not()]
+        while self.peek() not in (None, ")", "OR", "->"):
+            if self.peek() == "AND":
+                self.take()
+            kids.append(self.parse_not())
+        return kids[0] if len(kids) == 1 else And(kids)
+
+    def parse_not(self):
+        tok = self.peek()
+        if tok == "NOT":
+            self.take()
+            return Not(self.parse_not())
+        if tok == "(":
+            self.take()
+            node = self.parse_query()
+            if self.take() != ")":
+                raise QuerySyntaxError("missing ')'")
+            return node
+        if tok is None or tok in (")", "AND", "OR", "->"):
+            raise QuerySyntaxError(f"expected a term before {tok or 'end of query'!r}")
+        return self.parse_term()
+
+    def _is_field(self, word):
+        field, sep, _ = word.partition(":")
+        return bool(sep) and (field in TEXT_PREFIXES or field in GRAPH_FIELDS
+                              or field in ("chef", "type")
+                              or (field == "date" and self.eng.time_index is not None)
+                              or self.eng.num_index.resolve(field) is not None)
+
+    def _bare_word(self, tok):
+        return (tok is not None and tok not in ("(", ")") and tok not in _OPS
+                and not tok.startswith('"') and tok.lower() not in KEYWORDS
+                and not self._is_field(tok.lower()))
+
+    def _absorb(self, first):
+        words = [first] if first else []
+        while self._bare_word(self.peek()):
+            words.append(self.take().lower())
+        return " ".join(words)
+
+    def parse_term(self):
+        tok = self.take()
+        if tok.startswith('"'):
+            return Text(tok.strip('"').lower())
+        word = tok.lower()
+        if word in KEYWORDS:
+            return KEYWORDS[word]()
+        if not self._is_field(word):
+            return Text(self._absorb(word))
+        field, _, value = word.partition(":")
+        if field in GRAPH_FIELDS:
+            # Individual names are case-sensitive, so read them from `tok`.
+            return getattr(self, "parse_" + field)(tok.partition(":")[2])
+        if field == "type":
+            types = self.eng.types_for(value) if value else None
+            if not types:
+                raise QuerySyntaxError(f"type: expects a tab or class name, not {value!r}")
+            return TypeIs(types)
+        if field == "date":
+            try:
+                return During(*parse_window(value))
+            except ValueError:
+                raise QuerySyntaxError("date: expects a day, month, year or window, "
+                                       "as in date:2025-03-01..2025-03-07") from None
+        value = self._absorb(value)
+        if field in TEXT_PREFIXES:
+            return Text(value, self.eng.type_index.hierarchy.subclasses(TEXT_PREFIXES[field]))
+        if field == "chef":
+            return ChefOf(value)
+        prop = self.eng.num_index.resolve(field)
+        rng  = parse_range(value)
+        if rng is None:
+            raise QuerySyntaxError(f"{field}: expects <n, >n, <=n, >=n, =n or a..b")
+        return Range(prop, *rng)
+
+
+    def _individual(self, field, name):
+        iid = self.eng.store.id_of(name) if name else None
+        if iid is None:
+            raise QuerySyntaxError(f"{field}: no individual named {name or '…'!r}")
+        return iid
+
+    def parse_path(self, value):
+        if self.peek() != "->":
+            raise QuerySyntaxError("path: expects two individuals, as in path:a->b")
+        self.take()
+        return Path(self._individual("path", value), self._individual("path", self.take()))
+
+    def parse_near(self, value):
+        name, _, hops = value.rpartition(":") if value.count(":") else (value, "", "2")
+        if not hops.isdigit() or not 1 <= int(hops) <= 6:
+            raise QuerySyntaxError("near: takes a distance of 1 to 6, as in near:a:2")
+        return Near(self._individual("near", name), int(hops))
+
+
+GRAPH_FIELDS = ("path", "near")
+
+
+class QueryEngine:
+    def __init__(self, store, text_index, num_index, type_index, adjacency, obj_props,
+                 data_props=None, time_index=None):
+        self.store      = store
+        self.text_index = text_index
+        self.num_index  = num_index
+        self.type_index = type_index
+        self.adjacency  = adjacency
+        self.time_index = time_index
+        self.data_props = data_props or {}
+        self._props     = {p.lower(): p for p in obj_props}
+        self._data      = {p.lower(): p for p in self.data_props}
+
+    @classmethod
+    def from_model(cls, m):
+        return cls(m["individuals"], m["text_index"], m["num_index"],
+                   m["type_index"], m["adjacency"], m["obj_props"], m["data_props"],
+                   m.get("time_index"))
+
+    def resolve_prop(self, name):
+        return self._props.get(name.lower())
+
+    def resolve_data(self, name):
+        return self._data.get(name.lower())
+
+    def types_for(self, target):
+        # Tab name ("chefs") -> its root class(es); class name ("chef") ->
+        # that class. Membership includes subclasses either way.
+        t, h = target.lower(), self.type_index.hierarchy
+        tab  = [c for c in h.roots if h.tab_of(c).lower() == t]
+        return tab or [c for c in h.bit if c.lower() == t]
+
+    def size(self):
+        return len(self.store)
+
+    def universe(self):
+        return set(self.store.ids())
+
+    cancelled = None
+
+    def check(self):
+        if self.cancelled is not None and self.cancelled():
+            raise QueryCancelled()
+
+    def filter(self, ids, test):
+        out = set()
+        for n, i in enumerate(ids):
+            if not n & 0xFFF:
+                self.check()
+            if test(self, i):
+                out.add(i)
+        return out
+
+    def compile(self, text):
+        if not text.strip():
+            return None
+        return _Parser(self, text).parse()
+
+    def run(self, text, cancelled=None):
+        # -> the matching ids, or a Table for `query | aggregates` (an empty
+        # query then stands for every individual). `cancelled()` is polled
+        # during evaluation; when it returns true the run stops with
+        # QueryCancelled. Each run works on a shallow copy so concurrent runs
+        # on other threads do not share the flag.
+        with TIMER.phase("query") as ph:
+            text, spec = split_pipe(text)
+            plan = self.compile(text)
+            agg  = Aggregation(self, spec) if spec is not None else None
+            if plan is None and agg is None:
+                return []
+            eng = copy.copy(self)
+            eng.cancelled = cancelled
+            ids = plan.arrange(plan.evaluate(eng)) if plan else sorted(eng.universe())
+            if agg is not None:
+                ids = agg.evaluate(eng, ids)
+            ph.items = len(ids)
+            return ids
+
+
+class QueryWorker:
+    # Runs queries on one daemon thread. Submitting a new query supersedes
+    # the previous one: it is skipped if not started yet and cancelled at
+    # its next check point otherwise. Results are (gen, ids or Table, error)
+    # tuples on `results` for the UI thread to collect.
+    def __init__(self, engine):
+        self.engine  = engine
+        self.results = queue.Queue()
+        self._jobs   = queue.Queue()
+        self._gen    = 0
+        threading.Thread(target=self._loop, name="query-worker", daemon=True).start()
+
+    def submit(self, text):
+        self._gen += 1
+        self._jobs.put((self._gen, text))
+        return self._gen
+
+    def cancel(self):
+        # Abandon whatever is queued or running, e.g. before the model changes.
+        self._gen += 1
+
+    def _loop(self):
+        while True:
+            gen, text = self._jobs.get()
+            if gen != self._gen:
+                continue
+            try:
+                ids = self.engine.run(text, cancelled=lambda g=gen: g != self._gen)
+            except QueryCancelled:
+                continue
+            except QuerySyntaxError as exc:
+                self.results.put((gen, None, exc))
+            except Exception as exc:
+                # A query that raced a model update is stale anyway. Any other
+                # failure is reported too: ending the thread would leave the
+                # UI waiting on this query and every later one.
+                if gen != self._gen:
+                    continue
+                self.results.put((gen, None, exc))
+            else:
+                self.results.put((gen, ids, None))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# AGGREGATES
+# ─────────────────────────────────────────────────────────────────────────────
+# `query | aggregate, … [by key]` summarises a query's matches as a table:
+#   dish: | count, avg rating by type        type:reservation | count by reservationDate:day
+#   dish: | sum price by includes            type:customer | avg visits, p90 visits by type
+# An aggregate is `count` or sum, avg, min, max, median or pNN (percentile,
+# interpolated) of a numeric or boolean property. The key is `type` (each
+# individual's dominant type), a data property (dates bucketed with :hour,
+# :day, :week, :month or :year) or an object property, grouping by the
+# individuals related through it either way, so one match may count in
+# several groups. Matches without a key value form a group shown as "—".
+#
+# Each key is factorised once into small integer group codes, and every
+# property into an id-aligned float column (NaN where there is no value) by
+# the numeric index; the reductions then run over those packed columns, with
+# NumPy (bincount, one lexsort per property) when it is installed and over
+# plain arrays otherwise. Both paths give the same numbers.
+AGG_FUNCS = ("count", "sum", "avg", "min", "max", "median")
+_PCT      = re.compile(r"p(\d\d?)")
+_AGG_BY   = re.compile(r"(.*?)(?:\s+by\s+(\S+))?\s*", re.I | re.S)
+
+BUCKETS = {
+    "hour":  lambda d: f"{d:%Y-%m-%d %H}:00",
+    "day":   lambda d: f"{d:%Y-%m-%d}",
+    "week":  lambda d: "{}-W{:02d}".format(*d.isocalendar()[:2]),
+    "month": lambda d: f"{d:%Y-%m}",
+    "year":  lambda d: f"{d:%Y}",
+}
+
+
+def split_pipe(text):
+    # -> (query, aggregate spec or None), split at the first "|" outside quotes
+    quoted = False
+    for k, ch in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == "|" and not quoted:
+            return text[:k], text[k + 1:]
+    return text, None
+
+
+def cell_text(v):
+    # Table value -> display text; "—" for no value.
+    if v is None:
+        return "—"
+    if isinstance(v, float):
+        return f"{v:,.0f}" if v.is_integer() else f"{v:,.2f}"
+    if isinstance(v, int) and not isinstance(v, bool):
+        return f"{v:,}"
+    return str(v)
+
+
+def _key_order(v):
+    return (v is None, isinstance(v, str), 0 if v is None else v)
+
+
+def _key_label(v, bucket):
+    if isinstance(v, datetime):
+        return BUCKETS[bucket](v) if bucket else f"{v:%Y-%m-%d %H:%M}"
+    if hasattr(v, "isoformat"):
+        return BUCKETS[bucket](v) if bucket else v.isoformat()
+    return v
+
+
+class Table:
+    # An aggregate result: column names, then one row of values per group
+    # in key order; when `keyed`, the group key is the first column.
+    def __init__(self, columns, rows, keyed=False):
+        self.columns = columns
+        self.rows    = rows
+        self.keyed   = keyed
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __repr__(self):
+        return f"<Table {self.columns} × {len(self.rows)}>"
+
+
+def _reduce_np(codes, n, values, fns):
+    # NumPy path of _reduce(): codes and values are equal-length ndarrays.
+    ok = ~np.isnan(values)
+    codes, values = codes[ok], values[ok]
+    count = np.bincount(codes, minlength=n)
+    have  = count > 0
+    out   = {}
+    if {"sum", "avg"} & fns:
+        total = np.bincount(codes, weights=values, minlength=n)
+        out["sum"] = total
+        out["avg"] = total / np.maximum(count, 1)
+    if fns - {"sum", "avg"} and len(values):
+        values = values[np.lexsort((values, codes))]
+        start  = np.cumsum(count) - count
+        last   = np.minimum(start + np.maximum(count - 1, 0), len(values) - 1)
+        out["min"], out["max"] = values[np.minimum(start, len(values) - 1)], values[last]
+        for fn in fns:
+            q = _quantile(fn)
+            if q is not None:
+                h  = (count - 1) * q
+                lo = np.floor(np.maximum(h, 0)).astype(np.intp)
+                hi = np.minimum(lo + 1, np.maximum(count - 1, 0))
+                at = lambda k: values[np.minimum(start + k, len(values) - 1)]
+                out[fn] = at(lo) + (h - lo) * (at(hi) - at(lo))
+    return {fn: [float(x) if c else None for x, c in zip(col.tolist(), have.tolist())]
+            for fn, col in out.items()}
+
+
+def _reduce_py(codes, n, values, fns):
+    # Same as _reduce_np() over plain sequences, summing in the same order.
+    count, total = [0] * n, [0.0] * n
+    groups = [[] for _ in range(n)]
+    for c, x in zip(codes, values):
+        if x == x:
+            count[c] += 1
+            total[c] += x
+            groups[c].append(x)
+    out = {"sum": total, "avg": [t / max(k, 1) for t, k in zip(total, count)]}
+    if fns - {"sum", "avg"}:
+        for g in groups:
+            g.sort()
+        out["min"] = [g[0] if g else 0.0 for g in groups]
+        out["max"] = [g[-1] if g else 0.0 for g in groups]
+        for fn in fns:
+            q = _quantile(fn)
+            if q is not None:
+                col = out[fn] = []
+                for g in groups:
+                    h  = (len(g) - 1) * q
+                    lo = int(h) if g else 0
+                    hi = min(lo + 1, len(g) - 1)
+                    col.append(g[lo] + (h - lo) * (g[hi] - g[lo]) if g else 0.0)
+    return {fn: [x if c else None for x, c in zip(out[fn], count)] for fn in fns}
+
+
+def _quantile(fn):
+    if fn == "median":
+        return 0.5
+    m = _PCT.fullmatch(fn)
+    return int(m.group(1)) / 100 if m else None
+
+
+def _reduce(codes, n, values, fns):
+    # -> {fn: one value per group code, None for a group without values}
+    fns = set(fns)
+    if _numpy() is None:
+        return _reduce_py(codes, n, values, fns)
+    out = _reduce_np(np.asarray(codes, dtype=np.intp), n,
+                     np.asarray(values, dtype=float), fns)
+    return {fn: out.get(fn, [None] * n) for fn in fns}
+
+
+def _factorize(eng, keys, relabel=None):
+    # -> (group code per key, label per code). `relabel` maps each distinct
+    # key to its label once, merging keys that share one.
+    index, labels, codes = {}, [], array("I")
+    for k, key in enumerate(keys):
+        if not k & 0xFFF:
+            eng.check()
+        c = index.get(key)
+        if c is None:
+            c = index[key] = len(labels)
+            labels.append(key)
+        codes.append(c)
+    if relabel is not None:
+        merged = {}
+        remap  = array("I", (merged.setdefault(relabel(key), len(merged)) for key in labels))
+        codes  = array("I", map(remap.__getitem__, codes))
+        labels = list(merged)
+    return codes, labels
+
+
+class Aggregation:
+    # The parsed `| …` part of a query; evaluate() turns matches into a Table.
+    def __init__(self, eng, spec):
+        head, key = _AGG_BY.fullmatch(spec.strip()).groups()
+        self.aggs = []                  # (fn, property or None)
+        for part in head.split(","):
+            words = part.split()
+            fn = words[0].lower() if words else ""
+            if fn not in AGG_FUNCS and not _PCT.fullmatch(fn):
+                raise QuerySyntaxError(f"unknown aggregate {part.strip() or '…'!r}; use count, "
+                                       f"sum, avg, min, max, median or p90")
+            if fn == "count":
+                if len(words) > 1:
+                    raise QuerySyntaxError("count takes no property")
+                self.aggs.append((fn, None))
+                continue
+            prop = eng.num_index.resolve(words[1].lower()) if len(words) == 2 else None
+            if prop is None:
+                raise QuerySyntaxError(f"{fn} expects a numeric property, as in {fn} price")
+            self.aggs.append((fn, prop))
+
+        self.key = self.related = self.bucket = None
+        self.key_name = None
+        if key is not None:
+            name, _, bucket = key.partition(":")
+            if name.lower() == "type":
+                self.key = self.key_name = "type"
+            elif eng.resolve_prop(name):
+                self.related = self.key = eng.resolve_prop(name)
+            elif eng.resolve_data(name):
+                self.key = eng.resolve_data(name)
+            else:
+                raise QuerySyntaxError(f"by expects type, a data property or an object "
+                                       f"property, not {name!r}")
+            if bucket:
+                rng = eng.data_props.get(self.key, {}).get("range")
+                if self.related or rng not in XSD_TIME or bucket.lower() not in BUCKETS:
+                    raise QuerySyntaxError(f"by {name}:{bucket}: only date properties take "
+                                           f":hour, :day, :week, :month or :year")
+                self.bucket = bucket.lower()
+            self.key_name = self.key + (f":{self.bucket}" if self.bucket else "")
+
+    def _groups(self, eng, ids):
+        # -> (position in `ids` per grouped row or None for one row per id,
+        #     group code per row, label per code)
+        st = eng.store
+        if self.key is None:
+            return None, array("I", bytes(4 * len(ids))), [None]
+        if self.related:
+            at, pos, keys = {iid: k for k, iid in enumerate(ids)}, array("I"), []
+            seen = bytearray(len(ids))
+            for iid, other in eng.adjacency.related(ids, self.related):
+                pos.append(at[iid])
+                keys.append(other)
+                seen[at[iid]] = 1
+            lonely = [k for k in range(len(ids)) if not seen[k]]
+            pos.extend(lonely)
+            keys += [None] * len(lonely)
+            codes, labels = _factorize(eng, keys)
+            return pos, codes, [None if o is None else st.name(o) for o in labels]
+        if self.key == "type":
+            priority = eng.type_index.hierarchy.priority
+            return (None, *_factorize(eng, (tuple(st.types(i)) for i in ids),
+                                      lambda t: dominant_type({"types": t}, priority)))
+        return (None, *_factorize(eng, (st.literal(i, self.key) for i in ids),
+                                  lambda v: _key_label(v, self.bucket)))
+
+    def evaluate(self, eng, ids):
+        with TIMER.phase("query.aggregate", len(ids)):
+            ids = list(ids)
+            pos, codes, labels = self._groups(eng, ids)
+            n, cols = len(labels), {}
+            for prop in {p for _, p in self.aggs if p is not None}:
+                eng.check()
+                values = eng.num_index.values(prop, ids)
+                if pos is not None:
+                    values = (np.asarray(values)[np.asarray(pos, dtype=np.intp)]
+                              if _numpy() is not None
+                              else array("d", map(values.__getitem__, pos)))
+                cols[prop] = _reduce(codes, n, values,
+                                     {fn for fn, p in self.aggs if p == prop})
+            count = [0] * n
+            if _numpy() is not None:
+                count = np.bincount(np.asarray(codes, dtype=np.intp), minlength=n).tolist()
+            else:
+                for c in codes:
+                    count[c] += 1
+            columns = [fn if p is None else f"{fn} {p}" for fn, p in self.aggs]
+            rows = [[count[c] if p is None else cols[p][fn][c] for fn, p in self.aggs]
+                    for c in range(n)]
+            if self.key is None:
+                return Table(columns, [tuple(rows[0])])
+            order = sorted(range(n), key=lambda c: _key_order(labels[c]))
+            return Table([self.key_name] + columns,
+                         [(labels[c], *rows[c]) for c in order], keyed=True)
+
+
+# Bookings and covers per hour or day of a window (the whole booking range
+# by default), each slot answered from the time index's running totals.
+OCCUPANCY = ["slot", "confirmed", "pending", "confirmed covers", "pending covers"]
+MAX_SLOTS = 10000
+
+
+def occupancy_table(time_index, lo=None, hi=None, by="day", busy=False):
+    # -> Table with a row per slot (only those with bookings when `busy`);
+    # ValueError for a window of more than MAX_SLOTS slots.
+    step, span = SLOT_SECONDS[by], time_index.bounds()
+    if span is None and (lo is None or hi is None):
+        return Table(OCCUPANCY, [], keyed=True)
+    lo = span[0] if lo is None else lo
+    hi = span[1] + 1 if hi is None else hi
+    start = lo - lo % step
+    n = max(0, int(-(-(hi - start) // step)))
+    if n > MAX_SLOTS:
+        raise ValueError(f"{n:,} {by} slots, more than {MAX_SLOTS:,}; narrow the window")
+    with TIMER.phase("query.occupancy", n):
+        slots = time_index.slots(start, step, n)
+    label = BUCKETS[by]
+    return Table(OCCUPANCY, [(label(_EPOCH + timedelta(seconds=t)), *occ)
+                             for t, occ in slots if not busy or occ[0] or occ[1]],
+                 keyed=True)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# COLUMN FILES
+# ─────────────────────────────────────────────────────────────────────────────
+# Typed data properties as fixed-width binary columns, opened with mmap so
+# every process reading the same file shares its pages and a scan is a sweep
+# over memory instead of a float() per value.
+#   MAGIC | u32 version | u32 header length | JSON header | 8-aligned columns
+# Per property: `ids` (u32, ascending), `values` (int64, float64, or u8 for
+# booleans; dates and dateTimes as int64 seconds since 1970 UTC) and a `valid`
+# bitmap (bit i clear: row i's literal did not decode). Numeric and boolean
+# properties also get `sorted` / `sorted_ids`, the NumericIndex range columns.
+COLS_MAGIC   = b"MECOLS\0\0"
+COLS_VERSION = 1
+
+
+def _column_type(xsd):
+    # -> (array typecode, column kind) for a data property range, or None
+    if xsd == "boolean":
+        return "B", "bool"
+    if xsd in XSD_FLOAT:
+        return "d", "float"
+    if xsd in XSD_NUMERIC:
+        return "q", "int"
+    if xsd in XSD_TIME:
+        return "q", xsd
+    return None
+
+
+_COLUMN_ACCEPTS = {"bool": {"boolean"}, "float": XSD_NUMERIC, "int": XSD_NUMERIC,
+                   "date": XSD_TIME, "dateTime": XSD_TIME}
+
+
+def write_columns(path, store, data_props, sorted_columns=None, token=""):
+    # Writes every typed data property of `store`; `sorted_columns` are the
+    # NumericIndex columns to include (built here when not given), `token`
+    # ties the file to the snapshot written with it. -> {property: rows}
+    if sorted_columns is None:
+        sorted_columns = NumericIndex(store, data_props).columns
+    kinds = {p: _column_type(info.get("range")) for p, info in data_props.items()}
+    cols  = {p: (array("I"), array(k[0]), bytearray()) for p, k in kinds.items()
+             if k is not None and store.term_id(p) is not None}
+    pids  = {store.term_id(p): p for p in cols}
+    for subj, pred, x, k in store.typed_rows(plain=True):
+        p = pids.get(pred)
+        if p is None or subj in store.removed:
+            continue
+        ids, values, valid = cols[p]
+        row = len(ids)
+        if not row & 7:
+            valid.append(0)
+        code, ckind = kinds[p]
+        v = None
+        if k != LIT and datatype_of(k) in _COLUMN_ACCEPTS[ckind]:
+            if code == "d":
+                v = x
+            elif ckind in XSD_TIME or x.is_integer():
+                v = int(x)
+        if v is None:
+            values.append(0)
+        else:
+            values.append(v)
+            valid[row >> 3] |= 1 << (row & 7)
+        ids.append(subj)
+
+    head, blobs, off = {"byteorder": sys.byteorder, "token": token, "props": {}}, [], 0
+
+    def put(data):
+        nonlocal off
+        blobs.append((off, data))
+        start, off = off, off + len(data) + (-len(data) & 7)
+        return [start, len(data)]
+
+    for p, (ids, values, valid) in cols.items():
+        entry = head["props"][p] = {"kind": kinds[p][1], "type": values.typecode,
+                                    "xsd": data_props[p]["range"], "rows": len(ids),
+                                    "ids": put(ids.tobytes()), "values": put(values.tobytes()),
+                                    "valid": put(bytes(valid))}
+        if p in sorted_columns:
+            vals, sids = sorted_columns[p]
+            entry["sorted"]     = put(array("d", vals).tobytes())
+            entry["sorted_ids"] = put(array("I", sids).tobytes())
+    hbytes = json.dumps(head).encode("utf-8")
+    base   = _SNAP_HEAD.size + len(hbytes)
+    base  += -base & 7
+    tmp    = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(_SNAP_HEAD.pack(COLS_MAGIC, COLS_VERSION, len(hbytes)))
+        fh.write(hbytes)
+        fh.write(bytes(base - _SNAP_HEAD.size - len(hbytes)))
+        for start, data in blobs:
+            fh.seek(base + start)
+            fh.write(data)
+        fh.truncate(base + off)
+    os.replace(tmp, path)
+    return {p: len(c[0]) for p, c in cols.items()}
+
+
+class ColumnFile:
+    # Read side of write_columns(): columns come back as memoryviews straight
+    # onto the mapped file (copied only if the file has the other byte order).
+    def __init__(self, path):
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, hlen = _SNAP_HEAD.unpack_from(self._mm, 0)
+            if magic != COLS_MAGIC or version != COLS_VERSION:
+                raise ValueError(f"{path}: not a column file of version {COLS_VERSION}")
+            head = json.loads(self._mm[_SNAP_HEAD.size:_SNAP_HEAD.size + hlen])
+        except (struct.error, UnicodeDecodeError) as exc:
+            raise ValueError(f"{path}: {exc}") from None
+        self.props   = head["props"]
+        self.token   = head["token"]
+        self._base   = _SNAP_HEAD.size + hlen + (-(_SNAP_HEAD.size + hlen) & 7)
+        self._native = head["byteorder"] == sys.byteorder
+        self._view   = memoryview(self._mm)
+
+    def _col(self, span, code):
+        start, size = span
+        view = self._view[self._base + start:self._base + start + size]
+        if code == "B":
+            return view
+        if self._native:
+            return view.cast(code)
+        out = array(code, view)
+        out.byteswap()
+        return out
+
+    def column(self, prop):
+        # -> (ids, values, valid bitmap) of one property
+        e = self.props[prop]
+        return self._col(e["ids"], "I"), self._col(e["values"], e["type"]), self._col(e["valid"], "B")
+
+    def sorted(self, prop):
+        # -> (values ascending as float64, their ids), or None
+        e = self.props[prop]
+        if "sorted" not in e:
+            return None
+        return self._col(e["sorted"], "d"), self._col(e["sorted_ids"], "I")
+
+    def valid(self, prop):
+        # -> (ids, values) of the rows whose literal decoded
+        ids, values, bits = self.column(prop)
+        n, bits = len(ids), bytes(bits)
+        if bits.count(255) == n >> 3 and (not n & 7 or bits[-1] == (1 << (n & 7)) - 1):
+            return ids, values
+        keep = [r for r in range(n) if bits[r >> 3] >> (r & 7) & 1]
+        return (array("I", (ids[r] for r in keep)),
+                array(values.format if isinstance(values, memoryview) else values.typecode,
+                      (values[r] for r in keep)))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SNAPSHOT CACHE
+# ─────────────────────────────────────────────────────────────────────────────
+# A snapshot is  MAGIC | u32 version | u32 header length | JSON header | pickle.
+# The JSON header lists the input files and every file that was loaded
+# (path, size, mtime, content hash), and is checked before the pickled model
+# is touched.
+CACHE_MAGIC   = b"MEOSNAP\0"
+CACHE_VERSION = 13
+CACHE_DIR     = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "maison-elite")
+_SNAP_HEAD    = struct.Struct("<8sII")
+
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def snapshot_path(paths):
+    key = hashlib.sha1("\0".join(owl_sources(paths)).encode("utf-8")).hexdigest()[:20]
+    return os.path.join(CACHE_DIR, f"{key}.snapshot")
+
+
+def build_model(paths, progress=None, workers=None):
+    with TIMER.phase("parse") as ph:
+        parts, files, unresolved = parse_sources(paths, progress, workers)
+        ph.items = len(parts[4])
+    classes, sub_classes, obj_props, data_props, individuals = parts
+    n = len(individuals)
+    with TIMER.phase("hierarchy", len(classes)):
+        hierarchy = ClassHierarchy(classes)
+    with TIMER.phase("group", n):
+        groups = group_individuals(individuals, hierarchy)
+    with TIMER.phase("index.text", n):
+        text_index = TextIndex(individuals)
+    with TIMER.phase("index.numeric", n):
+        num_index = NumericIndex(individuals, data_props)
+    with TIMER.phase("index.type", n):
+        type_index = TypeIndex(individuals, hierarchy)
+    with TIMER.phase("index.adjacency", n):
+        adjacency = Adjacency(individuals)
+    with TIMER.phase("index.time", n):
+        time_index = TimeIndex(individuals)
+    return {
+        "classes": classes, "sub_classes": sub_classes,
+        "obj_props": obj_props, "data_props": data_props,
+        "individuals": individuals,
+        "hierarchy": hierarchy,
+        "groups": groups,
+        "text_index": text_index,
+        "num_index": num_index,
+        "type_index": type_index,
+        "adjacency": adjacency,
+        "time_index": time_index,
+        "sources": {"inputs": owl_sources(paths), "files": files},
+        "unresolved_imports": unresolved,
+    }
+
+
+def save_snapshot(paths, model):
+    # The numeric columns go to a column file next to the snapshot, which
+    # names it by a fresh token so a stale pair is never used together.
+    token  = os.urandom(8).hex()
+    hbytes = json.dumps(dict(model["sources"], columns=token)).encode("utf-8")
+    target = snapshot_path(paths)
+    tmp    = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        write_columns(f"{target}.cols", model["individuals"], model["data_props"],
+                      model["num_index"].columns, token)
+        with open(tmp, "wb") as fh:
+            fh.write(_SNAP_HEAD.pack(CACHE_MAGIC, CACHE_VERSION, len(hbytes)))
+            fh.write(hbytes)
+            pickle.dump(model, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, target)
+    except OSError:
+        try: os.remove(tmp)
+        except OSError: pass
+
+
+def _sources_current(paths, head):
+    # -> (still valid?, any file touched without its content changing?)
+    if head.get("inputs") != owl_sources(paths):
+        return False, False
+    touched = False
+    for path, (size, mtime, digest) in head["files"].items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False, False
+        if st.st_size != size:
+            return False, False
+        if st.st_mtime_ns != mtime:
+            # Touched but possibly unchanged: fall back to the content hash.
+            if file_digest(path) != digest:
+                return False, False
+            head["files"][path] = [size, st.st_mtime_ns, digest]
+            touched = True
+    return True, touched
+
+
+def load_snapshot(paths):
+    target = snapshot_path(paths)
+    try:
+        fh = open(target, "rb")
+    except OSError:
+        return None
+    with fh:
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+    with mm:
+        try:
+            magic, version, hlen = _SNAP_HEAD.unpack_from(mm, 0)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                return None
+            off  = _SNAP_HEAD.size
+            head = json.loads(mm[off:off + hlen].decode("utf-8"))
+        except (struct.error, ValueError):
+            return None
+        valid, touched = _sources_current(paths, head)
+        if not valid:
+            return None
+        with memoryview(mm) as view:
+            try:
+                model = pickle.loads(view[off + hlen:])
+            except (pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+                return None
+    try:
+        cols = ColumnFile(f"{target}.cols")
+    except (OSError, ValueError):
+        return None
+    if cols.token != head.pop("columns", None):
+        return None
+    model["num_index"].attach(cols)
+    if touched:
+        model["sources"] = head
+        save_snapshot(paths, model)
+    return model
+
+
+def load_model(paths, progress=None, use_cache=True, rebuild=False, workers=None, db=None):
+    # `paths` is an OWL file, a directory of them, or a list of either. With
+    # `db`, the model is served from that SQLite database instead of memory
+    # (see ontology_sqlite.py); `paths` may then be empty to reopen it as is.
+    if db is not None:
+        import ontology_sqlite
+        return ontology_sqlite.load_database(paths, db, progress, rebuild, workers)
+    if use_cache and not rebuild:
+        with TIMER.phase("snapshot.load") as ph:
+            model = load_snapshot(paths)
+            ph.items = len(model["individuals"]) if model is not None else 0
+        if model is not None:
+            return model
+    model = build_model(paths, progress, workers)
+    if use_cache:
+        with TIMER.phase("snapshot.save", len(model["individuals"])):
+            save_snapshot(paths, model)
+    return model
+
+
+def console_progress(stream):
+    last = [-1]
+
+    def _report(done, total):
+        pct = int(done * 100 / total) if total else 100
+        if pct != last[0]:
+            last[0] = pct
+            stream.write(f"\rLoading ontology… {pct:3d}%  ({done // 1024:,} KB)")
+            if done >= total:
+                stream.write("\n")
+            stream.flush()
+    return _report
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# LIVE RELOAD
+# ─────────────────────────────────────────────────────────────────────────────
+# A watched file is remembered as its top-level blocks (the children of
+# rdf:RDF), keyed by a hash of their bytes. When the file's mtime changes it
+# is split again, and only blocks whose bytes differ are parsed: the old
+# versions to learn what went away, the new ones for what replaced it. Each
+# batch is wrapped in the file's own header and footer, so namespace prefixes
+# resolve as before. Anything the splitter cannot vouch for (a changed root
+# element, changed imports, an individual spread over several files, files
+# added or removed) falls back to a full rebuild.
+_TOP_NAMES = {OWL_NS: (b"NamedIndividual", b"Class", b"ObjectProperty",
+                       b"DatatypeProperty", b"AnnotationProperty", b"Ontology"),
+              RDF_NS: (b"Description",)}
+_XMLNS     = re.compile(rb"""xmlns(?::([\w.-]+))?\s*=\s*["']([^"']*)["']""")
+# One piece of markup: a comment, CDATA section, processing instruction or
+# declaration, or a tag (groups: "/" of an end tag, its body, "/" of an
+# empty-element tag), with quoted attribute values taken whole.
+_MARKUP = re.compile(rb"""<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<![A-Z](?:[^>"'\[]|"[^"]*"|'[^']*'|\[[^\]]*\])*>"""
+                     rb"""|<(/?)([^!?<>"'/](?:[^<>"'/]|"[^"]*"|'[^']*'|/(?!>))*)(/?)>""", re.S)
+
+
+def _depth_delta(data, a, b):
+    # Element depth change over data[a:b], or None when b falls inside a
+    # comment, CDATA section, PI or tag. '<' cannot appear unescaped in text
+    # or attribute values, so when every '<' is matched by one '>' and none
+    # opens a comment, CDATA, PI or declaration, counting "<", "</" and "/>"
+    # is enough; anything else (a ">" or "/>" in text or an attribute value
+    # included) is tokenised.
+    lt = data.count(b"<", a, b)
+    if lt == data.count(b">", a, b) and data.find(b"<!", a, b) < 0 and data.find(b"<?", a, b) < 0:
+        return lt - 2 * data.count(b"</", a, b) - data.count(b"/>", a, b)
+    depth, pos = 0, a
+    for m in _MARKUP.finditer(data, a, b):
+        if data.find(b"<", pos, m.start()) >= 0:
+            return None
+        pos = m.end()
+        if m.group(2) is not None:
+            depth += -1 if m.group(1) else 0 if m.group(3) else 1
+    return None if data.find(b"<", pos, b) >= 0 else depth
+
+
+def split_blocks(data):
+    # -> (header, [(start, end) of each top-level block], footer), or None
+    # when the document is not laid out in a way that can be split safely.
+    root = next((m for m in _MARKUP.finditer(data) if m.group(2) is not None), None)
+    end  = data.rfind(b"</")
+    if root is None or end < root.end():
+        return None
+    prefixes = {uri: p for p, uri in _XMLNS.findall(root.group())}
+    names = []
+    for ns, locals_ in _TOP_NAMES.items():
+        p = prefixes.get(ns.encode())
+        if p is not None:
+            names += [(p + b":" if p else b"") + n for n in locals_]
+    if not names:
+        return None
+    cand = re.compile(b"<(?:" + b"|".join(map(re.escape, names)) + rb")[\s/>]")
+    starts, depth, pos = [], 0, 0
+    for m in cand.finditer(data, root.end(), end):
+        delta = _depth_delta(data, pos, m.start())
+        if delta is None:
+            continue            # a name inside a comment or CDATA section
+        depth += delta
+        pos = m.start()
+        if depth == 1:
+            starts.append(pos)
+    delta = _depth_delta(data, pos, end)
+    if delta is None or depth + delta != 1:
+        return None
+    if not starts:
+        return data[:end], [], data[end:]
+    spans = list(zip(starts, starts[1:] + [end]))
+    return data[:starts[0]], spans, data[end:]
+
+
+class _WatchedFile:
+    def __init__(self, path, data, stat):
+        self.path    = path
+        self.seen    = stat[:2]
+        self.pending = None
+        self._take(data)
+
+    def _take(self, data):
+        split = None
+        if os.path.splitext(self.path)[1].lower() not in _READERS:
+            split = split_blocks(data)
+        if split is None:
+            # N-Triples, Turtle and XML the splitter cannot vouch for are not
+            # diffed; any change reloads them.
+            self.data, self.blocks = data, None
+            return
+        self.header, spans, self.footer = split
+        self.data   = data
+        self.blocks = {hashlib.blake2b(data[a:b], digest_size=16).digest(): (a, b)
+                       for a, b in spans}
+
+    def diff(self, data):
+        # -> (parts of blocks that went away, parts of blocks that came in),
+        # or None if the file has to be reloaded as a whole.
+        if self.blocks is None:
+            return None
+        split = split_blocks(data)
+        if split is None or split[0] != self.header or split[2] != self.footer:
+            return None
+        new  = {hashlib.blake2b(data[a:b], digest_size=16).digest(): (a, b)
+                for a, b in split[1]}
+        gone = [self.data[a:b] for k, (a, b) in self.blocks.items() if k not in new]
+        came = [data[a:b] for k, (a, b) in new.items() if k not in self.blocks]
+        old_parts, old_imports = parse_stream(io.BytesIO(b"".join([self.header, *gone, self.footer])))
+        new_parts, new_imports = parse_stream(io.BytesIO(b"".join([self.header, *came, self.footer])))
+        if old_imports != new_imports:
+            return None
+        self.header, self.footer, self.data, self.blocks = split[0], split[2], data, new
+        return old_parts, new_parts
+
+
+def _model_delta(path, stat, old_parts, new_parts):
+    # Maps every changed name to its new definition, or None if it went away.
+    delta = {"path": path, "stat": stat}
+    for key, k in (("classes", 0), ("obj_props", 2), ("data_props", 3)):
+        delta[key] = dict.fromkeys(old_parts[k])
+        delta[key].update(new_parts[k])
+    old_st, new_st = old_parts[4], new_parts[4]
+    indiv = dict.fromkeys(old_st)
+    for n in new_st:
+        iid = new_st.id_of(n)
+        indiv[n] = (new_st.uri(iid), new_st.types(iid), new_st.entries(iid))
+    delta["individuals"] = indiv
+    delta["uris"] = [st.uri(st.id_of(n)) for st in (old_st, new_st) for n in st]
+    return delta
+
+
+class ModelWatcher:
+    # Polls the model's source files by mtime on a daemon thread. Each change
+    # puts one item on `deltas`: a list of per-file deltas for update_model(),
+    # or {"model": …} with a freshly built model when only a full rebuild will
+    # do. Nothing here touches the live model, so the UI thread can apply the
+    # result whenever it likes.
+    def __init__(self, model, interval=1.0, workers=None):
+        self.interval = interval
+        self.workers  = workers
+        self.deltas   = queue.Queue()
+        self._inputs  = list(model["sources"]["inputs"])
+        self._known   = dict(model["sources"]["files"])
+        self._files   = {}
+        self._stop    = threading.Event()
+        threading.Thread(target=self._loop, name="model-watcher", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _track(self, files):
+        # Remember the current bytes of `files` ({path: (size, mtime, digest)}).
+        # False if any of them no longer matches what was parsed.
+        tracked, same = {}, True
+        for path, stat in files.items():
+            with open(path, "rb") as fh:
+                data = fh.read()
+                st   = os.fstat(fh.fileno())
+            tracked[path] = _WatchedFile(path, data, (st.st_size, st.st_mtime_ns))
+            same = same and hashlib.blake2b(data, digest_size=16).hexdigest() == stat[2]
+        self._files, self._known = tracked, dict(files)
+        return same
+
+    def _rebuild(self):
+        while True:
+            model = build_model(self._inputs, workers=self.workers)
+            if self._track(model["sources"]["files"]):
+                self.deltas.put({"model": model})
+                return
+
+    def _signature(self):
+        sig = []
+        for path in sorted(set(owl_sources(self._inputs)) | set(self._known)):
+            try:
+                st = os.stat(path)
+                sig.append((path, st.st_size, st.st_mtime_ns))
+            except OSError:
+                sig.append((path, None, None))
+        return sig
+
+    def _loop(self):
+        stalled = None
+        try:
+            if not self._track(self._known):
+                self._rebuild()
+        except (OSError, ValueError, ET.ParseError):
+            stalled = self._signature()
+        while not self._stop.wait(self.interval):
+            if stalled is not None:
+                if self._signature() == stalled:
+                    continue
+                stalled = None
+            try:
+                deltas = self.poll()
+                if deltas is None:
+                    self._rebuild()
+                elif deltas:
+                    self.deltas.put(deltas)
+            except (OSError, ValueError, ET.ParseError):
+                # The rebuild failed (a file vanished or does not parse): wait
+                # for the next change before trying again.
+                stalled = self._signature()
+
+    def poll(self):
+        # -> list of per-file deltas, or None when a full rebuild is needed
+        if not self._files or not set(owl_sources(self._inputs)) <= set(self._files):
+            return None
+        deltas = []
+        for f in self._files.values():
+            try:
+                st = os.stat(f.path)
+            except OSError:
+                return None
+            cur = (st.st_size, st.st_mtime_ns)
+            if cur == f.seen:
+                continue
+            if cur != f.pending:
+                # Wait until the file holds still for one interval, so a save
+                # in progress is not read half-written.
+                f.pending = cur
+                continue
+            f.seen = cur
+            with open(f.path, "rb") as fh:
+                data = fh.read()
+            try:
+                parts = f.diff(data)
+            except ET.ParseError:
+                # Usually caught mid-save; the next write will be picked up.
+                continue
+            if parts is None:
+                return None
+            stat  = (len(data), st.st_mtime_ns,
+                     hashlib.blake2b(data, digest_size=16).hexdigest())
+            delta = _model_delta(f.path, stat, *parts)
+            # An individual also described in another file was merged from
+            # both; only a full rebuild can redo that merge.
+            for uri in delta.pop("uris"):
+                u = uri.encode("utf-8")
+                tags = (b'about="' + u + b'"', b"<" + u + b">")
+                if any(t in o.data for o in self._files.values() if o is not f for t in tags):
+                    return None
+            deltas.append(delta)
+        return deltas
+
+
+def update_model(model, delta):
+    # Applies one file's delta from ModelWatcher in place, updating every
+    # index incrementally. Returns the names of the individuals that changed.
+    with TIMER.phase("reload", len(delta["individuals"])):
+        for key in ("classes", "obj_props", "data_props"):
+            table = model[key]
+            for n, info in delta[key].items():
+                if info is None:
+                    table.pop(n, None)
+                else:
+                    table[n] = info
+        if delta["classes"]:
+            sub = model["sub_classes"]
+            sub.clear()
+            for n, info in model["classes"].items():
+                for c in info["subClassOf"]:
+                    sub[c].append(n)
+
+        store, adj, groups = model["individuals"], model["adjacency"], model["groups"]
+        hierarchy = model["hierarchy"]
+        changed = delta["individuals"]
+        old = {}
+        for name in changed:
+            if name in store:
+                tab = group_of(store[name], hierarchy)
+                old[name] = (store.remove(name), tab)
+        for iid, _ in old.values():
+            adj.remove(iid)
+        model["time_index"].remove([iid for iid, _ in old.values()])
+        new = [store.add(name, *entry) for name, entry in changed.items() if entry is not None]
+        store.decode(model["data_props"], None if delta["data_props"] else new)
+        for iid in new:
+            adj.add(iid)
+        model["text_index"].add(new)
+        if delta["data_props"]:
+            model["num_index"] = NumericIndex(store, model["data_props"])
+        else:
+            model["num_index"].add(new)
+        if delta["data_props"]:
+            model["time_index"] = TimeIndex(store)
+        else:
+            model["time_index"].add(new)
+        if delta["classes"]:
+            # A schema edit can move any individual: redo closure and grouping.
+            hierarchy = model["hierarchy"] = ClassHierarchy(model["classes"])
+            model["type_index"] = TypeIndex(store, hierarchy)
+            model["groups"] = group_individuals(store, hierarchy)
+        else:
+            model["type_index"].remove(iid for iid, _ in old.values())
+            model["type_index"].add(new)
+            for name in changed:
+                regroup(groups, store, name, hierarchy, old[name][1] if name in old else None)
+        model["sources"]["files"][delta["path"]] = delta["stat"]
+        return set(changed)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# COMMAND LINE
+# ─────────────────────────────────────────────────────────────────────────────
+def find_default_owl():
+    here = os.path.dirname(os.path.abspath(__file__))
+    for c in ["maison_elite.owl",
+              os.path.join(here, "maison_elite.owl"),
+              "hello1.owl",
+              os.path.join(here, "hello1.owl")]:
+        if os.path.exists(c):
+            return c
+    return None
+
+
+def warn_unresolved(model, stream):
+    for iri in model.get("unresolved_imports", ()):
+        stream.write(f"warning: owl:imports {iri} is not a local file; skipped\n")
+
+
+def literal_diagnostics(store):
+    # -> one line per literal that did not decode, for individuals still loaded
+    return [f"{store.name(iid)}.{prop}: {text!r} is {why} (xsd:{xsd}); kept as text"
+            for iid, prop, text, xsd, why in store.diagnostics if iid not in store.removed]
+
+
+def warn_literals(model, stream, limit=20):
+    lines = literal_diagnostics(model["individuals"])
+    for line in lines[:limit]:
+        stream.write(f"warning: {line}\n")
+    if len(lines) > limit:
+        stream.write(f"warning: … and {len(lines) - limit:,} more malformed literals\n")
+
+
+def _open_model(args):
+    paths = args.owl or (None if args.db else find_default_owl())
+    if not paths and not args.db:
+        sys.exit("error: no OWL file found; pass one with --owl")
+    progress = console_progress(sys.stderr) if sys.stderr.isatty() else None
+    try:
+        model = load_model(paths, progress, use_cache=not args.no_cache,
+                           workers=args.jobs, db=args.db)
+    except (OSError, ET.ParseError, RDFSyntaxError) as exc:
+        sys.exit(f"error: cannot load {paths or args.db}: {exc}")
+    warn_unresolved(model, sys.stderr)
+    warn_literals(model, sys.stderr)
+    return model
+
+
+def record(store, iid, fields=None):
+    props = {}
+    for prop, val in store.assertions(iid):
+        if fields is not None and prop not in fields:
+            continue
+        if prop not in props:
+            props[prop] = val
+        elif isinstance(props[prop], list):
+            props[prop].append(val)
+        else:
+            props[prop] = [props[prop], val]
+    return {"name": store.name(iid), "uri": store.uri(iid),
+            "types": store.types(iid), "properties": props}
+
+
+def _tsv(text):
+    return text.replace("\t", " ").replace("\n", " ")
+
+
+def write_results(out, store, ids, fmt="jsonl", fields=None):
+    # Rows are written (and flushed every few hundred) as they are formatted,
+    # so a consumer on the other end of a pipe sees the first ones at once.
+    if fmt == "tsv":
+        cols = fields or []
+        out.write("\t".join(["name", "types"] + cols) + "\n")
+    elif fmt == "json":
+        out.write("[")
+    for n, iid in enumerate(ids):
+        if fmt == "tsv":
+            row = [store.name(iid), ",".join(store.types(iid))]
+            row += [store.value(iid, f, "") for f in cols]
+            out.write("\t".join(map(_tsv, row)) + "\n")
+        else:
+            line = json.dumps(record(store, iid, fields), ensure_ascii=False)
+            if fmt == "json":
+                out.write(",\n " if n else "\n ")
+                out.write(line)
+            else:
+                out.write(line + "\n")
+        if n % 256 == 255:
+            out.flush()
+    if fmt == "json":
+        out.write("\n]\n" if ids else "]\n")
+    out.flush()
+
+
+def write_table(out, table, fmt=None):
+    # An aggregate Table as aligned text (the default), tsv, json or jsonl.
+    if fmt in ("json", "jsonl"):
+        lines = [json.dumps(dict(zip(table.columns, row)), ensure_ascii=False)
+                 for row in table.rows]
+        if fmt == "json":
+            out.write("[" + ",".join("\n " + line for line in lines)
+                      + ("\n]\n" if lines else "]\n"))
+        else:
+            out.writelines(line + "\n" for line in lines)
+    elif fmt == "tsv":
+        out.write("\t".join(table.columns) + "\n")
+        for row in table.rows:
+            out.write("\t".join(_tsv("" if v is None else str(v)) for v in row) + "\n")
+    else:
+        cells  = [table.columns] + [[cell_text(v) for v in row] for row in table.rows]
+        widths = [max(len(r[c]) for r in cells) for c in range(len(table.columns))]
+        for r in cells:
+            out.write("  ".join(v.ljust(w) if c == 0 and table.keyed else v.rjust(w)
+                                for c, (v, w) in enumerate(zip(r, widths))).rstrip() + "\n")
+    out.flush()
+
+
+def _cmd_query(args):
+    model  = _open_model(args)
+    engine = QueryEngine.from_model(model)
+    try:
+        ids = engine.run(args.query)
+    except QuerySyntaxError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    if args.limit is not None:
+        if isinstance(ids, Table):
+            ids.rows = ids.rows[:args.limit]
+        else:
+            ids = ids[:args.limit]
+    fields = args.fields.split(",") if args.fields else None
+    try:
+        if isinstance(ids, Table):
+            write_table(sys.stdout, ids, args.format)
+        else:
+            write_results(sys.stdout, engine.store, ids, args.format or "jsonl", fields)
+    except BrokenPipeError:
+        # Reader went away (e.g. piped into head); not an error for us.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
+
+def _cmd_occupancy(args):
+    model = _open_model(args)
+    try:
+        lo, hi = parse_window(args.window) if args.window else (None, None)
+        table  = occupancy_table(model["time_index"], lo, hi, args.by, args.busy)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    try:
+        write_table(sys.stdout, table, args.format)
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
+
+def _cmd_serve(args):
+    import ontology_server
+    ontology_server.run(_open_model(args), args.host, args.port, args.workers)
+    return 0
+
+
+def _cmd_convert(args):
+    # Parses once (imports included) and streams the merged model out.
+    paths = args.sources
+    try:
+        parts, _, unresolved = parse_sources(paths, workers=args.jobs)
+    except (OSError, ET.ParseError, RDFSyntaxError) as exc:
+        sys.exit(f"error: cannot load {paths}: {exc}")
+    warn_unresolved({"unresolved_imports": unresolved}, sys.stderr)
+    classes, _, obj_props, data_props, store = parts
+    if args.out in (None, "-"):
+        try:
+            n = write_ntriples(sys.stdout, classes, obj_props, data_props, store)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 0
+    else:
+        with open(args.out + ".tmp", "w", encoding="utf-8", buffering=1 << 20) as fh:
+            n = write_ntriples(fh, classes, obj_props, data_props, store)
+        os.replace(args.out + ".tmp", args.out)
+    print(f"{n:,} triples, {len(store):,} individuals", file=sys.stderr)
+    return 0
+
+
+def _cmd_columns(args):
+    try:
+        parts, _, unresolved = parse_sources(args.sources, workers=args.jobs)
+    except (OSError, ET.ParseError, RDFSyntaxError) as exc:
+        sys.exit(f"error: cannot load {args.sources}: {exc}")
+    warn_unresolved({"unresolved_imports": unresolved}, sys.stderr)
+    rows = write_columns(args.out, parts[4], parts[3])
+    for p, n in rows.items():
+        print(f"{p:<24}{parts[3][p]['range']:<12}{n:>12,}", file=sys.stderr)
+    return 0
+
+
+def _add_source_args(p):
+    p.add_argument("--owl", action="append",
+                   help="OWL/RDF file or directory to load; repeatable (default: maison_elite.owl)")
+    p.add_argument("-j", "--jobs", type=int,
+                   help="processes parsing files in parallel (default: one per core)")
+    p.add_argument("--no-cache", action="store_true",
+                   help="parse the OWL file without reading or writing the snapshot cache")
+    p.add_argument("--db", metavar="FILE",
+                   help="serve the model from this SQLite database, ingesting --owl into it "
+                        "when missing or stale")
+    add_profile_args(p)
+
+
+def add_profile_args(p):
+    p.add_argument("--profile", action="store_true",
+                   help="time load, index, query and view phases; summary on stderr at exit")
+    p.add_argument("--trace", metavar="FILE",
+                   help="append every timed phase to FILE as JSON lines")
+    p.add_argument("--cprofile", metavar="PHASE:FILE",
+                   help="run cProfile around the next PHASE (e.g. query) and dump it to FILE")
+
+
+def apply_profile_args(args):
+    cprof = None
+    if args.cprofile:
+        phase, sep, path = args.cprofile.partition(":")
+        if not (sep and phase and path):
+            sys.exit("error: --cprofile expects PHASE:FILE, e.g. query:query.prof")
+        cprof = (phase, path)
+    try:
+        TIMER.configure(args.profile, args.trace, cprof)
+    except OSError as exc:
+        sys.exit(f"error: cannot write trace: {exc}")
+    if args.profile:
+        atexit.register(TIMER.write_report, sys.stderr)
+
+
+# Headless sub-commands; ontology_explorer.py hands these over before Tk loads.
+COMMANDS = {"query": _cmd_query, "serve": _cmd_serve, "convert": _cmd_convert,
+            "columns": _cmd_columns, "occupancy": _cmd_occupancy}
+
+
+def main(argv=None):
+    ap  = argparse.ArgumentParser(prog="ontology_explorer.py",
+                                  description="Maison Élite ontology, without the GUI")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    q = sub.add_parser("query", help="run a Smart Query and print the matches")
+    q.add_argument("query", help='Smart Query, e.g. "dish: AND price:<30"')
+    q.add_argument("--format", choices=("jsonl", "tsv", "json"),
+                   help="output format (default: jsonl; aggregates print an aligned table)")
+    q.add_argument("--fields", help="comma-separated properties to output")
+    q.add_argument("--limit", type=int, help="stop after this many results")
+    _add_source_args(q)
+
+    o = sub.add_parser("occupancy", help="print bookings and covers per hour or day")
+    o.add_argument("window", nargs="?",
+                   help="day, month, year or a..b window, e.g. 2025-03-01..2025-03-07 "
+                        "(default: every booking)")
+    o.add_argument("--by", choices=tuple(SLOT_SECONDS), default="day", help="slot length")
+    o.add_argument("--busy", action="store_true", help="leave out slots without bookings")
+    o.add_argument("--format", choices=("jsonl", "tsv", "json"),
+                   help="output format (default: an aligned table)")
+    _add_source_args(o)
+
+    v = sub.add_parser("serve", help="answer queries as JSON over HTTP")
+    v.add_argument("--host", default="127.0.0.1")
+    v.add_argument("--port", type=int, default=8765)
+    v.add_argument("--workers", type=int, default=4,
+                   help="threads evaluating queries")
+    _add_source_args(v)
+
+    c = sub.add_parser("convert", help="write OWL/RDF/Turtle sources out as N-Triples")
+    c.add_argument("sources", nargs="+", help="files or directories to convert")
+    c.add_argument("-o", "--out", help="N-Triples file to write (default: stdout)")
+    c.add_argument("-j", "--jobs", type=int,
+                   help="processes parsing files in parallel (default: one per core)")
+    add_profile_args(c)
+
+    k = sub.add_parser("columns", help="export typed data properties as a mmap-able column file")
+    k.add_argument("sources", nargs="+", help="files or directories to read")
+    k.add_argument("-o", "--out", required=True, help="column file to write")
+    k.add_argument("-j", "--jobs", type=int,
+                   help="processes parsing files in parallel (default: one per core)")
+    add_profile_args(k)
+
+    args = ap.parse_args(argv)
+    apply_profile_args(args)
+    return COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    # Run the importable copy, not this __main__ one: pickled snapshots then
+    # name ontology_engine.X and load in every process, and the server and
+    # SQLite modules share its TIMER and exception classes.
+    import ontology_engine
+    sys.exit(ontology_engine.main())
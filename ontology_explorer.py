@@ -6,15 +6,34 @@
 
 Requirements : Python 3.8+ (tkinter ships with Python — no pip needed)
 Run          : python ontology_explorer.py
+Headless     : python ontology_explorer.py query "rating:>4.7" --format jsonl
 OWL file     : place maison_elite.owl in the same folder,
                OR the app will open a file picker.
 """
 
+import os
+import sys
+import time
+
+# Headless sub-commands (query, …) are handed to the engine before tkinter is
+# imported, so they start fast and work on machines without a display.
+if __name__ == "__main__" and sys.argv[1:2] and not os.path.exists(sys.argv[1]):
+    import ontology_engine
+    if sys.argv[1] in ontology_engine.COMMANDS:
+        sys.exit(ontology_engine.main())
+
 import tkinter as tk
 from tkinter import ttk, filedialog
-import xml.etree.ElementTree as ET
-import os
-from collections import defaultdict
+import queue
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime, timezone
+
+from ontology_engine import (
+    BUCKETS, SLOT_SECONDS, TIMER, ModelWatcher, QueryEngine, QuerySyntaxError, QueryWorker,
+    Table, add_profile_args, apply_profile_args, cell_text, console_progress, find_default_owl,
+    group_of, load_model, neighbourhood, path_steps, shortest_path, update_model,
+    warn_literals, warn_unresolved,
+)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # DESIGN SYSTEM  ·  Obsidian & Amber — Luxury Noir
@@ -40,11 +59,6 @@ FONT_CODE   = ("Courier New",  9)
 FONT_BADGE  = ("Courier New",  8)
 FONT_MICRO  = ("Courier New",  7)
 
-NS     = "http://maison-elite.org/ontology#"
-OWL_NS = "http://www.w3.org/2002/07/owl#"
-RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
-RDS_NS = "http://www.w3.org/2000/01/rdf-schema#"
-
 CLASS_ICONS = {
     "Restaurant": "🏛", "HeadChef": "👑", "SousChef": "🔪",
     "PastryChef": "🍮", "Chef": "👨‍🍳", "VIPCustomer": "◆",
@@ -55,130 +69,32 @@ CLASS_ICONS = {
     "Reservation": "📅", "Ingredient": "◉", "Award": "★",
 }
 
-# ─────────────────────────────────────────────────────────────────────────────
-# PARSER
-# ─────────────────────────────────────────────────────────────────────────────
-def local(uri):
-    if not uri:
-        return ""
-    return uri.split("#")[-1] if "#" in uri else uri.split("/")[-1]
-
-def parse_owl(path):
-    tree = ET.parse(path)
-    root = tree.getroot()
-    classes     = {}
-    sub_classes = defaultdict(list)
-    obj_props   = {}
-    data_props  = {}
-    individuals = {}
-
-    for c in root.findall(f"{{{OWL_NS}}}Class"):
-        uri = c.get(f"{{{RDF_NS}}}about")
-        if uri:
-            n = local(uri)
-            classes[n] = {"uri": uri, "subClassOf": []}
-            for s in c.findall(f"{{{RDS_NS}}}subClassOf"):
-                p = s.get(f"{{{RDF_NS}}}resource")
-                if p:
-                    classes[n]["subClassOf"].append(local(p))
-                    sub_classes[local(p)].append(n)
-
-    for p in root.findall(f"{{{OWL_NS}}}ObjectProperty"):
-        uri = p.get(f"{{{RDF_NS}}}about")
-        if uri:
-            d = p.find(f"{{{RDS_NS}}}domain")
-            r = p.find(f"{{{RDS_NS}}}range")
-            obj_props[local(uri)] = {
-                "domain": local(d.get(f"{{{RDF_NS}}}resource")) if d is not None else "—",
-                "range":  local(r.get(f"{{{RDF_NS}}}resource")) if r is not None else "—",
-            }
-
-    for p in root.findall(f"{{{OWL_NS}}}DatatypeProperty"):
-        uri = p.get(f"{{{RDF_NS}}}about")
-        if uri:
-            doms = [local(d.get(f"{{{RDF_NS}}}resource"))
-                    for d in p.findall(f"{{{RDS_NS}}}domain")
-                    if d.get(f"{{{RDF_NS}}}resource")]
-            rng = p.find(f"{{{RDS_NS}}}range")
-            data_props[local(uri)] = {
-                "domains": doms,
-                "range": local(rng.get(f"{{{RDF_NS}}}resource")) if rng is not None else "—",
-            }
-
-    for ind in root.findall(f"{{{OWL_NS}}}NamedIndividual"):
-        uri = ind.get(f"{{{RDF_NS}}}about")
-        if not uri:
-            continue
-        name       = local(uri)
-        types      = []
-        assertions = []
-
-        for t in ind.findall(f"{{{RDF_NS}}}type"):
-            r = t.get(f"{{{RDF_NS}}}resource")
-            if r and OWL_NS not in r:
-                types.append(local(r))
-
-        for child in ind:
-            tag = child.tag
-            if tag.startswith(f"{{{NS}}}"):
-                prop = local(tag)
-                ref  = child.get(f"{{{RDF_NS}}}resource")
-                val  = local(ref) if ref else (child.text or "").strip()
-                if val:
-                    assertions.append((prop, val))
-
-        individuals[name] = {
-            "uri": uri, "types": types, "assertions": assertions,
-        }
-
-    return classes, sub_classes, obj_props, data_props, individuals
-
-
-def dominant_type(info, priority):
-    for p in priority:
-        if p in info["types"]:
-            return p
-    return info["types"][0] if info["types"] else "Other"
-
-
-def group_individuals(individuals):
-    priority = [
-        "Restaurant", "HeadChef", "SousChef", "PastryChef",
-        "VIPCustomer", "RegularCustomer",
-        "Starter", "MainCourse", "Dessert",
-        "DegustationMenu", "ALaCarteMenu", "SeasonalMenu",
-        "Reservation", "Ingredient", "Award",
-    ]
-    tab_map = {
-        "Restaurant": "Restaurant",
-        "HeadChef": "Chefs", "SousChef": "Chefs", "PastryChef": "Chefs",
-        "VIPCustomer": "Customers", "RegularCustomer": "Customers",
-        "Starter": "Dishes", "MainCourse": "Dishes", "Dessert": "Dishes",
-        "DegustationMenu": "Menus", "ALaCarteMenu": "Menus", "SeasonalMenu": "Menus",
-        "Reservation": "Reservations",
-        "Ingredient": "Ingredients",
-        "Award": "Awards",
-    }
-    groups = defaultdict(list)
-    for name, info in individuals.items():
-        dt  = dominant_type(info, priority)
-        tab = tab_map.get(dt, "Other")
-        groups[tab].append(name)
-    for k in groups:
-        groups[k].sort(key=lambda x: (
-            individuals[x]["types"][0] if individuals[x]["types"] else "",
-            next((v for p, v in individuals[x]["assertions"] if p == "name"), x)
-        ))
-    return groups
+PATH_HOPS        = 12    # longest chain the detail view's path box looks for
+CONNECTION_LIMIT = 5000  # ids the detail view counts before showing "N+"
+
+# Section titles for edges seen from their object's side.
+INVERSE_LABELS = {
+    "includes": "Included in", "preparedBy": "Prepared dishes",
+    "containsIngredient": "Used in", "employs": "Employed by",
+    "hasMenu": "Menu of", "hasReservation": "Reserved by",
+    "earnedAward": "Earned by", "receivedAward": "Received by",
+    "atRestaurant": "Reservations",
+}
 
 # ─────────────────────────────────────────────────────────────────────────────
 # WIDGET HELPERS
 # ─────────────────────────────────────────────────────────────────────────────
-def make_scrollable(parent, bg=BG):
+def make_scrollable(parent, bg=BG, on_scroll=None):
     outer  = tk.Frame(parent, bg=bg)
     canvas = tk.Canvas(outer, bg=bg, highlightthickness=0, bd=0)
     sb     = ttk.Scrollbar(outer, orient="vertical", command=canvas.yview)
-    canvas.configure(yscrollcommand=sb.set)
+
+    def _yscroll(top, bottom):
+        sb.set(top, bottom)
+        if on_scroll:
+            on_scroll(top, bottom)
+
+    canvas.configure(yscrollcommand=_yscroll)
     sb.pack(side="right", fill="y")
     canvas.pack(side="left", fill="both", expand=True)
     inner = tk.Frame(canvas, bg=bg)
@@ -202,10 +118,130 @@ def make_scrollable(parent, bg=BG):
     return outer, inner, canvas
 
 
-def star_str(r):
-    try:
-        v = float(r)
-    except:
+class VirtualList(tk.Frame):
+    # Sidebar list with fixed-height rows. Only enough row widgets to fill the
+    # viewport exist; scrolling re-binds them to other items, so building and
+    # scrolling cost the same for 10 items or 100k. `bound` maps each item
+    # currently on screen to its (row, name, indicator, inner_row, icon)
+    # widgets and is kept up to date in place.
+    ROW_H = 34
+
+    def __init__(self, parent, items, describe, on_click, is_selected, bg=SURFACE):
+        super().__init__(parent, bg=bg)
+        self.items        = items
+        self.first        = 0
+        self.bound        = {}
+        self._bg          = bg
+        self._describe    = describe
+        self._on_click    = on_click
+        self._is_selected = is_selected
+        self._slots       = []
+        self._visible     = 0
+        self._sb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self._sb.pack(side="right", fill="y")
+        self._body = tk.Frame(self, bg=bg)
+        self._body.pack(side="left", fill="both", expand=True)
+        self._body.bind("<Configure>", lambda e: self._layout(e.height))
+        self._bind_wheel(self._body)
+
+    def _bind_wheel(self, w):
+        w.bind("<MouseWheel>", lambda e: self.scroll(int(-3 * (e.delta / 120))))
+        w.bind("<Button-4>",   lambda e: self.scroll(-3))
+        w.bind("<Button-5>",   lambda e: self.scroll(3))
+
+    def _make_slot(self):
+        bg  = self._bg
+        row = tk.Frame(self._body, bg=bg, cursor="hand2")
+        indicator = tk.Frame(row, bg=bg, width=3)
+        indicator.place(x=0, y=0, relheight=1)
+        inner_row = tk.Frame(row, bg=bg)
+        inner_row.pack(fill="x", padx=(10, 8))
+        icon_l = tk.Label(inner_row, font=FONT_CODE, bg=bg, fg=MUTED, width=2)
+        icon_l.pack(side="left", pady=8)
+        name_l = tk.Label(inner_row, font=FONT_BODY, bg=bg, fg=CREAM, anchor="w")
+        name_l.pack(side="left", fill="x", expand=True, pady=8)
+        sub_l = tk.Label(inner_row, font=FONT_MICRO, bg=bg, fg=MUTED)
+        slot = {"item": None, "sub": sub_l,
+                "widgets": (row, name_l, indicator, inner_row, icon_l)}
+        for w in (row, inner_row, icon_l, name_l, sub_l):
+            w.bind("<Button-1>", lambda e, sl=slot: self._on_click(sl["item"], sl["widgets"]))
+            w.bind("<Enter>",    lambda e, sl=slot: self._paint(sl, hover=True))
+            w.bind("<Leave>",    lambda e, sl=slot: self._paint(sl))
+            self._bind_wheel(w)
+        return slot
+
+    def _paint(self, slot, hover=False):
+        if slot["item"] is None:
+            return
+        row, name_l, indicator, inner_row, icon_l = slot["widgets"]
+        sel = self._is_selected(slot["item"])
+        bg  = SELECTED if sel else (CARD_HOV if hover else self._bg)
+        for w in (row, name_l, inner_row, icon_l):
+            w.configure(bg=bg)
+        indicator.configure(bg=GOLD if sel else self._bg)
+
+    def _layout(self, height):
+        self._visible = max(1, -(-height // self.ROW_H))
+        while len(self._slots) < self._visible:
+            self._slots.append(self._make_slot())
+        self.scroll(0)
+
+    def scroll(self, delta):
+        last = max(0, len(self.items) - self._visible + 1)
+        self.first = min(max(0, self.first + delta), last)
+        self._refresh()
+
+    def _on_scrollbar(self, *args):
+        n = max(1, len(self.items))
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * n)
+            self.scroll(0)
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self._visible - 1 if args[2] == "pages" else 1)
+            self.scroll(step)
+
+    def see(self, item):
+        try:
+            idx = self.items.index(item)
+        except ValueError:
+            return
+        if not self.first <= idx < self.first + self._visible - 1:
+            self.first = max(0, idx - self._visible // 2)
+            self.scroll(0)
+
+    def _refresh(self):
+        self.bound.clear()
+        for j, slot in enumerate(self._slots):
+            idx = self.first + j
+            row = slot["widgets"][0]
+            if j >= self._visible or idx >= len(self.items):
+                slot["item"] = None
+                row.place_forget()
+                continue
+            item = self.items[idx]
+            icon, text, sub = self._describe(item)
+            _, name_l, _, _, icon_l = slot["widgets"]
+            slot["item"] = item
+            icon_l.configure(text=icon)
+            name_l.configure(text=text)
+            slot["sub"].configure(text=sub)
+            if sub:
+                slot["sub"].pack(side="right", padx=(0, 4))
+            else:
+                slot["sub"].pack_forget()
+            row.place(x=0, y=j * self.ROW_H, relwidth=1, height=self.ROW_H)
+            self.bound[item] = slot["widgets"]
+            self._paint(slot)
+        n = len(self.items)
+        if n:
+            self._sb.set(self.first / n, min(1.0, (self.first + self._visible) / n))
+        else:
+            self._sb.set(0, 1)
+
+
+def star_str(v):
+    # `v` is a decoded rating; one that did not decode is still text.
+    if isinstance(v, str):
         return ""
     full  = int(v)
     frac  = v - full
@@ -229,20 +265,30 @@ def divider(parent, color=BORDER, pady=(8, 0)):
 # APPLICATION
 # ─────────────────────────────────────────────────────────────────────────────
 class App(tk.Tk):
-    TABS = ["Restaurant", "Dishes", "Chefs", "Menus",
-            "Customers", "Reservations", "Ingredients",
-            "Awards", "Schema", "Query"]
-
-    def __init__(self, owl_path):
+    # Entity tabs come from the schema's root classes; the familiar ones keep
+    # this order and any others follow in declaration order.
+    TAB_ORDER = ["Restaurant", "Dishes", "Chefs", "Menus",
+                 "Customers", "Reservations", "Ingredients", "Awards"]
+    TOOL_TABS = ["Schema", "Query"]
+    RESULT_PAGE = 40
+    TABLE_ROWS  = 500       # aggregate groups drawn in the Query tab
+
+    def __init__(self, owl_path, progress=None, use_cache=True, rebuild_cache=False,
+                 workers=None, watch=False, db=None):
         super().__init__()
         self.owl_path = owl_path
-        (self.classes, self.sub_classes,
-         self.obj_props, self.data_props,
-         self.individuals) = parse_owl(owl_path)
-        self.groups   = group_individuals(self.individuals)
+        m = load_model(owl_path, progress, use_cache, rebuild_cache, workers, db)
+        warn_unresolved(m, sys.stderr)
+        warn_literals(m, sys.stderr)
+        self._adopt(m)
+        self._worker   = QueryWorker(self.engine)
+        self._qpending = None      # (gen, result frame) of the query in flight
+        self._qdebounce = None
         self.sel_item = None
         self.sel_tab  = tk.StringVar(value="")
         self._list_rows = {}
+        self._views = OrderedDict()
+        self._model_version = 0
 
         self.title("Maison Élite · Ontology Explorer")
         self.configure(bg=BG)
@@ -251,7 +297,26 @@ class App(tk.Tk):
 
         self._configure_ttk()
         self._build_skeleton()
-        self._switch_tab("Restaurant")
+        self._switch_tab(self.tabs[0])
+
+        self._watcher = ModelWatcher(m, workers=workers) if watch else None
+        if self._watcher:
+            self.after(self.WATCH_POLL_MS, self._poll_model)
+
+    def _adopt(self, m):
+        self.model = m
+        (self.classes, self.sub_classes,
+         self.obj_props, self.data_props,
+         self.individuals, self.groups) = (
+            m["classes"], m["sub_classes"], m["obj_props"],
+            m["data_props"], m["individuals"], m["groups"])
+        self.hierarchy = m["hierarchy"]
+        self.adjacency = m["adjacency"]
+        rank = {t: i for i, t in enumerate(self.TAB_ORDER)}
+        self.entity_tabs = sorted(self.hierarchy.tabs,
+                                  key=lambda t: rank.get(t, len(rank)))
+        self.tabs = self.entity_tabs + self.TOOL_TABS
+        self.engine    = QueryEngine.from_model(m)
 
     def _configure_ttk(self):
         s = ttk.Style(self)
@@ -279,14 +344,17 @@ class App(tk.Tk):
 
         stat_f = tk.Frame(hdr, bg=SURFACE)
         stat_f.pack(side="right", padx=20, fill="y")
-        for txt, val in [("instances", len(self.individuals)),
-                          ("classes", len(self.classes)),
-                          ("properties", len(self.obj_props)+len(self.data_props))]:
+        self._stat_lbl = {}
+        for txt in ("instances", "classes", "properties"):
             v = tk.Frame(stat_f, bg=SURFACE)
             v.pack(side="left", padx=12, pady=14)
-            tk.Label(v, text=str(val), font=("Georgia", 13, "bold"),
-                     bg=SURFACE, fg=GOLD).pack()
+            self._stat_lbl[txt] = tk.Label(v, font=("Georgia", 13, "bold"),
+                                           bg=SURFACE, fg=GOLD)
+            self._stat_lbl[txt].pack()
             tk.Label(v, text=txt, font=FONT_MICRO, bg=SURFACE, fg=MUTED).pack()
+        self._refresh_stats()
+        if TIMER.enabled:
+            self._build_timing(stat_f)
 
         tk.Frame(self, bg=GOLD_DIM, height=1).pack(fill="x")
 
@@ -294,8 +362,24 @@ class App(tk.Tk):
         self._tabbar = tk.Frame(self, bg=SURFACE, height=40)
         self._tabbar.pack(fill="x")
         self._tabbar.pack_propagate(False)
+        self._build_tabs()
+
+        tk.Frame(self, bg=BORDER, height=1).pack(fill="x")
+        body = tk.Frame(self, bg=BG)
+        body.pack(fill="both", expand=True)
+        self._sidebar_host = tk.Frame(body, bg=SURFACE, width=232)
+        self._sidebar_host.pack(side="left", fill="y")
+        self._sidebar_host.pack_propagate(False)
+        tk.Frame(body, bg=BORDER, width=1).pack(side="left", fill="y")
+        self._main_host = tk.Frame(body, bg=BG)
+        self._main_host.pack(side="left", fill="both", expand=True)
+        self._sidebar = self._main = None
+
+    def _build_tabs(self):
+        for w in self._tabbar.winfo_children():
+            w.destroy()
         self._tab_lbl = {}
-        for t in self.TABS:
+        for t in self.tabs:
             l = tk.Label(self._tabbar, text=t.upper(), font=FONT_BADGE,
                          bg=SURFACE, fg=MUTED, padx=14, pady=11, cursor="hand2")
             l.pack(side="left")
@@ -305,19 +389,145 @@ class App(tk.Tk):
             l.bind("<Leave>",    lambda e, b=l, tab=t:
                    b.configure(fg=GOLD if self.sel_tab.get() == tab else MUTED))
             self._tab_lbl[t] = l
+        if self.sel_tab.get() in self._tab_lbl:
+            self._tab_lbl[self.sel_tab.get()].configure(fg=GOLD)
+
+    # ── Timing overlay (--profile) ───────────────────────────────────────
+    # The header shows the most recent phase; clicking it opens a table of
+    # every phase under the header. Clicking a row there runs cProfile around
+    # that phase's next run and writes maison-<phase>-<time>.prof.
+    TIMING_MS = 500
+
+    def _build_timing(self, parent):
+        v = tk.Frame(parent, bg=SURFACE, cursor="hand2")
+        v.pack(side="left", padx=12, pady=14)
+        self._timing_lbl = tk.Label(v, text="—", font=("Georgia", 13, "bold"),
+                                    bg=SURFACE, fg=SAGE)
+        self._timing_lbl.pack()
+        cap = tk.Label(v, text="last phase", font=FONT_MICRO, bg=SURFACE, fg=MUTED)
+        cap.pack()
+        for w in (v, self._timing_lbl, cap):
+            w.bind("<Button-1>", lambda e: self._toggle_timing())
+        self._timing_panel = None
+        self._timing_seen  = None
+        self.after(self.TIMING_MS, self._tick_timing)
+
+    def _toggle_timing(self):
+        if self._timing_panel is not None:
+            self._timing_panel.destroy()
+            self._timing_panel = None
+            return
+        self._timing_panel = tk.Frame(self, bg=CARD, padx=12, pady=10,
+                                      highlightthickness=1, highlightbackground=GOLD_DIM)
+        self._timing_panel.place(relx=1.0, x=-20, y=60, anchor="ne")
+        self._fill_timing()
+
+    def _fill_timing(self):
+        panel = self._timing_panel
+        for w in panel.winfo_children(): w.destroy()
+        head = f"{'phase':<15}{'n':>5}{'total ms':>10}{'mean':>9}{'max':>9}{'items':>9}"
+        tk.Label(panel, text=head, font=FONT_CODE, bg=CARD, fg=MUTED,
+                 anchor="w").pack(fill="x")
+        for name, n, total, mean, mx, items in TIMER.report():
+            row = tk.Label(panel, font=FONT_CODE, bg=CARD, fg=CREAM, anchor="w",
+                           cursor="hand2",
+                           text=f"{name:<15}{n:>5}{total * 1000:>10.1f}{mean * 1000:>9.2f}"
+                                f"{mx * 1000:>9.2f}{items:>9,}")
+            row.pack(fill="x")
+            row.bind("<Button-1>", lambda e, ph=name: self._profile_phase(ph))
+            row.bind("<Enter>", lambda e, r=row: r.configure(fg=GOLD))
+            row.bind("<Leave>", lambda e, r=row: r.configure(fg=CREAM))
+        armed = TIMER.armed
+        note = (f"cProfile armed for next {armed[0]} → {armed[1]}" if armed else
+                f"wrote {TIMER.profiled}" if TIMER.profiled else
+                "click a phase to cProfile its next run")
+        tk.Label(panel, text=note, font=FONT_MICRO, bg=CARD, fg=MUTED,
+                 anchor="w").pack(fill="x", pady=(6, 0))
+
+    def _profile_phase(self, phase):
+        TIMER.profile_next(phase, os.path.abspath(
+            f"maison-{phase}-{time.strftime('%H%M%S')}.prof"))
+        self._fill_timing()
+
+    def _tick_timing(self):
+        seen = (TIMER.last, TIMER.armed, TIMER.profiled)
+        if seen != self._timing_seen:
+            self._timing_seen = seen
+            if TIMER.last is not None:
+                name, secs, _ = TIMER.last
+                self._timing_lbl.configure(text=f"{name} {secs * 1000:.1f}ms")
+            if self._timing_panel is not None:
+                self._fill_timing()
+        self.after(self.TIMING_MS, self._tick_timing)
+
+    def _refresh_stats(self):
+        for txt, val in [("instances", len(self.individuals)),
+                          ("classes", len(self.classes)),
+                          ("properties", len(self.obj_props)+len(self.data_props))]:
+            self._stat_lbl[txt].configure(text=str(val))
+
+    # ── Live reload ───────────────────────────────────────────────────────
+    # The watcher thread only reads files and parses changed blocks; deltas
+    # are applied here on the Tk thread, after cancelling any running query,
+    # and the open tab is rebuilt with its selection kept.
+    WATCH_POLL_MS = 250
+
+    def _poll_model(self):
+        changed = False
+        while True:
+            try:
+                item = self._watcher.deltas.get_nowait()
+            except queue.Empty:
+                break
+            self._worker.cancel()
+            if isinstance(item, dict):
+                self._adopt(item["model"])
+            else:
+                for delta in item:
+                    update_model(self.model, delta)
+                self._adopt(self.model)
+            self._worker.engine = self.engine
+            changed = True
+        if changed:
+            self._model_changed()
+        self.after(self.WATCH_POLL_MS, self._poll_model)
+
+    def _model_changed(self):
+        tab, item = self.sel_tab.get(), self.sel_item
+        qtext = self._qvar.get() if self._qvar is not None else ""
+        self._qpending = None
+        self._refresh_stats()
+        self.invalidate_views()
+        if list(self._tab_lbl) != self.tabs:
+            # A schema edit added, renamed or removed a root class.
+            for t in [t for t in self._views if t not in self.tabs]:
+                self._drop_view(t)
+            self._build_tabs()
+            if tab not in self.tabs:
+                tab = self.tabs[0]
+        self._switch_tab(tab)
+        if item in self.individuals and item in self.groups.get(tab, ()):
+            self._vlist.see(item)
+            self._select(item, tab)
+        elif tab == "Query" and qtext:
+            self._qvar.set(qtext)
 
-        tk.Frame(self, bg=BORDER, height=1).pack(fill="x")
+    # ── Tab switching ─────────────────────────────────────────────────────
+    # Each tab is built once into its own sidebar/main frame pair and kept in
+    # an LRU of VIEW_CACHE entries; switching tabs only swaps which pair is
+    # packed. A view built against an older model version is rebuilt.
+    VIEW_CACHE = 6
+    _VIEW_STATE = {"sel_item": None, "_list_rows": {}, "_vlist": None,
+                   "_qvar": None, "_qresult": None}
 
-        body = tk.Frame(self, bg=BG)
-        body.pack(fill="both", expand=True)
-        self._sidebar = tk.Frame(body, bg=SURFACE, width=232)
-        self._sidebar.pack(side="left", fill="y")
-        self._sidebar.pack_propagate(False)
-        tk.Frame(body, bg=BORDER, width=1).pack(side="left", fill="y")
-        self._main = tk.Frame(body, bg=BG)
-        self._main.pack(side="left", fill="both", expand=True)
+    def invalidate_views(self):
+        self._model_version += 1
+
+    def _drop_view(self, tab):
+        view = self._views.pop(tab)
+        view["sidebar"].destroy()
+        view["main"].destroy()
 
-    # ── Tab switching ─────────────────────────────────────────────────────
     def _switch_tab(self, tab):
         prev = self.sel_tab.get()
         if prev in self._tab_lbl:
@@ -325,18 +535,45 @@ class App(tk.Tk):
         self.sel_tab.set(tab)
         if tab in self._tab_lbl:
             self._tab_lbl[tab].configure(fg=GOLD)
-        self.sel_item = None
-        self._list_rows = {}
-        for w in self._sidebar.winfo_children(): w.destroy()
-        for w in self._main.winfo_children():    w.destroy()
 
-        if tab in ("Restaurant", "Dishes", "Chefs", "Menus",
-                   "Customers", "Reservations", "Ingredients", "Awards"):
-            self._view_entity(tab)
-        elif tab == "Schema":
-            self._view_schema(tab)
-        elif tab == "Query":
-            self._view_query(tab)
+        cur = self._views.get(prev)
+        if cur:
+            cur["state"] = {k: getattr(self, k) for k in self._VIEW_STATE}
+            cur["sidebar"].pack_forget()
+            cur["main"].pack_forget()
+
+        view = self._views.get(tab)
+        if view and view["version"] != self._model_version:
+            self._drop_view(tab)
+            view = None
+        if view is None:
+            view = {"sidebar": tk.Frame(self._sidebar_host, bg=SURFACE),
+                    "main":    tk.Frame(self._main_host, bg=BG),
+                    "version": self._model_version, "state": None}
+            self._views[tab] = view
+        self._sidebar, self._main = view["sidebar"], view["main"]
+        self._sidebar.pack(fill="both", expand=True)
+        self._main.pack(fill="both", expand=True)
+        self._views.move_to_end(tab)
+
+        if view["state"] is not None:
+            for k, v in view["state"].items():
+                setattr(self, k, v)
+        else:
+            for k, v in self._VIEW_STATE.items():
+                setattr(self, k, dict(v) if isinstance(v, dict) else v)
+            if tab in self.entity_tabs:
+                with TIMER.phase("view.entity", len(self.groups.get(tab, ()))):
+                    self._view_entity(tab)
+            elif tab == "Schema":
+                with TIMER.phase("view.schema", len(self.classes)):
+                    self._view_schema(tab)
+            elif tab == "Query":
+                with TIMER.phase("view.query"):
+                    self._view_query(tab)
+
+        while len(self._views) > self.VIEW_CACHE:
+            self._drop_view(next(iter(self._views)))
 
     # ─────────────────────────────────────────────────────────────────────
     # ENTITY LIST + DETAIL
@@ -350,76 +587,181 @@ class App(tk.Tk):
                  bg=SURFACE, fg=GOLD).pack(side="left")
         tk.Label(hf, text=f"  {len(items)}", font=FONT_CODE,
                  bg=SURFACE, fg=MUTED).pack(side="left")
+        if tab == "Reservations" and len(self.model["time_index"]):
+            tl = tk.Label(hf, text="◷ TIMELINE", font=FONT_MICRO,
+                          bg=SURFACE, fg=GOLD_DIM, cursor="hand2")
+            tl.pack(side="right")
+            tl.bind("<Button-1>", lambda e: self._show_timeline())
+            tl.bind("<Enter>",    lambda e: tl.configure(fg=GOLD))
+            tl.bind("<Leave>",    lambda e: tl.configure(fg=GOLD_DIM))
         divider(self._sidebar, pady=(0, 0))
 
-        scroll_out, inner, _ = make_scrollable(self._sidebar, SURFACE)
-        scroll_out.pack(fill="both", expand=True)
-        self._list_rows = {}
-
-        for item in items:
-            info  = self.individuals.get(item, {})
-            dname = next((v for p, v in info.get("assertions", []) if p == "name"), item)
-            dname = dname[:35] + "…" if len(dname) > 37 else dname
-            types = info.get("types", [])
-            icon  = next((CLASS_ICONS.get(t) for t in types if t in CLASS_ICONS), "·")
-
-            row = tk.Frame(inner, bg=SURFACE, cursor="hand2")
-            row.pack(fill="x")
-            indicator = tk.Frame(row, bg=SURFACE, width=3)
-            indicator.place(x=0, y=0, relheight=1)
-            inner_row = tk.Frame(row, bg=SURFACE)
-            inner_row.pack(fill="x", padx=(10, 8))
-            icon_l = tk.Label(inner_row, text=icon, font=FONT_CODE,
-                              bg=SURFACE, fg=MUTED, width=2)
-            icon_l.pack(side="left", pady=8)
-            name_l = tk.Label(inner_row, text=dname, font=FONT_BODY,
-                              bg=SURFACE, fg=CREAM, anchor="w")
-            name_l.pack(side="left", fill="x", expand=True, pady=8)
-            sub = types[0] if types else ""
-            if sub and sub != tab:
-                tk.Label(inner_row, text=sub, font=FONT_MICRO,
-                         bg=SURFACE, fg=MUTED).pack(side="right", padx=(0, 4))
-
-            def _click(e, i=item, r=row, nl=name_l, ind=indicator, t=tab):
-                self._select(i, r, nl, ind, t)
-
-            all_ws = (row, inner_row, icon_l, name_l)
-            for w in all_ws:
-                w.bind("<Button-1>", _click)
-                w.bind("<Enter>",    lambda e, r2=row, nl2=name_l, ir=inner_row, il=icon_l, i2=item:
-                       (r2.configure(bg=CARD_HOV), nl2.configure(bg=CARD_HOV),
-                        ir.configure(bg=CARD_HOV), il.configure(bg=CARD_HOV))
-                       if self.sel_item != i2 else None)
-                w.bind("<Leave>",    lambda e, r2=row, nl2=name_l, ir=inner_row, il=icon_l, i2=item:
-                       (r2.configure(bg=SELECTED if i2==self.sel_item else SURFACE),
-                        nl2.configure(bg=SELECTED if i2==self.sel_item else SURFACE),
-                        ir.configure(bg=SELECTED if i2==self.sel_item else SURFACE),
-                        il.configure(bg=SELECTED if i2==self.sel_item else SURFACE)))
-
-            self._list_rows[item] = (row, name_l, indicator, inner_row, icon_l)
+        self._vlist = VirtualList(
+            self._sidebar, items,
+            describe=lambda i, t=tab: self._row_model(i, t),
+            on_click=lambda i, w, t=tab: self._select(i, t),
+            is_selected=lambda i: i == self.sel_item)
+        self._vlist.pack(fill="both", expand=True)
+        self._list_rows = self._vlist.bound
 
         if items:
-            r, l, ind, ir, il = self._list_rows[items[0]]
-            self._select(items[0], r, l, ind, tab)
-
-    def _select(self, item, row, name_lbl, indicator, tab):
-        if self.sel_item and self.sel_item in self._list_rows:
-            pr, pl, pi, pir, pil = self._list_rows[self.sel_item]
-            for w in (pr, pl, pir, pil): w.configure(bg=SURFACE)
-            pi.configure(bg=SURFACE)
-        self.sel_item = item
-        row.configure(bg=SELECTED)
-        name_lbl.configure(bg=SELECTED)
-        indicator.configure(bg=GOLD)
+            self._select(items[0], tab)
+
+    def _row_model(self, item, tab):
+        info  = self.individuals.get(item)
+        if info is None:
+            return "·", item, ""
+        dname = info.value("name", item)
+        dname = dname[:35] + "…" if len(dname) > 37 else dname
+        types = info["types"]
+        icon  = next((CLASS_ICONS.get(t) for t in types if t in CLASS_ICONS), "·")
+        sub   = types[0] if types else ""
+        return icon, dname, sub if sub != tab else ""
+
+    def _select(self, item, tab):
+        prev, self.sel_item = self.sel_item, item
+        for it in (prev, item):
+            if it in self._list_rows:
+                row, name_lbl, indicator, inner_row, icon_l = self._list_rows[it]
+                bg = SELECTED if it == item else SURFACE
+                for w in (row, name_lbl, inner_row, icon_l):
+                    w.configure(bg=bg)
+                indicator.configure(bg=GOLD if it == item else SURFACE)
+        for w in self._main.winfo_children(): w.destroy()
+        with TIMER.phase("view.detail", 1):
+            self._render_detail(item, tab)
+
+    # ── Reservations timeline ────────────────────────────────────────────
+    # Covers per day or hour as stacked bars, confirmed below pending. Only
+    # the slots that fit the canvas are asked of the time index, each from
+    # two of its running totals, so drawing and panning cost the same for a
+    # hundred bookings or a million. Clicking a bar lists that slot.
+    TIMELINE_H   = 240
+    TIMELINE_BAR = 16           # pixels per slot
+    TIMELINE_TICK = {"day": "%d %b", "hour": "%H:00"}
+
+    def _show_timeline(self):
+        ti = self.model["time_index"]
+        self.sel_item = None
+        self._vlist.scroll(0)
         for w in self._main.winfo_children(): w.destroy()
-        self._render_detail(item, tab)
+
+        pad = tk.Frame(self._main, bg=BG)
+        pad.pack(padx=40, pady=28, fill="both", expand=True)
+        tk.Label(pad, text="Reservations Timeline", font=FONT_TITLE, bg=BG, fg=CREAM).pack(anchor="w")
+        tk.Label(pad, text=f"{len(ti):,} bookings  ·  covers per slot, confirmed below pending",
+                 font=FONT_BODY, bg=BG, fg=MUTED).pack(anchor="w", pady=(2, 14))
+        divider(pad, GOLD_DIM)
+        bar = tk.Frame(pad, bg=BG)
+        bar.pack(fill="x", pady=(12, 6))
+        canvas = tk.Canvas(pad, bg=CARD, height=self.TIMELINE_H, highlightthickness=0, bd=0)
+        canvas.pack(fill="x")
+        status = tk.Label(pad, text=" ", font=FONT_CODE, bg=BG, fg=MUTED, pady=4, anchor="w")
+        status.pack(fill="x")
+        listing = tk.Frame(pad, bg=BG)
+        listing.pack(fill="both", expand=True)
+
+        # `end`: a moment in the last slot drawn; the window ends there.
+        view = {"by": "day", "end": ti.bounds()[1], "slots": [], "labels": {}}
+        when = lambda t: datetime.fromtimestamp(t, timezone.utc)
+
+        def draw():
+            step = SLOT_SECONDS[view["by"]]
+            w, h = max(canvas.winfo_width(), self.TIMELINE_BAR), self.TIMELINE_H
+            n    = w // self.TIMELINE_BAR
+            stop = view["end"] - view["end"] % step + step
+            with TIMER.phase("view.timeline", n):
+                view["slots"] = slots = ti.slots(stop - n * step, step, n)
+            canvas.delete("all")
+            base  = h - 22
+            top   = max((c + p for _, (_, _, c, p) in slots), default=0) or 1
+            scale = (base - 14) / top
+            bw, every = self.TIMELINE_BAR, max(1, 72 // self.TIMELINE_BAR)
+            tick = self.TIMELINE_TICK[view["by"]]
+            for k, (t, (_, _, c, p)) in enumerate(slots):
+                x0, x1 = k * bw + 2, (k + 1) * bw - 2
+                if c:
+                    canvas.create_rectangle(x0, base - c * scale, x1, base, fill=GOLD, width=0)
+                if p:
+                    canvas.create_rectangle(x0, base - (c + p) * scale, x1, base - c * scale,
+                                            fill=GOLD_DIM, width=0)
+                if k % every == 0:
+                    canvas.create_line(x0, base, x0, base + 4, fill=MUTED)
+                    canvas.create_text(x0, base + 12, text=f"{when(t):{tick}}", anchor="w",
+                                       font=FONT_MICRO, fill=MUTED)
+            canvas.create_line(0, base, w, base, fill=BORDER)
+            canvas.create_text(w - 6, 8, text=f"{top:,.0f} covers", anchor="ne",
+                               font=FONT_MICRO, fill=MUTED)
+            if slots:
+                label = BUCKETS[view["by"]]
+                span.configure(text=f"{label(when(slots[0][0]))}  –  {label(when(slots[-1][0]))}")
+
+        def slot_at(x):
+            k = int(x) // self.TIMELINE_BAR
+            return view["slots"][k] if 0 <= k < len(view["slots"]) else None
+
+        def hover(e):
+            got = slot_at(e.x)
+            if got is None:
+                status.configure(text=" ")
+                return
+            t, (conf, pend, c, p) = got
+            status.configure(text=f"  {BUCKETS[view['by']](when(t))}  ·  {conf:,} confirmed "
+                                  f"({cell_text(c)} covers)  ·  {pend:,} pending ({cell_text(p)} covers)")
+
+        def open_slot(e):
+            got = slot_at(e.x)
+            if got is not None:
+                t = got[0]
+                self._show_results(listing, ti.range(t, t + SLOT_SECONDS[view["by"]]), None)
+
+        def pan(slots):
+            view["end"] += slots * SLOT_SECONDS[view["by"]]
+            draw()
+
+        def page(sign):
+            pan(sign * max(1, canvas.winfo_width() // self.TIMELINE_BAR // 2))
+
+        def set_by(by):
+            view["by"] = by
+            for b, lbl in toggles.items():
+                lbl.configure(fg=GOLD if b == by else MUTED)
+            draw()
+
+        def button(text, command):
+            b = tk.Label(bar, text=text, font=FONT_CODE, bg=CARD, fg=GOLD,
+                         padx=8, pady=4, cursor="hand2")
+            b.pack(side="left", padx=(0, 5))
+            b.bind("<Button-1>", lambda e: command())
+            b.bind("<Enter>",    lambda e: b.configure(bg=CARD_HOV))
+            b.bind("<Leave>",    lambda e: b.configure(bg=CARD))
+            return b
+
+        button("◀", lambda: page(-1))
+        button("▶", lambda: page(1))
+        toggles = {by: button(by.upper(), lambda b=by: set_by(b)) for by in SLOT_SECONDS}
+        span = tk.Label(bar, font=FONT_CODE, bg=BG, fg=CREAM)
+        span.pack(side="left", padx=(10, 0))
+        set_by("day")
+
+        canvas.bind("<Configure>", lambda e: draw())
+        canvas.bind("<Motion>",    hover)
+        canvas.bind("<Leave>",     lambda e: status.configure(text=" "))
+        canvas.bind("<Button-1>",  open_slot)
+        canvas.bind("<MouseWheel>", lambda e: pan(-3 if e.delta > 0 else 3))
+        canvas.bind("<Button-4>",   lambda e: pan(-3))
+        canvas.bind("<Button-5>",   lambda e: pan(3))
 
     def _render_detail(self, item, tab):
         info       = self.individuals.get(item, {})
         assertions = info.get("assertions", [])
+        iid        = self.individuals.id_of(item)
+        typed      = self.individuals.typed(iid) if iid is not None else []
         by_prop    = defaultdict(list)
-        for p, v in assertions:
+        by_value   = defaultdict(list)
+        for (p, v), (_, x) in zip(assertions, typed):
             by_prop[p].append(v)
+            by_value[p].append(x)
 
         types = info.get("types", [])
         icon  = next((CLASS_ICONS.get(t) for t in types if t in CLASS_ICONS), "◦")
@@ -447,7 +789,7 @@ class App(tk.Tk):
         if "rating" in by_prop:
             r_row = tk.Frame(content, bg=BG)
             r_row.pack(anchor="w", pady=(6, 0))
-            tk.Label(r_row, text=star_str(by_prop["rating"][0]),
+            tk.Label(r_row, text=star_str(by_value["rating"][0]),
                      font=("Georgia", 12), bg=BG, fg=AMBER).pack(side="left")
 
         divider(content, GOLD_DIM, pady=(14, 14))
@@ -471,7 +813,8 @@ class App(tk.Tk):
             col_b.pack(side="left", fill="x", expand=True)
             for i, (prop, val) in enumerate(simple_p):
                 target = col_a if i % 2 == 0 else col_b
-                self._scalar_card(target, prop, val)
+                self._scalar_card(target, prop, val,
+                                  by_value[prop][0] if len(by_value[prop]) == 1 else val)
 
         if rel_p:
             divider(content, BORDER, pady=(4, 12))
@@ -480,6 +823,20 @@ class App(tk.Tk):
             for prop, vals in rel_p:
                 self._relation_group(content, prop, vals)
 
+        incoming = defaultdict(list)
+        if iid is not None:
+            for prop, src in self.adjacency.incoming(iid):
+                incoming[INVERSE_LABELS.get(prop, f"{prop} of")].append(
+                    self.individuals.name(src))
+        if incoming:
+            divider(content, BORDER, pady=(4, 12))
+            tk.Label(content, text="INCOMING", font=FONT_MICRO,
+                     bg=BG, fg=MUTED).pack(anchor="w", pady=(0, 6))
+            for label, vals in incoming.items():
+                self._relation_group(content, label, vals)
+        if iid is not None:
+            self._connections(content, iid)
+
         divider(content, BORDER, pady=(18, 10))
         uri_card = tk.Frame(content, bg=CARD, padx=14, pady=10)
         uri_card.pack(fill="x")
@@ -488,32 +845,34 @@ class App(tk.Tk):
                  bg=CARD, fg=GOLD_DIM, wraplength=680, justify="left"
                  ).pack(anchor="w", pady=(3, 0))
 
-    def _scalar_card(self, parent, prop, val):
+    def _scalar_card(self, parent, prop, text, val):
+        # `text` as written in the file, `val` as decoded (text again when it
+        # did not decode or the property has several values).
         card = tk.Frame(parent, bg=CARD, padx=12, pady=9)
         card.pack(fill="x", pady=3)
         tk.Label(card, text=prop, font=FONT_MICRO, bg=CARD, fg=MUTED).pack(anchor="w")
-        display, color = val, CREAM
+        display, color = text, CREAM
         if prop == "price":
-            try: display = f"${float(val):.2f}"
-            except: pass
+            if not isinstance(val, str): display = f"${val:.2f}"
             color = SAGE
         elif prop == "calories":
-            display = f"{val} kcal"; color = MUTED
+            display = f"{text} kcal"; color = MUTED
         elif prop == "isVegan":
-            display = "✓ Vegan" if val.lower()=="true" else "✗ Not Vegan"
-            color = SAGE if val.lower()=="true" else MUTED
+            display = "✓ Vegan" if val is True else "✗ Not Vegan"
+            color = SAGE if val is True else MUTED
         elif prop == "confirmed":
-            display = "✓ Confirmed" if val.lower()=="true" else "⚑ Pending"
-            color = SAGE if val.lower()=="true" else ROSE
+            display = "✓ Confirmed" if val is True else "⚑ Pending"
+            color = SAGE if val is True else ROSE
         elif prop == "seasonal":
-            display = "✦ Seasonal" if val.lower()=="true" else "● Year-round"
-            color = AMBER if val.lower()=="true" else MUTED
+            display = "✦ Seasonal" if val is True else "● Year-round"
+            color = AMBER if val is True else MUTED
         elif prop == "reservationDate":
-            display = val.replace("T", "  ·  ")
+            display = (f"{val:%Y-%m-%d  ·  %H:%M}" if isinstance(val, datetime)
+                       else text.replace("T", "  ·  "))
         elif prop == "yearsExperience":
-            display = f"{val} years"
+            display = f"{text} years"
         elif prop == "partySize":
-            display = f"Party of {val}"
+            display = f"Party of {text}"
         tk.Label(card, text=display, font=FONT_H2, bg=CARD, fg=color,
                  anchor="w").pack(anchor="w", pady=(2, 0))
 
@@ -525,42 +884,91 @@ class App(tk.Tk):
         wrap = tk.Frame(section, bg=BG)
         wrap.pack(fill="x")
         for val in values:
-            ref = self.individuals.get(val)
-            if ref:
-                dname = next((v for p2, v in ref["assertions"] if p2=="name"), val)
-                rtypes = ref.get("types", [])
-                icon  = next((CLASS_ICONS.get(t) for t in rtypes if t in CLASS_ICONS), "·")
-                pill  = tk.Frame(wrap, bg=CARD, padx=10, pady=6, cursor="hand2")
-                pill.pack(side="left", padx=(0, 6), pady=2)
-                tk.Label(pill, text=f"{icon}  {dname}", font=FONT_BODY,
-                         bg=CARD, fg=GOLD).pack()
-                pill.bind("<Button-1>", lambda e, v=val: self._jump(v))
-                pill.bind("<Enter>", lambda e, pp=pill: pp.configure(bg=CARD_HOV))
-                pill.bind("<Leave>", lambda e, pp=pill: pp.configure(bg=CARD))
-            else:
-                tk.Label(wrap, text=val, font=FONT_BODY, bg=BG, fg=CREAM
-                         ).pack(side="left", padx=(0, 10))
+            self._pill(wrap, val)
+
+    def _pill(self, parent, val):
+        ref = self.individuals.get(val)
+        if ref:
+            dname = next((v for p2, v in ref["assertions"] if p2=="name"), val)
+            rtypes = ref.get("types", [])
+            icon  = next((CLASS_ICONS.get(t) for t in rtypes if t in CLASS_ICONS), "·")
+            pill  = tk.Frame(parent, bg=CARD, padx=10, pady=6, cursor="hand2")
+            pill.pack(side="left", padx=(0, 6), pady=2)
+            tk.Label(pill, text=f"{icon}  {dname}", font=FONT_BODY,
+                     bg=CARD, fg=GOLD).pack()
+            pill.bind("<Button-1>", lambda e, v=val: self._jump(v))
+            pill.bind("<Enter>", lambda e, pp=pill: pp.configure(bg=CARD_HOV))
+            pill.bind("<Leave>", lambda e, pp=pill: pp.configure(bg=CARD))
+        else:
+            tk.Label(parent, text=val, font=FONT_BODY, bg=BG, fg=CREAM
+                     ).pack(side="left", padx=(0, 10))
+
+    def _connections(self, parent, iid):
+        # What lies one and two edges away, counted per tab, and a box that
+        # traces the shortest chain of relations to any other individual.
+        # This runs on the Tk thread, so a hub stops counting at the limit
+        # and its last level reads as lower bounds ("N+").
+        levels = neighbourhood(self.adjacency, self.individuals, iid, 2,
+                               limit=CONNECTION_LIMIT)
+        if not levels:
+            return
+        capped = sum(map(len, levels)) > CONNECTION_LIMIT
+        divider(parent, BORDER, pady=(4, 12))
+        tk.Label(parent, text="CONNECTIONS", font=FONT_MICRO,
+                 bg=BG, fg=MUTED).pack(anchor="w", pady=(0, 6))
+        for hop, ids in enumerate(levels, 1):
+            tabs = Counter(group_of(self.individuals.view(i), self.hierarchy) for i in ids)
+            more = "+" if capped and hop == len(levels) else ""
+            row  = tk.Frame(parent, bg=BG)
+            row.pack(fill="x", pady=1)
+            tk.Label(row, text=f"{hop} EDGE{'S' if hop > 1 else ''} AWAY", font=FONT_MICRO,
+                     bg=BG, fg=MUTED, width=14, anchor="w").pack(side="left")
+            tk.Label(row, text="  ·  ".join(f"{n:,}{more} {tab}" for tab, n in tabs.most_common()),
+                     font=FONT_BODY, bg=BG, fg=CREAM, anchor="w", justify="left",
+                     wraplength=560).pack(side="left")
+
+        box = tk.Frame(parent, bg=CARD, padx=12, pady=6)
+        box.pack(fill="x", pady=(10, 6))
+        tk.Label(box, text="PATH TO", font=FONT_MICRO, bg=CARD, fg=MUTED
+                 ).pack(side="left", padx=(0, 10))
+        var   = tk.StringVar()
+        entry = tk.Entry(box, textvariable=var, font=FONT_BODY, bg=CARD, fg=CREAM,
+                         insertbackground=GOLD, relief="flat", bd=0)
+        entry.pack(side="left", fill="x", expand=True, ipady=3)
+        out = tk.Frame(parent, bg=BG)
+        out.pack(fill="x")
+        entry.bind("<Return>", lambda e: self._trace_path(out, iid, var.get().strip()))
+
+    def _trace_path(self, out, iid, name):
+        for w in out.winfo_children():
+            w.destroy()
+        dst  = self.individuals.id_of(name)
+        path = (shortest_path(self.adjacency, self.individuals, iid, dst, PATH_HOPS)
+                if dst is not None else None)
+        if path is None:
+            msg = (f"No individual named “{name}”" if dst is None else
+                   f"Not connected within {PATH_HOPS} edges")
+            tk.Label(out, text=msg, font=FONT_BODY, bg=BG, fg=ROSE
+                     ).pack(anchor="w", pady=(2, 6))
+            return
+        # One row per hop: the relation (inverse label when walked backwards)
+        # followed by the individual it leads to.
+        for _, prop, v, forward in path_steps(self.adjacency, path):
+            row = tk.Frame(out, bg=BG)
+            row.pack(fill="x")
+            label = prop if forward else INVERSE_LABELS.get(prop, f"{prop} of")
+            tk.Label(row, text=f"↳ {label}", font=FONT_CODE, bg=BG, fg=MUTED,
+                     width=22, anchor="w").pack(side="left")
+            self._pill(row, self.individuals.name(v))
 
     def _jump(self, individual_id):
         info = self.individuals.get(individual_id)
         if not info: return
-        tab_map = {
-            "Restaurant": "Restaurant", "HeadChef": "Chefs", "SousChef": "Chefs",
-            "PastryChef": "Chefs", "VIPCustomer": "Customers",
-            "RegularCustomer": "Customers", "Starter": "Dishes",
-            "MainCourse": "Dishes", "Dessert": "Dishes",
-            "DegustationMenu": "Menus", "ALaCarteMenu": "Menus",
-            "SeasonalMenu": "Menus", "Reservation": "Reservations",
-            "Ingredient": "Ingredients", "Award": "Awards",
-        }
-        priority = list(tab_map.keys())
-        dt  = dominant_type(info, priority)
-        tab = tab_map.get(dt, "")
-        if tab:
+        tab = group_of(info, self.hierarchy)
+        if tab in self.entity_tabs:
             self._switch_tab(tab)
-            if individual_id in self._list_rows:
-                r, l, ind, ir, il = self._list_rows[individual_id]
-                self._select(individual_id, r, l, ind, tab)
+            self._vlist.see(individual_id)
+            self._select(individual_id, tab)
 
     # ─────────────────────────────────────────────────────────────────────
     # SCHEMA VIEW
@@ -635,16 +1043,29 @@ class App(tk.Tk):
             ("chef:karim",      "dishes by chef"),
             ("price:<30",       "dishes under $30"),
             ("price:>50",       "dishes over $50"),
+            ("price:20..40",    "price between"),
             ("rating:>4.7",     "highly rated"),
             ("vegan",           "vegan dishes"),
             ("confirmed",       "confirmed bookings"),
             ("pending",         "unconfirmed"),
-            ("party:>4",        "large parties"),
+            ("party:>=4",       "large parties"),
+            ("date:2025-03",    "bookings in a month"),
+            ("date:a..b",       "bookings between days"),
             ("seasonal",        "seasonal ingredients"),
             ("award:michelin",  "michelin awards"),
             ("vip",             "VIP customers"),
+            ("type:chef",       "chefs of every kind"),
             ("visits:>20",      "loyal customers"),
             ("<any text>",      "full-text search"),
+            ("x -> menus",      "related menus"),
+            ("path:a->b",       "how two are linked"),
+            ("near:a:2",        "within two edges"),
+            ("x | avg price",   "summarise matches"),
+            ("… by type",       "one row per group"),
+            ("a AND b",         "both filters"),
+            ("a OR b",          "either filter"),
+            ("NOT a",           "exclude matches"),
+            ("( … )",           "group terms"),
         ]
         for cmd, desc in hints:
             row = tk.Frame(self._sidebar, bg=SURFACE)
@@ -672,6 +1093,7 @@ class App(tk.Tk):
         tk.Button(entry_frame, text="SEARCH ▶", font=FONT_BADGE,
                   bg=GOLD_DIM, fg=CREAM, relief="flat", padx=12, cursor="hand2",
                   command=self._run_query).pack(side="right")
+        self._qvar.trace_add("write", lambda *a: self._query_typed())
 
         presets = [
             ("★ Rating > 4.8",    "rating:>4.8"),
@@ -683,6 +1105,9 @@ class App(tk.Tk):
             ("◆ VIP Customers",  "vip"),
             ("★ Awards",         "award:"),
             ("👑 Sofia's Dishes", "chef:sofia"),
+            ("✓ Top under $30",  "dish: AND price:<30 AND rating:>4.7"),
+            ("◈ Truffle menus",  "ingredient:truffle -> dishes -> menus"),
+            ("▦ Courses",        "dish: | count, avg rating, avg price by type"),
         ]
         prow = tk.Frame(pad, bg=BG)
         prow.pack(anchor="w", pady=(0, 14))
@@ -697,168 +1122,225 @@ class App(tk.Tk):
         self._qresult = tk.Frame(pad, bg=BG)
         self._qresult.pack(fill="both", expand=True)
 
+    # Queries run on the worker thread as the user types. Keystrokes are
+    # debounced; Return and the presets submit straight away. Each submission
+    # supersedes the last, and stale results are dropped on arrival.
+    QUERY_DEBOUNCE_MS = 180
+
+    def _query_typed(self):
+        if self._qdebounce:
+            self.after_cancel(self._qdebounce)
+        self._qdebounce = self.after(self.QUERY_DEBOUNCE_MS, self._run_query)
+
     def _run_query(self):
-        for w in self._qresult.winfo_children(): w.destroy()
-        q = self._qvar.get().strip().lower()
-        results = []
-
-        for item, info in self.individuals.items():
-            a     = {p: v for p, v in info.get("assertions", [])}
-            types = [t.lower() for t in info.get("types", [])]
-            name  = a.get("name", item).lower()
-            all_t = " ".join([item.lower(), name] + [v.lower() for _, v in info.get("assertions", [])])
-            match = False
-
-            if q.startswith("dish:"):
-                kw = q[5:]
-                if any(t in ("starter","maincourse","dessert") for t in types):
-                    match = kw in all_t
-            elif q.startswith("chef:"):
-                kw = q[5:]
-                if any(t in ("starter","maincourse","dessert") for t in types):
-                    chef_id = a.get("preparedBy","")
-                    if chef_id:
-                        ci = self.individuals.get(chef_id, {})
-                        cn = next((v for p,v in ci.get("assertions",[]) if p=="name"),"").lower()
-                        match = kw in cn
-            elif q.startswith("price:<"):
-                try:
-                    limit = float(q[7:])
-                    match = "price" in a and float(a["price"]) < limit
-                except: pass
-            elif q.startswith("price:>"):
-                try:
-                    limit = float(q[7:])
-                    match = "price" in a and float(a["price"]) > limit
-                except: pass
-            elif q.startswith("rating:>"):
-                try:
-                    limit = float(q[8:])
-                    match = "rating" in a and float(a["rating"]) > limit
-                except: pass
-            elif q == "vegan":
-                match = a.get("isVegan","false").lower() == "true"
-            elif q == "confirmed":
-                match = "reservation" in types and a.get("confirmed","false").lower() == "true"
-            elif q == "pending":
-                match = "reservation" in types and a.get("confirmed","true").lower() == "false"
-            elif q == "seasonal":
-                match = "ingredient" in types and a.get("seasonal","false").lower() == "true"
-            elif q == "vip":
-                match = "vipcustomer" in types
-            elif q.startswith("party:>"):
-                try:
-                    limit = int(q[7:])
-                    match = "reservation" in types and int(a.get("partySize",0)) > limit
-                except: pass
-            elif q.startswith("visits:>"):
-                try:
-                    limit = int(q[8:])
-                    match = int(a.get("totalVisits",0)) > limit
-                except: pass
-            elif q.startswith("award:"):
-                kw = q[6:]
-                if "award" in types:
-                    match = not kw or kw in all_t
-            elif q.startswith("ingredient:"):
-                kw = q[11:]
-                if "ingredient" in types:
-                    match = kw in all_t
-            elif q:
-                match = q in all_t
-
-            if match:
-                results.append((item, info, a))
-
-        tk.Label(self._qresult, text=f"  {len(results)} result{'s' if len(results)!=1 else ''}",
-                 font=FONT_CODE, bg=BG, fg=MUTED, pady=4).pack(anchor="w")
-        divider(self._qresult, BORDER, pady=(2, 8))
-
-        if not results:
-            tk.Label(self._qresult, text="No matches found.",
+        if self._qdebounce:
+            self.after_cancel(self._qdebounce)
+            self._qdebounce = None
+        frame = self._qresult
+        if frame is None or not frame.winfo_exists():
+            return
+        text = self._qvar.get()
+        if not text.strip():
+            self._qpending = None
+            for w in frame.winfo_children(): w.destroy()
+            return
+        first = self._qpending is None
+        self._qpending = (self._worker.submit(text), frame)
+        status = getattr(frame, "_status", None)
+        if status is not None and status.winfo_exists():
+            status.configure(text="  searching…")
+        if first:
+            self.after(16, self._poll_query)
+
+    def _poll_query(self):
+        if self._qpending is None:
+            return
+        gen, frame = self._qpending
+        while True:
+            try:
+                got, ids, exc = self._worker.results.get_nowait()
+            except queue.Empty:
+                break
+            if got == gen:
+                self._qpending = None
+                if frame.winfo_exists():
+                    with TIMER.phase("view.results", len(ids or ())):
+                        self._show_results(frame, ids, exc)
+                return
+        self.after(16, self._poll_query)
+
+    def _show_results(self, frame, ids, exc):
+        for w in frame.winfo_children(): w.destroy()
+        if exc is not None:
+            text = exc if isinstance(exc, QuerySyntaxError) else f"query failed: {exc!r}"
+            frame._status = tk.Label(frame, text=f"  {text}", font=FONT_CODE,
+                                     bg=BG, fg=ROSE, pady=4)
+            frame._status.pack(anchor="w")
+            return
+        if isinstance(ids, Table):
+            self._show_table(frame, ids)
+            return
+
+        # Only the ids are materialised; cards are built a page at a time as
+        # the list is scrolled, so the first page shows up at the same speed
+        # for 5 matches or 500k.
+        frame._status = tk.Label(frame, text=f"  {len(ids):,} result{'s' if len(ids)!=1 else ''}",
+                                 font=FONT_CODE, bg=BG, fg=MUTED, pady=4)
+        frame._status.pack(anchor="w")
+        divider(frame, BORDER, pady=(2, 8))
+
+        if not ids:
+            tk.Label(frame, text="No matches found.",
                      font=FONT_BODY, bg=BG, fg=MUTED).pack(anchor="w")
             return
 
-        scroll_out, inner, _ = make_scrollable(self._qresult, BG)
+        page = {"ids": ids, "shown": 0}
+        scroll_out, inner, _ = make_scrollable(
+            frame, BG, on_scroll=lambda top, bottom: self._more_results(page, bottom))
         scroll_out.pack(fill="both", expand=True)
+        more = tk.Label(frame, font=FONT_MICRO, bg=BG, fg=MUTED, cursor="hand2")
+        more.bind("<Button-1>", lambda e: self._more_results(page, 1.0))
+        page.update(inner=inner, more=more)
+        self._more_results(page, 1.0)
+
+    def _show_table(self, frame, table):
+        # Aggregates: one grid row per group, the group key first.
+        n = len(table)
+        frame._status = tk.Label(frame, text=f"  {n:,} group{'s' if n!=1 else ''}"
+                                 if table.keyed else "  summary",
+                                 font=FONT_CODE, bg=BG, fg=MUTED, pady=4)
+        frame._status.pack(anchor="w")
+        divider(frame, BORDER, pady=(2, 8))
+        if not n:
+            tk.Label(frame, text="No matches found.",
+                     font=FONT_BODY, bg=BG, fg=MUTED).pack(anchor="w")
+            return
 
-        tab_map = {
-            "Restaurant": "Restaurant", "HeadChef": "Chefs", "SousChef": "Chefs",
-            "PastryChef": "Chefs", "VIPCustomer": "Customers",
-            "RegularCustomer": "Customers", "Starter": "Dishes",
-            "MainCourse": "Dishes", "Dessert": "Dishes",
-            "DegustationMenu": "Menus", "ALaCarteMenu": "Menus",
-            "SeasonalMenu": "Menus", "Reservation": "Reservations",
-            "Ingredient": "Ingredients", "Award": "Awards",
-        }
-        priority = list(tab_map.keys())
-
-        for item, info, a in results:
-            types = info.get("types", [])
-            icon  = next((CLASS_ICONS.get(t) for t in types if t in CLASS_ICONS), "·")
-            dname = a.get("name", item)
-            dt    = dominant_type(info, priority)
-
-            card = tk.Frame(inner, bg=CARD, padx=16, pady=12, cursor="hand2")
-            card.pack(fill="x", pady=3)
-            hrow = tk.Frame(card, bg=CARD)
-            hrow.pack(fill="x")
-            tk.Label(hrow, text=icon, font=FONT_CODE, bg=CARD, fg=MUTED
-                     ).pack(side="left", padx=(0, 8))
-            tk.Label(hrow, text=dname, font=FONT_H2, bg=CARD, fg=GOLD
-                     ).pack(side="left")
-            chips_row = tk.Frame(card, bg=CARD)
-            chips_row.pack(anchor="w", pady=(4, 2))
-            for t in types:
-                add_chip(chips_row, t, fg=GOLD_DIM, bg=SURFACE)
-
-            facts = []
-            for key, label in [("rating","★"), ("price","$"), ("partySize","party"),
-                                ("calories","kcal"), ("origin","from"), ("year","yr")]:
-                if key in a:
-                    v = a[key]
-                    if key == "price":  v = f"${float(v):.2f}"
-                    elif key == "rating": v = f"★ {float(v):.1f}"
-                    elif key == "partySize": v = f"party of {v}"
-                    elif key == "calories": v = f"{v} kcal"
-                    elif key == "year": v = f"{v}"
-                    else: v = f"{label} {v}"
-                    facts.append(str(v))
-            if facts:
-                tk.Label(card, text="   ".join(facts[:4]),
-                         font=FONT_CODE, bg=CARD, fg=MUTED).pack(anchor="w")
-
-            card.bind("<Button-1>", lambda e, i=item: self._jump(i))
-            card.bind("<Enter>",    lambda e, c=card: c.configure(bg=CARD_HOV))
-            card.bind("<Leave>",    lambda e, c=card: c.configure(bg=CARD))
+        scroll_out, inner, _ = make_scrollable(frame, BG)
+        scroll_out.pack(fill="both", expand=True)
+        grid = tk.Frame(inner, bg=CARD, padx=16, pady=12)
+        grid.pack(fill="x", pady=3)
+        for c, name in enumerate(table.columns):
+            key = c == 0 and table.keyed
+            tk.Label(grid, text=name.upper(), font=FONT_MICRO, bg=CARD, fg=MUTED
+                     ).grid(row=0, column=c, sticky="w" if key else "e", padx=(0, 24), pady=(0, 6))
+        with TIMER.phase("view.table", min(n, self.TABLE_ROWS)):
+            for r, row in enumerate(table.rows[:self.TABLE_ROWS], 1):
+                for c, v in enumerate(row):
+                    key = c == 0 and table.keyed
+                    tk.Label(grid, text=cell_text(v), font=FONT_CODE, bg=CARD,
+                             fg=GOLD if key else CREAM
+                             ).grid(row=r, column=c, sticky="w" if key else "e", padx=(0, 24))
+        if n > self.TABLE_ROWS:
+            tk.Label(inner, text=f"  showing the first {self.TABLE_ROWS:,} of {n:,} groups  ·  "
+                                 f"the query command prints them all",
+                     font=FONT_MICRO, bg=BG, fg=MUTED).pack(anchor="w", pady=(4, 0))
+
+    def _more_results(self, page, bottom):
+        if "inner" not in page or page["shown"] >= len(page["ids"]) or float(bottom) < 0.9:
+            return
+        if not page["inner"].winfo_exists():
+            return
+        ids   = page["ids"]
+        start = page["shown"]
+        page["shown"] = end = min(len(ids), start + self.RESULT_PAGE)
+        with TIMER.phase("view.page", end - start):
+            for iid in ids[start:end]:
+                self._result_card(page["inner"], iid)
+        more = page["more"]
+        if end < len(ids):
+            more.configure(text=f"  showing {end:,} of {len(ids):,}  ·  scroll or click for more")
+            more.pack(anchor="w", pady=(4, 0))
+        else:
+            more.pack_forget()
+
+    def _result_card(self, parent, iid):
+        st    = self.individuals
+        item  = st.name(iid)
+        info  = st.view(iid)
+        a     = dict(st.typed(iid))
+        types = info["types"]
+        icon  = next((CLASS_ICONS.get(t) for t in types if t in CLASS_ICONS), "·")
+        dname = a.get("name", item)
+
+        card = tk.Frame(parent, bg=CARD, padx=16, pady=12, cursor="hand2")
+        card.pack(fill="x", pady=3)
+        hrow = tk.Frame(card, bg=CARD)
+        hrow.pack(fill="x")
+        tk.Label(hrow, text=icon, font=FONT_CODE, bg=CARD, fg=MUTED
+                 ).pack(side="left", padx=(0, 8))
+        tk.Label(hrow, text=dname, font=FONT_H2, bg=CARD, fg=GOLD
+                 ).pack(side="left")
+        chips_row = tk.Frame(card, bg=CARD)
+        chips_row.pack(anchor="w", pady=(4, 2))
+        for t in types:
+            add_chip(chips_row, t, fg=GOLD_DIM, bg=SURFACE)
+
+        facts = []
+        for key, label in [("rating","★"), ("price","$"), ("partySize","party"),
+                            ("calories","kcal"), ("origin","from"), ("year","yr")]:
+            if key in a:
+                v = a[key]
+                if isinstance(v, str) and key in ("price", "rating"):
+                    v = f"{label} {v}"
+                elif key == "price":  v = f"${v:.2f}"
+                elif key == "rating": v = f"★ {v:.1f}"
+                elif key == "partySize": v = f"party of {v}"
+                elif key == "calories": v = f"{v} kcal"
+                elif key == "year": v = f"{v}"
+                else: v = f"{label} {v}"
+                facts.append(str(v))
+        if facts:
+            tk.Label(card, text="   ".join(facts[:4]),
+                     font=FONT_CODE, bg=CARD, fg=MUTED).pack(anchor="w")
+
+        card.bind("<Button-1>", lambda e, i=item: self._jump(i))
+        card.bind("<Enter>",    lambda e, c=card: c.configure(bg=CARD_HOV))
+        card.bind("<Leave>",    lambda e, c=card: c.configure(bg=CARD))
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # ENTRY POINT
 # ─────────────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
-    import sys
-    path = None
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    for c in ["maison_elite.owl",
-              os.path.join(script_dir, "maison_elite.owl"),
-              "hello1.owl",
-              os.path.join(script_dir, "hello1.owl")]:
-        if os.path.exists(c):
-            path = c
-            break
-
-    if not path:
+    import argparse
+    ap = argparse.ArgumentParser(
+        description="Maison Élite ontology explorer",
+        epilog='headless: "%(prog)s query --help" runs Smart Queries without the GUI')
+    ap.add_argument("owl", nargs="*",
+                    help="OWL/RDF files or directories to open; local owl:imports are followed")
+    ap.add_argument("-j", "--jobs", type=int,
+                    help="processes parsing files in parallel (default: one per core)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="parse the OWL file without reading or writing the snapshot cache")
+    ap.add_argument("--rebuild-cache", action="store_true",
+                    help="ignore any existing snapshot and write a fresh one")
+    ap.add_argument("--watch", action="store_true",
+                    help="reload edits to the OWL files while the app is open")
+    ap.add_argument("--db", metavar="FILE",
+                    help="browse from this SQLite database (ingested from the OWL files "
+                         "when missing or stale) instead of loading everything into memory")
+    add_profile_args(ap)
+    args = ap.parse_args()
+    if args.watch and args.db:
+        ap.error("--watch works on the in-memory model; drop --db to use it")
+    apply_profile_args(args)
+
+    path = args.owl or (None if args.db else find_default_owl())
+
+    if not path and not args.db:
         root_tmp = tk.Tk()
         root_tmp.withdraw()
         path = filedialog.askopenfilename(
             title="Locate your OWL ontology file",
-            filetypes=[("OWL Files", "*.owl *.rdf"), ("All Files", "*.*")]
+            filetypes=[("Ontology Files", "*.owl *.rdf *.nt *.ttl"), ("All Files", "*.*")]
         )
         root_tmp.destroy()
 
-    if not path:
+    if not path and not args.db:
         print("No OWL file selected.")
         sys.exit(0)
 
-    App(path).mainloop()
+    App(path, console_progress(sys.stderr), use_cache=not args.no_cache,
+        rebuild_cache=args.rebuild_cache, workers=args.jobs,
+        watch=args.watch, db=args.db).mainloop()
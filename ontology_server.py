@@ -0,0 +1,302 @@
+"""
+Maison Élite · Ontology query service
+
+Loads the ontology once and answers Smart Queries, entity lookups and schema
+requests as JSON over HTTP on localhost, so several dashboards can share one
+copy of the model. Standard library only (asyncio).
+
+Run : python ontology_explorer.py serve --port 8765
+
+  GET /query?q=<smart query>&offset=0&limit=100
+  GET /query?q=dish: | avg rating by type      (aggregates: columns and rows)
+  GET /occupancy?window=2025-03-01..2025-03-07&by=hour   (bookings per slot)
+  GET /entity/<name>
+  GET /schema
+  GET /metrics
+"""
+import asyncio
+import json
+import sys
+import time
+import traceback
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from ontology_engine import (
+    SLOT_SECONDS, TIMER, QueryCancelled, QueryEngine, QuerySyntaxError, Table, group_of,
+    occupancy_table, parse_window, record,
+)
+
+MAX_LIMIT     = 1000
+QUERY_TIMEOUT = 10.0        # seconds before a running query is abandoned
+MAX_HEADER    = 16 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 431: "Request Header Fields Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# RESPONSE CACHE  ·  METRICS
+# ─────────────────────────────────────────────────────────────────────────────
+# Encoded response bodies keyed by request target, evicted least-recently-used
+# once either the entry count or the total byte size is exceeded.
+class ResponseCache:
+    def __init__(self, max_entries=512, max_bytes=32 << 20):
+        self.max_entries = max_entries
+        self.max_bytes   = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        body = self._items.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._items[key] = body
+        self._bytes += len(body)
+        while len(self._items) > self.max_entries or self._bytes > self.max_bytes:
+            _, dropped = self._items.popitem(last=False)
+            self._bytes -= len(dropped)
+
+    def clear(self):
+        self._items.clear()
+        self._bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._items), "bytes": self._bytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+# Per-route request counts and latency percentiles over a sliding window of
+# the most recent requests.
+class Metrics:
+    WINDOW = 2048
+
+    def __init__(self):
+        self.started = time.time()
+        self.count   = defaultdict(int)
+        self.errors  = defaultdict(int)
+        self.recent  = defaultdict(lambda: deque(maxlen=self.WINDOW))
+        self.inflight = 0
+
+    def observe(self, route, seconds, status):
+        self.count[route] += 1
+        if status >= 400:
+            self.errors[route] += 1
+        self.recent[route].append(seconds)
+
+    def snapshot(self):
+        routes = {}
+        for route, n in self.count.items():
+            lat = sorted(self.recent[route])
+            pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 3)
+            routes[route] = {"requests": n, "errors": self.errors[route],
+                             "p50_ms": pct(0.50), "p95_ms": pct(0.95),
+                             "p99_ms": pct(0.99), "max_ms": round(lat[-1] * 1000, 3)}
+        return {"uptime_s": round(time.time() - self.started, 1),
+                "inflight": self.inflight, "routes": routes}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SERVICE
+# ─────────────────────────────────────────────────────────────────────────────
+class OntologyService:
+    def __init__(self, model, workers=4, cache=None):
+        self.model    = model
+        self.store    = model["individuals"]
+        self.engine   = QueryEngine.from_model(model)
+        self.cache    = cache or ResponseCache()
+        self.metrics  = Metrics()
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix="query")
+
+    # ── handlers (return JSON-able data) ─────────────────────────────────
+    def query(self, params):
+        text = params.get("q", [""])[0]
+        try:
+            offset = max(0, int(params.get("offset", ["0"])[0]))
+            limit  = min(MAX_LIMIT, max(0, int(params.get("limit", ["100"])[0])))
+        except ValueError:
+            raise HTTPError(400, "offset and limit must be integers")
+        deadline = time.monotonic() + QUERY_TIMEOUT
+        try:
+            ids = self.engine.run(text, cancelled=lambda: time.monotonic() > deadline)
+        except QuerySyntaxError as exc:
+            raise HTTPError(400, str(exc))
+        except QueryCancelled:
+            raise HTTPError(503, f"query exceeded {QUERY_TIMEOUT:g}s")
+        if isinstance(ids, Table):
+            return {"query": text, "count": len(ids), "offset": offset,
+                    "columns": ids.columns, "rows": ids.rows[offset:offset + limit]}
+        page = ids[offset:offset + limit]
+        return {"query": text, "count": len(ids), "offset": offset,
+                "results": [record(self.store, i) for i in page]}
+
+    def occupancy(self, params):
+        window = params.get("window", [""])[0]
+        by     = params.get("by", ["day"])[0]
+        if by not in SLOT_SECONDS:
+            raise HTTPError(400, f"by must be one of {', '.join(SLOT_SECONDS)}")
+        try:
+            lo, hi = parse_window(window) if window else (None, None)
+            table  = occupancy_table(self.model["time_index"], lo, hi, by)
+        except ValueError as exc:
+            raise HTTPError(400, str(exc))
+        return {"window": window, "by": by, "columns": table.columns, "rows": table.rows}
+
+    def entity(self, name):
+        iid = self.store.id_of(name)
+        if iid is None:
+            raise HTTPError(404, f"no individual named {name!r}")
+        out = record(self.store, iid)
+        incoming = defaultdict(list)
+        for prop, src in self.model["adjacency"].incoming(iid):
+            incoming[prop].append(self.store.name(src))
+        out["incoming"] = incoming
+        out["group"] = group_of(self.store.view(iid), self.model["hierarchy"])
+        return out
+
+    def schema(self):
+        m = self.model
+        return {"classes": m["classes"], "sub_classes": m["sub_classes"],
+                "obj_props": m["obj_props"], "data_props": m["data_props"],
+                "groups": {tab: len(names) for tab, names in m["groups"].items()},
+                "individuals": len(self.store)}
+
+    def metrics_report(self):
+        out = dict(self.metrics.snapshot(), cache=self.cache.stats())
+        if TIMER.enabled:
+            # Engine phases (query evaluation, loading) when run with --profile.
+            out["phases"] = {n: {"count": c, "total_ms": round(t * 1000, 3),
+                                 "max_ms": round(m * 1000, 3), "items": i}
+                             for n, c, t, _, m, i in TIMER.report()}
+        return out
+
+    def route(self, path, params):
+        # -> (route name for metrics, cacheable?, callable producing data)
+        if path == "/query":
+            return "query", True, lambda: self.query(params)
+        if path == "/occupancy":
+            return "occupancy", True, lambda: self.occupancy(params)
+        if path.startswith("/entity/") and len(path) > 8:
+            name = unquote(path[8:])
+            return "entity", True, lambda: self.entity(name)
+        if path == "/schema":
+            return "schema", True, self.schema
+        if path == "/metrics":
+            return "metrics", False, self.metrics_report
+        raise HTTPError(404, f"unknown endpoint {path}")
+
+    # ── HTTP ─────────────────────────────────────────────────────────────
+    async def handle(self, method, target):
+        # -> (route, status, body); errors are answered as {"error": …}
+        route = "other"
+        try:
+            if method not in ("GET", "HEAD"):
+                raise HTTPError(405, f"{method} not supported")
+            url = urlsplit(target)
+            route, cacheable, produce = self.route(url.path, parse_qs(url.query))
+            key  = f"{url.path}?{url.query}"
+            body = self.cache.get(key) if cacheable else None
+            if body is None:
+                # Lookups are cheap but queries are not; every handler runs on
+                # the pool so a slow query never stalls the event loop.
+                loop = asyncio.get_running_loop()
+                data = await loop.run_in_executor(self.executor, produce)
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                if cacheable:
+                    self.cache.put(key, body)
+            return route, 200, body
+        except HTTPError as exc:
+            return route, exc.status, json.dumps({"error": str(exc)}).encode("utf-8")
+        except Exception as exc:
+            # A bug in a handler still gets an answer; the connection stays usable.
+            traceback.print_exc(file=sys.stderr)
+            return route, 500, json.dumps({"error": f"internal error: {exc!r}"}).encode("utf-8")
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, b'{"error": "header too large"}', False)
+                    return
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                parts = lines[0].split()
+                if len(parts) != 3:
+                    await self._respond(writer, 400, b'{"error": "bad request line"}', False)
+                    return
+                method, target, version = parts
+                headers = {k.strip().lower(): v.strip() for k, _, v in
+                           (l.partition(":") for l in lines[1:] if l)}
+                conn = headers.get("connection", "").lower()
+                keep = conn == "keep-alive" if version == "HTTP/1.0" else conn != "close"
+
+                started = time.perf_counter()
+                self.metrics.inflight += 1
+                try:
+                    route, status, body = await self.handle(method, target)
+                finally:
+                    self.metrics.inflight -= 1
+                self.metrics.observe(route, time.perf_counter() - started, status)
+                await self._respond(writer, status, b"" if method == "HEAD" else body,
+                                    keep, len(body))
+                if not keep:
+                    return
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, body, keep, length=None):
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body) if length is None else length}\r\n"
+                f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+async def serve(model, host="127.0.0.1", port=8765, workers=4, ready=None):
+    service = OntologyService(model, workers)
+    server  = await asyncio.start_server(service.serve_client, host, port,
+                                         limit=MAX_HEADER)
+    if ready is not None:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+
+def run(model, host="127.0.0.1", port=8765, workers=4):
+    def _ready(server):
+        addr = server.sockets[0].getsockname()
+        print(f"Serving {len(model['individuals']):,} individuals on "
+              f"http://{addr[0]}:{addr[1]}/", file=sys.stderr)
+    try:
+        asyncio.run(serve(model, host, port, workers, _ready))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,587 @@
+"""
+Maison Élite · SQLite store
+
+Optional out-of-core backend. The ontology is ingested once into a local
+SQLite database (individuals, types, assertions, a trigram text table), and
+reopening it reads only the schema: entities, tab lists and query terms are
+fetched on demand through indexed SQL. The classes here answer the same calls
+as IndividualStore and the in-memory indexes, so the query engine, explorer,
+CLI and server run on either unchanged. Standard library only (sqlite3).
+
+Run : python ontology_explorer.py --db maison.db maison_elite.owl    # ingest once, then reuse
+      python ontology_explorer.py query "price:<30" --db maison.db  # reopen without the sources
+"""
+import json
+import os
+import sqlite3
+import threading
+from array import array
+from collections import defaultdict
+from collections.abc import Mapping, Sequence
+from urllib.request import pathname2url
+
+from ontology_engine import (
+    REF, TIMER, XSD_NUMERIC, ClassHierarchy, IndividualView, NUMERIC_ALIASES,
+    QueryCancelled, TimeIndex, _sources_current, doc_text, group_individuals,
+    owl_sources, parse_sources, typed_value,
+)
+
+DB_VERSION = 3
+BATCH      = 500            # ids per "IN (…)" list
+ENTITIES   = 4096           # entities kept decoded per store
+PAGE       = 256            # tab list names fetched at a time
+
+SCHEMA = """
+CREATE TABLE meta  (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE ind   (id INTEGER PRIMARY KEY, name TEXT NOT NULL, uri TEXT NOT NULL,
+                    tab TEXT NOT NULL, pos INTEGER NOT NULL);
+CREATE TABLE types (id INTEGER NOT NULL, cls TEXT NOT NULL);
+CREATE TABLE asr   (s INTEGER NOT NULL, p TEXT NOT NULL, o TEXT NOT NULL,
+                    kind INTEGER NOT NULL, num REAL, dst INTEGER);
+CREATE TABLE booking (pos INTEGER PRIMARY KEY, t REAL NOT NULL, s INTEGER NOT NULL,
+                      conf REAL, covers REAL, conf_covers REAL);
+"""
+# Built after the bulk insert. asr_num is the typed literal value index,
+# asr_dst the object index of resolved references. booking holds TimeIndex's
+# arrays: bookings in time order with the running totals before each one.
+INDEXES = """
+CREATE UNIQUE INDEX ind_name ON ind (name);
+CREATE INDEX ind_tab   ON ind (tab, pos);
+CREATE INDEX types_id  ON types (id);
+CREATE INDEX types_cls ON types (cls, id);
+CREATE INDEX asr_s     ON asr (s);
+CREATE INDEX asr_num   ON asr (p, num) WHERE num IS NOT NULL;
+CREATE INDEX asr_dst   ON asr (dst) WHERE dst IS NOT NULL;
+CREATE INDEX booking_t ON booking (t);
+"""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# INGEST
+# ─────────────────────────────────────────────────────────────────────────────
+def _numeric_props(data_props):
+    return {p: info["range"] for p, info in data_props.items()
+            if info.get("range") in XSD_NUMERIC or info.get("range") == "boolean"}
+
+
+def _asr_rows(store):
+    # `num` is the literal as the store decoded it (see IndividualStore).
+    for iid in store.ids():
+        for (p, o, kind), num in zip(store.entries(iid), store.numbers(iid)):
+            yield iid, p, o, kind, num, store.id_of(o) if kind == REF else None
+
+
+def ingest(paths, db, progress=None, workers=None):
+    # Parses the sources and writes a fresh database to `db`, replacing any
+    # older one only once it is complete.
+    with TIMER.phase("parse") as ph:
+        parts, files, unresolved = parse_sources(paths, progress, workers)
+        ph.items = len(parts[4])
+    classes, sub_classes, obj_props, data_props, store = parts
+    hierarchy = ClassHierarchy(classes)
+    groups    = group_individuals(store, hierarchy)
+    numeric   = _numeric_props(data_props)
+
+    tmp = f"{db}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    with TIMER.phase("db.ingest", len(store)):
+        conn = sqlite3.connect(tmp)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.executescript(SCHEMA)
+            try:
+                conn.execute("CREATE VIRTUAL TABLE doc USING "
+                             "fts5(text, tokenize='trigram case_sensitive 1')")
+                fts = True
+            except sqlite3.OperationalError:
+                # No FTS5 in this SQLite build: same answers, scanned.
+                conn.execute("CREATE TABLE doc (text TEXT)")
+                fts = False
+            conn.executemany("INSERT INTO ind VALUES (?, ?, ?, ?, ?)",
+                             ((store.id_of(n), n, store.uri(store.id_of(n)), tab, k)
+                              for tab, names in groups.items()
+                              for k, n in enumerate(names)))
+            conn.executemany("INSERT INTO types VALUES (?, ?)",
+                             ((iid, t) for iid in store.ids() for t in store.types(iid)))
+            conn.executemany("INSERT INTO asr VALUES (?, ?, ?, ?, ?, ?)",
+                             _asr_rows(store))
+            conn.executemany("INSERT INTO doc (rowid, text) VALUES (?, ?)",
+                             ((iid, doc_text(store, iid)) for iid in store.ids()))
+            ti = TimeIndex(store)
+            conn.executemany("INSERT INTO booking VALUES (?, ?, ?, ?, ?, ?)",
+                             zip(range(len(ti)), ti.times, ti.ids,
+                                 ti._conf, ti._covers, ti._conf_covers))
+            conn.executescript(INDEXES)
+            used = {p for (p,) in conn.execute(
+                "SELECT DISTINCT p FROM asr WHERE num IS NOT NULL")}
+            meta = {
+                "classes": classes, "sub_classes": sub_classes,
+                "obj_props": obj_props, "data_props": data_props,
+                "numeric": {p: r for p, r in numeric.items() if p in used},
+                "sources": {"inputs": owl_sources(paths), "files": files},
+                "unresolved_imports": unresolved, "fts": fts,
+                "bookings": ti._prefix(float("inf")),
+                "diagnostics": [d for d in store.diagnostics if d[0] not in store.removed],
+            }
+            conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                             ((k, json.dumps(v, ensure_ascii=False)) for k, v in meta.items()))
+            conn.execute(f"PRAGMA user_version = {DB_VERSION}")
+            conn.commit()
+        finally:
+            conn.close()
+    os.replace(tmp, db)
+
+
+def _head(db):
+    # -> meta "sources" of a usable database, or None
+    try:
+        conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(db))}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != DB_VERSION:
+            return None
+        row = conn.execute("SELECT value FROM meta WHERE key = 'sources'").fetchone()
+        return json.loads(row[0]) if row else None
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def load_database(paths, db, progress=None, rebuild=False, workers=None):
+    # Opens `db`, (re)ingesting `paths` first when the database is missing,
+    # from another version, or older than the sources. With no `paths` an
+    # existing database is opened as it is.
+    head = None if rebuild else _head(db)
+    if head is not None and paths:
+        valid, touched = _sources_current(paths, head)
+        if not valid:
+            head = None
+        elif touched:
+            conn = sqlite3.connect(db)
+            with conn:
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'sources'",
+                             (json.dumps(head),))
+            conn.close()
+    if head is None:
+        if not paths:
+            raise FileNotFoundError(f"{db} is not a usable database; give the sources to ingest")
+        ingest(paths, db, progress, workers)
+    with TIMER.phase("db.open") as ph:
+        model = open_database(db)
+        ph.items = len(model["individuals"])
+    return model
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# STORE
+# ─────────────────────────────────────────────────────────────────────────────
+class _Database:
+    # One read-only connection per thread: the query worker, the server pool
+    # and the Tk thread each get their own.
+    def __init__(self, path):
+        self.uri    = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+        self._local = threading.local()
+
+    def conn(self):
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = self._local.conn = sqlite3.connect(self.uri, uri=True,
+                                                   check_same_thread=False)
+        return c
+
+    def all(self, sql, args=()):
+        return self.conn().execute(sql, args).fetchall()
+
+    def one(self, sql, args=()):
+        return self.conn().execute(sql, args).fetchone()
+
+    def ids(self, sql, args=(), check=None):
+        # First column of every row; `check` may raise QueryCancelled, which
+        # interrupts the statement.
+        conn = self.conn()
+        if check is None:
+            return [r[0] for r in conn.execute(sql, args)]
+        stopped = []
+
+        def tick():
+            try:
+                check()
+            except QueryCancelled:
+                stopped.append(True)
+                return 1
+            return 0
+        conn.set_progress_handler(tick, 20000)
+        try:
+            return [r[0] for r in conn.execute(sql, args)]
+        except sqlite3.OperationalError:
+            if stopped:
+                raise QueryCancelled() from None
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    def batched(self, sql, ids):
+        # `sql` has one "{}" for a parameter list; ids go in BATCH at a time.
+        ids, out = list(ids), []
+        for k in range(0, len(ids), BATCH):
+            chunk = ids[k:k + BATCH]
+            out += self.all(sql.format(",".join("?" * len(chunk))), chunk)
+        return out
+
+
+class SQLiteStore(Mapping):
+    # IndividualStore's read side over the database. An entity's name, URI,
+    # types and rows are fetched together on first use and kept in a bounded
+    # cache; nothing is loaded up front except the count.
+    removed = frozenset()
+
+    def __init__(self, db):
+        self._db   = db
+        self._ents = {}
+        self._len  = db.one("SELECT COUNT(*) FROM ind")[0]
+        self._top  = db.one("SELECT COALESCE(MAX(id) + 1, 0) FROM ind")[0]
+        self.diagnostics = [tuple(d) for d in json.loads(
+            db.one("SELECT value FROM meta WHERE key = 'diagnostics'")[0])]
+
+    def _entity(self, iid):
+        ent = self._ents.get(iid)
+        if ent is None:
+            db  = self._db
+            row = db.one("SELECT name, uri FROM ind WHERE id = ?", (iid,))
+            if row is None:
+                raise KeyError(iid)
+            types = [t for (t,) in db.all(
+                "SELECT cls FROM types WHERE id = ? ORDER BY rowid", (iid,))]
+            rows  = db.all("SELECT p, o, kind, num FROM asr WHERE s = ? ORDER BY rowid",
+                           (iid,))
+            if len(self._ents) >= ENTITIES:
+                self._ents.clear()
+            ent = self._ents[iid] = (row[0], row[1], types, rows)
+        return ent
+
+    def id_of(self, name):
+        row = self._db.one("SELECT id FROM ind WHERE name = ?", (name,))
+        return row[0] if row else None
+
+    def name(self, iid):
+        # Result lists name many more individuals than are ever opened.
+        ent = self._ents.get(iid)
+        if ent is not None:
+            return ent[0]
+        row = self._db.one("SELECT name FROM ind WHERE id = ?", (iid,))
+        if row is None:
+            raise KeyError(iid)
+        return row[0]
+
+    def uri(self, iid):
+        return self._entity(iid)[1]
+
+    def types(self, iid):
+        return list(self._entity(iid)[2])
+
+    def assertions(self, iid):
+        return [(p, o) for p, o, _, _ in self._entity(iid)[3]]
+
+    def entries(self, iid):
+        return [(p, o, k) for p, o, k, _ in self._entity(iid)[3]]
+
+    def numbers(self, iid):
+        return [x for _, _, _, x in self._entity(iid)[3]]
+
+    def typed(self, iid):
+        return [(p, typed_value(x, k) if k > REF and x is not None else o)
+                for p, o, k, x in self._entity(iid)[3]]
+
+    def value(self, iid, prop, default=None):
+        for p, o, _, _ in self._entity(iid)[3]:
+            if p == prop:
+                return o
+        return default
+
+    def literal(self, iid, prop, default=None):
+        for p, v in self.typed(iid):
+            if p == prop:
+                return v
+        return default
+
+    def ids(self):
+        return iter(self._db.ids("SELECT id FROM ind ORDER BY id"))
+
+    def id_count(self):
+        return self._top
+
+    def view(self, iid):
+        return IndividualView(self, iid)
+
+    def __getitem__(self, name):
+        iid = self.id_of(name)
+        if iid is None:
+            raise KeyError(name)
+        return IndividualView(self, iid)
+
+    def __contains__(self, name):
+        return self.id_of(name) is not None
+
+    def __iter__(self):
+        cur = self._db.conn().execute("SELECT name FROM ind ORDER BY id")
+        return (n for (n,) in cur)
+
+    def __len__(self):
+        return self._len
+
+
+class TabItems(Sequence):
+    # One tab's individual names in group_individuals() order, read a page
+    # at a time by position, so the sidebar never holds the whole list.
+    def __init__(self, db, tab, size):
+        self._db, self.tab, self._size = db, tab, size
+        self._pages = {}
+
+    def _page(self, k):
+        page = self._pages.get(k)
+        if page is None:
+            if len(self._pages) >= 64:
+                self._pages.clear()
+            page = self._pages[k] = [n for (n,) in self._db.all(
+                "SELECT name FROM ind WHERE tab = ? AND pos >= ? AND pos < ? ORDER BY pos",
+                (self.tab, k * PAGE, (k + 1) * PAGE))]
+        return page
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(self._size))]
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        return self._page(i // PAGE)[i % PAGE]
+
+    def __iter__(self):
+        for k in range(0, self._size, PAGE):
+            yield from self._page(k // PAGE)
+
+    def index(self, name, *_):
+        row = self._db.one("SELECT pos FROM ind WHERE name = ? AND tab = ?", (name, self.tab))
+        if row is None:
+            raise ValueError(name)
+        return row[0]
+
+    def __contains__(self, name):
+        return self._db.one("SELECT 1 FROM ind WHERE name = ? AND tab = ?",
+                            (name, self.tab)) is not None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# INDEXES (SQL)
+# ─────────────────────────────────────────────────────────────────────────────
+def _in(cols):
+    return ",".join("?" * len(cols))
+
+
+def _glob(kw):
+    return "*" + kw.replace("[", "[[]").replace("*", "[*]").replace("?", "[?]") + "*"
+
+
+class SQLTextIndex:
+    # `kw in doc_text(iid)` as a GLOB over the trigram table; text and
+    # keyword are both lower-case, so the case-sensitive match is exact.
+    _TERM_CACHE = 64
+
+    def __init__(self, db, store):
+        self._db, self._store = db, store
+        self._hits = {}
+        self._lock = threading.Lock()      # searches run on several threads
+
+    def doc_text(self, iid):
+        return doc_text(self._store, iid)
+
+    def search(self, kw, types=None, check=None):
+        key  = (kw, tuple(types) if types is not None else None)
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = set(self._db.ids("SELECT rowid FROM doc WHERE text GLOB ?",
+                                    (_glob(kw),), check))
+            if types is not None:
+                # Intersected here: as a subquery SQLite re-runs the GLOB
+                # once per typed id.
+                hits &= set(self._db.ids(
+                    f"SELECT id FROM types WHERE cls IN ({_in(types)})", types))
+            hits = sorted(hits)
+            with self._lock:
+                if len(self._hits) >= self._TERM_CACHE:
+                    self._hits.pop(next(iter(self._hits)), None)
+                self._hits[key] = hits
+        return hits
+
+    def estimate(self, kw, types=None):
+        # Exact, and the search it runs is cached for evaluate().
+        return len(self.search(kw, types))
+
+
+class SQLNumericIndex:
+    def __init__(self, db, kinds):
+        self._db   = db
+        self.kinds = kinds
+        self._lower = {p.lower(): p for p in kinds}
+
+    def resolve(self, field):
+        prop = NUMERIC_ALIASES.get(field, field)
+        return self._lower.get(prop.lower())
+
+    @staticmethod
+    def _where(prop, lo, hi, lo_incl, hi_incl):
+        sql, args = "p = ? AND num IS NOT NULL", [prop]
+        if lo is not None:
+            sql += " AND num >= ?" if lo_incl else " AND num > ?"
+            args.append(lo)
+        if hi is not None:
+            sql += " AND num <= ?" if hi_incl else " AND num < ?"
+            args.append(hi)
+        return sql, args
+
+    def count(self, prop, lo=None, hi=None, lo_incl=True, hi_incl=True):
+        sql, args = self._where(prop, lo, hi, lo_incl, hi_incl)
+        return self._db.one(f"SELECT COUNT(*) FROM asr WHERE {sql}", args)[0]
+
+    def range(self, prop, lo=None, hi=None, lo_incl=True, hi_incl=True):
+        sql, args = self._where(prop, lo, hi, lo_incl, hi_incl)
+        return self._db.ids(f"SELECT s FROM asr WHERE {sql} ORDER BY num, s", args)
+
+    def values(self, prop, ids):
+        ids, got = list(ids), {}
+        for k in range(0, len(ids), BATCH):
+            chunk = ids[k:k + BATCH]
+            got.update(self._db.all(
+                "SELECT s, MAX(num) FROM asr WHERE p = ? AND num IS NOT NULL "
+                f"AND s IN ({_in(chunk)}) GROUP BY s", [prop] + chunk))
+        nan = float("nan")
+        return array("d", (got.get(i, nan) for i in ids))
+
+
+class SQLTypeIndex:
+    # Class membership through the subclass closure: an instance of C is an
+    # individual with an asserted type among C's subclasses.
+    def __init__(self, db, store, hierarchy):
+        self._db, self._store, self.hierarchy = db, store, hierarchy
+        for (t,) in db.all("SELECT DISTINCT cls FROM types"):
+            hierarchy.inferred((t,))
+
+    def _closure(self, types):
+        out = []
+        for t in types:
+            out += [c for c in self.hierarchy.subclasses(t) if c not in out]
+        return out
+
+    def count(self, types):
+        cls = self._closure(types)
+        return self._db.one(f"SELECT COUNT(DISTINCT id) FROM types WHERE cls IN ({_in(cls)})",
+                            cls)[0]
+
+    def ids(self, types):
+        cls = self._closure(types)
+        return set(self._db.ids(f"SELECT id FROM types WHERE cls IN ({_in(cls)})", cls))
+
+    def has(self, iid, types):
+        inferred = self.hierarchy.inferred(self._store.types(iid))[1]
+        return bool(inferred & self.hierarchy.mask(types))
+
+
+class SQLAdjacency:
+    def __init__(self, db):
+        self._db = db
+
+    def outgoing(self, iid):
+        return self._db.all("SELECT p, dst FROM asr WHERE s = ? AND dst IS NOT NULL "
+                            "ORDER BY rowid", (iid,))
+
+    def incoming(self, iid):
+        return self._db.all("SELECT p, s FROM asr WHERE dst = ? ORDER BY rowid", (iid,))
+
+    def linked(self, iid):
+        return self._db.ids("SELECT dst FROM asr WHERE s = ? AND dst IS NOT NULL "
+                            "UNION ALL SELECT s FROM asr WHERE dst = ?", (iid, iid))
+
+    def related(self, ids, prop):
+        ids, out = list(ids), []
+        for sql in ("SELECT s, dst FROM asr WHERE p = ? AND dst IS NOT NULL AND s IN ({})",
+                    "SELECT dst, s FROM asr WHERE p = ? AND dst IN ({})"):
+            for k in range(0, len(ids), BATCH):
+                chunk = ids[k:k + BATCH]
+                out += self._db.all(sql.format(_in(chunk)), [prop] + chunk)
+        return out
+
+    def step(self, ids, prop=None, forward=True, backward=True):
+        cond = " AND p = ?" if prop else ""
+        out  = set()
+        for sql, on in (("SELECT dst FROM asr WHERE dst IS NOT NULL AND s IN ({})", forward),
+                        ("SELECT s FROM asr WHERE dst IN ({})", backward)):
+            if not on:
+                continue
+            ids = list(ids)
+            for k in range(0, len(ids), BATCH):
+                chunk = ids[k:k + BATCH]
+                out.update(self._db.ids(sql.format(_in(chunk)) + cond,
+                                        chunk + [prop] if prop else chunk))
+        return out
+
+
+class SQLTimeIndex(TimeIndex):
+    # TimeIndex over the booking table; a prefix is one indexed lookup.
+    def __init__(self, db, store, totals):
+        self._db, self._store, self._totals = db, store, totals
+        self._extra, self._dead = [], []
+
+    def _prefix(self, t):
+        row = self._db.one("SELECT pos, conf, covers, conf_covers FROM booking "
+                           "WHERE t >= ? ORDER BY t, pos LIMIT 1", (t,))
+        return list(row) if row else list(self._totals)
+
+    def __len__(self):
+        return self._totals[0]
+
+    def bounds(self):
+        lo, hi = self._db.one("SELECT MIN(t), MAX(t) FROM booking")
+        return None if lo is None else (lo, hi)
+
+    def range(self, lo=None, hi=None):
+        sql, args = "SELECT s FROM booking WHERE 1", []
+        if lo is not None:
+            sql += " AND t >= ?"
+            args.append(lo)
+        if hi is not None:
+            sql += " AND t < ?"
+            args.append(hi)
+        return self._db.ids(sql + " ORDER BY t, pos", args)
+
+
+def open_database(path):
+    # -> a model dict shaped like build_model()'s, backed by the database.
+    db   = _Database(path)
+    meta = {k: json.loads(v) for k, v in db.all("SELECT key, value FROM meta")}
+    hierarchy = ClassHierarchy(meta["classes"])
+    store     = SQLiteStore(db)
+    groups    = {tab: TabItems(db, tab, n) for tab, n in db.all(
+        "SELECT tab, COUNT(*) FROM ind GROUP BY tab")}
+    return {
+        "classes": meta["classes"],
+        "sub_classes": defaultdict(list, meta["sub_classes"]),
+        "obj_props": meta["obj_props"], "data_props": meta["data_props"],
+        "individuals": store,
+        "hierarchy": hierarchy,
+        "groups": groups,
+        "text_index": SQLTextIndex(db, store),
+        "num_index": SQLNumericIndex(db, meta["numeric"]),
+        "type_index": SQLTypeIndex(db, store, hierarchy),
+        "adjacency": SQLAdjacency(db),
+        "time_index": SQLTimeIndex(db, store, meta["bookings"]),
+        "sources": meta["sources"],
+        "unresolved_imports": meta["unresolved_imports"],
+        "database": path,
+    }